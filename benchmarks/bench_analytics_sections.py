@@ -0,0 +1,100 @@
+"""
+Benchmark: time to first chart on the Analytics page
+The page used to load every dataset and build all eight sections top to bottom
+on each visit. Sections are now tabs that only run when opened, each loading
+just the data it declares. This runs the page headless on cold caches, once
+rendering every section (as before) and once only the first tab (now), and
+prints what each section costs when it is opened.
+Usage: python benchmarks/bench_analytics_sections.py [--orders 100000] [--articles 200000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+PAGE_KEY = 'analytics_section'
+
+
+def cold(at, tab=None):
+    """
+    Run the page on empty in-memory caches (the snapshots stay on disk)
+    Returns: (ms, {section: timing})
+    """
+    import streamlit as st
+    from figure_cache import clear_figure_cache
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    clear_figure_cache()
+    if tab is not None:
+        at.session_state[PAGE_KEY] = tab
+    t = time.perf_counter()
+    at.run()
+    ms = (time.perf_counter() - t) * 1000
+    # A page that couldn't load its data renders nothing worth timing
+    if at.exception or at.error:
+        raise SystemExit((at.exception or at.error)[0].value)
+    return ms, at.session_state[f"{PAGE_KEY}_timings"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--orders', type=int, default=100_000)
+    parser.add_argument('--articles', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault('MTG_CACHE_DIR', tempfile.mkdtemp(prefix='mtg-bench-'))
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    import data_loader
+    import sections
+    from revalidate import Revalidating
+    from snapshots import write_snapshot
+    from synthetic import parsed
+
+    # Serve the page from synthetic snapshots instead of the S3 exports
+    orders = write_snapshot(parsed('orders', args.orders), 'orders', 'bench')
+    articles = write_snapshot(parsed('articles', args.articles), 'articles', 'bench')
+    data_loader._SNAPSHOTS['orders'] = Revalidating(lambda: orders)
+    data_loader._SNAPSHOTS['articles'] = Revalidating(lambda: articles)
+
+    page = next((ROOT / 'pages').glob('2_*Analytics.py'))
+    at = AppTest.from_file(str(page), default_timeout=300)
+    at.run()  # warm-up: imports and the snapshots' page cache
+
+    lazy_render = sections.Sections.render
+
+    def render_all(self, key):
+        # The page as it was: every section, one after the other
+        timings = {label: self._render_one(needs, render) for label, needs, render in self._sections}
+        st.session_state[f"{key}_timings"] = timings
+        return timings
+
+    sections.Sections.render = render_all
+    eager = [cold(at)[0] for _ in range(args.repeat)]
+    sections.Sections.render = lazy_render
+    first = [cold(at)[0] for _ in range(args.repeat)]
+
+    print(f"{args.orders:,} orders, {args.articles:,} articles, cold caches, median of {args.repeat}")
+    print(f"{'first visit':<28}{'ms':>10}")
+    print(f"{'every section (before)':<28}{statistics.median(eager):>10.1f}")
+    print(f"{'first tab only (now)':<28}{statistics.median(first):>10.1f}")
+    print()
+    print(f"{'opening a section':<28}{'data ms':>10}{'charts ms':>11}")
+    for label in [tab.label for tab in at.tabs]:
+        _, timings = cold(at, label)
+        timing = timings[label]
+        print(f"{label:<28}{timing['data_ms']:>10.1f}{timing['render_ms']:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark: cold start with the three exports loaded one by one vs. concurrently
+Serves synthetic exports from a local HTTP server that adds a fixed latency
+and a bandwidth limit per request (like S3 from the app host), then loads
+orders, articles and expenses on empty caches: first one after the other,
+then with data_loader.prefetch on the shared pool.
+Usage: python benchmarks/bench_cold_start.py [--latency 0.4] [--mbps 40]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+DATASETS = ['orders', 'articles', 'expenses']
+
+
+def serve(folder, latency, mbps):
+    """
+    Threaded HTTP server for `folder` with latency and bandwidth per request
+    Returns: base URL
+    """
+    class Handler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=str(folder), **kwargs)
+
+        def copyfile(self, source, outputfile):
+            time.sleep(latency)
+            chunk = 64 * 1024
+            while data := source.read(chunk):
+                outputfile.write(data)
+                time.sleep(len(data) / (mbps * 125_000))
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def cold_load(prefetch_first):
+    """
+    Load the three datasets on empty caches
+    Returns: (seconds, load_timings())
+    """
+    import streamlit as st
+
+    import data_loader
+    from export_cache import CACHE_DIR
+
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    for snapshot in data_loader._SNAPSHOTS.values():
+        snapshot.clear()
+
+    t = time.perf_counter()
+    if prefetch_first:
+        data_loader.prefetch(*DATASETS)
+    for load in (data_loader.load_orders_data, data_loader.load_articles_data, data_loader.load_expenses_data):
+        if load() is None:
+            raise SystemExit(f"{load.__name__} failed")
+    return time.perf_counter() - t, data_loader.load_timings()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--orders', type=int, default=100_000)
+    parser.add_argument('--articles', type=int, default=200_000)
+    parser.add_argument('--expenses', type=int, default=2_000)
+    parser.add_argument('--latency', type=float, default=0.4, help='seconds before the first byte')
+    parser.add_argument('--mbps', type=float, default=40, help='download speed in Mbit/s')
+    args = parser.parse_args()
+
+    os.environ.setdefault('MTG_CACHE_DIR', tempfile.mkdtemp(prefix='mtg-bench-'))
+    import data_loader
+    from synthetic import write_exports
+
+    folder = Path(tempfile.mkdtemp(prefix='mtg-bench-exports-'))
+    print("Writing synthetic exports ...")
+    write_exports(folder, args.orders, articles_rows=args.articles, expenses_rows=args.expenses)
+    base = serve(folder, args.latency, args.mbps)
+    data_loader.ORDERS_CSV_URL = f"{base}/orders.csv"
+    data_loader.ARTICLES_CSV_URL = f"{base}/articles.csv"
+    data_loader.EXPENSES_ODS_URL = f"{base}/Expenses.ods"
+
+    sequential, _ = cold_load(prefetch_first=False)
+    concurrent, timings = cold_load(prefetch_first=True)
+
+    print(f"{args.latency:.1f} s latency, {args.mbps:g} Mbit/s, {data_loader.LOAD_WORKERS} workers")
+    print(f"{'dataset':<12}{'size MB':>10}{'download ms':>14}{'parse ms':>11}")
+    files = {'orders': 'orders.csv', 'articles': 'articles.csv', 'expenses': 'Expenses.ods'}
+    for name in DATASETS:
+        size = (folder / files[name]).stat().st_size / 1e6
+        print(f"{name:<12}{size:>10.2f}{timings[name]['fetch_ms']:>14.0f}{timings[name]['parse_ms']:>11.0f}")
+    slowest = max(t['fetch_ms'] + t['parse_ms'] for t in timings.values()) / 1000
+    print()
+    print(f"{'cold start':<28}{'s':>8}")
+    print(f"{'one after the other':<28}{sequential:>8.2f}")
+    print(f"{'prefetch (concurrent)':<28}{concurrent:>8.2f}")
+    print(f"{'slowest single dataset':<28}{slowest:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: filter-to-chart latency on the Costs page
+Changing a filter used to rerun the whole page (login gate, CSS, data load,
+every figure). The filters and charts now live in an st.fragment, so a filter
+change only costs the fragment, and the transactions table in it is only
+filtered, sorted and styled while its expander is open. This runs the page
+headless and times both, the script's own run time as the page records it,
+per filter change with the table closed and open.
+Usage: python benchmarks/bench_costs_filters.py [--rows 20000] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault('MTG_CACHE_DIR', tempfile.mkdtemp(prefix='mtg-bench-'))
+    from streamlit.testing.v1 import AppTest
+
+    import data_loader
+    from revalidate import Revalidating
+    from snapshots import write_snapshot
+    from synthetic import parsed
+    from timing import clear_timings, timings
+
+    # Serve the page from a synthetic snapshot instead of the S3 workbook
+    snapshot = write_snapshot(parsed('expenses', args.rows), 'expenses', 'bench')
+    data_loader._SNAPSHOTS['expenses'] = Revalidating(lambda: snapshot)
+
+    page = next((ROOT / 'pages').glob('3_*Costs.py'))
+    at = AppTest.from_file(str(page), default_timeout=120)
+    at.session_state['authenticated'] = True
+    at.run()  # cold: loads and caches the model
+    if at.exception or at.error:
+        raise SystemExit((at.exception or at.error)[0].value)
+
+    # AppTest always reruns the whole script: the 'page' stage is what a filter
+    # change cost without the fragment, the fragment's own time is all it
+    # costs in the running app
+    results = {}
+    for table_open in (False, True):
+        page, fragment = [], []
+        for i in range(-1, args.repeat):  # -1: warm-up, e.g. the first table render
+            # Where the browser would report the expander as open or closed
+            at.session_state['raw_transactions_open'] = table_open
+            at.checkbox(key='cat_all').set_value(i % 2 == 1)
+            clear_timings()
+            at.run()
+            if at.exception or at.error:
+                raise SystemExit((at.exception or at.error)[0].value)
+            if i < 0:
+                continue
+            stages = timings()
+            page.append(stages.loc[stages['Stage'] == 'page', 'ms'].iloc[-1])
+            fragment.append(at.session_state['costs_fragment_ms'])
+        results[table_open] = statistics.median(page), statistics.median(fragment)
+
+    print(f"{args.rows:,} expense rows, median ms of {args.repeat} filter changes")
+    print(f"{'rerun':<24}{'table closed':>14}{'table open':>14}")
+    for n, label in enumerate(['whole page', 'fragment only']):
+        print(f"{label:<24}{results[False][n]:>14.1f}{results[True][n]:>14.1f}")
+
+if __name__ == '__main__':
+    main()
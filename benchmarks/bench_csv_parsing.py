@@ -0,0 +1,58 @@
+"""
+Benchmark: parsing the articles export, legacy string fix-up vs. native decimal parsing
+Usage: python benchmarks/bench_csv_parsing.py [--rows 5000000]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from synthetic import write_articles_csv  # noqa: E402
+
+
+def legacy(path):
+    # What load_articles_data did before: read as text, then fix up per column
+    df = pd.read_csv(path)
+    if df['card_prices'].dtype == 'object':
+        df['card_prices'] = df['card_prices'].str.replace(',', '.').astype(float)
+    return df
+
+
+def timed(fn):
+    t = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    from data_loader import _read_csv
+
+    path = Path(tempfile.mkdtemp(prefix='mtg-bench-')) / 'cardmarket_articles_sold.csv'
+    print(f"Writing synthetic articles export with {args.rows:,} rows ...")
+    write_articles_csv(path, args.rows)
+    print(f"{path.stat().st_size / 1e6:,.0f} MB\n")
+
+    reference, t_legacy = timed(lambda: legacy(path))
+    results = [('legacy str.replace', reference, t_legacy)]
+    for engine in ['c', 'pyarrow']:
+        df, t = timed(lambda: _read_csv(path, 'articles', engine=engine))
+        assert np.array_equal(df['card_prices'].to_numpy(), reference['card_prices'].to_numpy())
+        results.append((f"native decimal ({engine})", df, t))
+
+    print(f"{'parser':<26}{'seconds':>10}{'MB in memory':>14}")
+    for label, df, t in results:
+        print(f"{label:<26}{t:>10.2f}{df.memory_usage(deep=True).sum() / 1e6:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
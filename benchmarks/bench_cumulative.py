@@ -0,0 +1,63 @@
+"""
+Benchmark: cumulative orders by country, legacy loop vs. cumulative_by_group
+Usage: python benchmarks/bench_cumulative.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from synthetic import orders as synthetic_orders  # noqa: E402
+from timeseries import cumulative_by_group  # noqa: E402
+
+
+def legacy(orders_df, top_countries):
+    # The nested loop the Analytics page used before cumulative_by_group
+    df_sorted = orders_df.sort_values('Date of Purchase').copy()
+    cumulative_data = []
+    for country in top_countries:
+        country_series = df_sorted[df_sorted['Country'] == country]['Date of Purchase']
+        all_dates      = sorted(df_sorted['Date of Purchase'].unique())
+        cumulative_count = 0
+        for date in all_dates:
+            cumulative_count += (country_series == date).sum()
+            cumulative_data.append({
+                'Date of Purchase': date,
+                'Country': country,
+                'Cumulative Orders': cumulative_count,
+            })
+    return pd.DataFrame(cumulative_data)
+
+
+def timed(fn):
+    t = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--legacy-max', type=int, default=20_000,
+                        help="only run the legacy loop up to this many rows")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'engine s':>12}{'us/row':>10}{'legacy s':>12}")
+    for rows in args.sizes:
+        orders = synthetic_orders(rows)[['Date of Purchase', 'Country']]
+        top = orders['Country'].value_counts().head(6).index.tolist()
+        fast, t_fast = timed(lambda: cumulative_by_group(orders, 'Date of Purchase', 'Country',
+                                                          groups=top, name='Cumulative Orders'))
+        t_legacy = float('nan')
+        if rows <= args.legacy_max:
+            slow, t_legacy = timed(lambda: legacy(orders, top))
+            pd.testing.assert_frame_equal(fast, slow, check_dtype=False)
+        print(f"{rows:>10,}{t_fast:>12.4f}{t_fast / rows * 1e6:>10.3f}{t_legacy:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Benchmark: cumulative revenue line, one point per order vs. LTTB downsampled
+Reports the time to build and serialize the figure and the JSON size that
+goes to the browser.
+Usage: python benchmarks/bench_downsample.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from downsample import MAX_POINTS, time_series_trace  # noqa: E402
+from synthetic import parsed  # noqa: E402
+
+
+def timed(trace):
+    t = time.perf_counter()
+    fig = go.Figure(trace())
+    size = len(pio.to_json(fig, validate=False))
+    return time.perf_counter() - t, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--points', type=int, default=MAX_POINTS)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'full (ms)':>12}{'full (KB)':>12}{'lttb (ms)':>12}{'lttb (KB)':>12}")
+    for rows in args.sizes:
+        orders = parsed('orders', rows)
+        x, y = orders['Date of Purchase'], orders['Net Value'].cumsum()
+        full_s, full_b = timed(lambda: go.Scatter(x=x, y=y, mode='lines', fill='tozeroy'))
+        lttb_s, lttb_b = timed(lambda: time_series_trace(x, y, args.points, mode='lines', fill='tozeroy'))
+        print(f"{rows:>10,}{full_s * 1000:>12.0f}{full_b / 1e3:>12,.0f}{lttb_s * 1000:>12.0f}{lttb_b / 1e3:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
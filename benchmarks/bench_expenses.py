@@ -0,0 +1,53 @@
+"""
+Benchmark: cold ODS parse vs. cached snapshot for the expenses workbook
+Usage: python benchmarks/bench_expenses.py [--rows 20000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from synthetic import write_expenses_ods  # noqa: E402
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault('MTG_CACHE_DIR', tempfile.mkdtemp(prefix='mtg-bench-'))
+    from data_loader import _parse_expenses
+    from snapshots import read_snapshot, write_snapshot
+
+    workbook = Path(tempfile.mkdtemp(prefix='mtg-bench-')) / 'Expenses.ods'
+    print(f"Writing synthetic workbook with {args.rows:,} rows ...")
+    write_expenses_ods(workbook, args.rows)
+
+    t = time.perf_counter()
+    df = _parse_expenses(workbook)
+    cold = time.perf_counter() - t
+    snapshot = write_snapshot(df, 'expenses', 'bench')
+    cached = best_of(lambda: read_snapshot(snapshot), args.repeat)
+
+    print(f"{'path':<24}{'seconds':>10}")
+    print(f"{'cold ODS parse (odfpy)':<24}{cold:>10.3f}")
+    print(f"{'cached snapshot':<24}{cached:>10.3f}")
+    print(f"speed-up: {cold / cached:,.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: raw-data table, full-frame Styler vs. one paginated page
+Times what a rerun spends on the table and the size of what Streamlit sends
+to the browser for it (the serialized Arrow message).
+Usage: python benchmarks/bench_tables.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from streamlit.elements.arrow import marshall  # noqa: E402
+
+from synthetic import parsed  # noqa: E402
+from tables import gradient_css, page_positions  # noqa: E402
+
+try:
+    from streamlit.proto.ArrowData_pb2 import ArrowData as ArrowProto
+except ImportError:  # Streamlit < 1.40
+    from streamlit.proto.Arrow_pb2 import Arrow as ArrowProto
+
+MONEY = ['Total Value', 'Commission', 'Net Value']
+PAGE_SIZE = 50
+
+
+def payload(data):
+    proto = ArrowProto()
+    marshall(proto, data, default_uuid='bench')
+    return proto.ByteSize()
+
+
+def full_frame(df):
+    # What the Raw Orders expander did before: sort and style every row. Past
+    # 262,144 cells (~65k orders) pandas refuses to render it at all by default
+    pd.set_option('styler.render.max_elements', df.size)
+    return (
+        df.sort_values('Date of Purchase', ascending=False)
+        .reset_index(drop=True)
+        .style
+        .format({c: '€{:.2f}' for c in MONEY})
+        .background_gradient(subset=['Net Value'], cmap='Blues')
+    )
+
+
+def one_page(df, page_no=3):
+    # What tables.paginated_table does for one page
+    offset = (page_no - 1) * PAGE_SIZE
+    page = df.iloc[page_positions(df['Date of Purchase'], False, offset, PAGE_SIZE)]
+    page.index = pd.RangeIndex(offset, offset + len(page))
+    css = gradient_css(page['Net Value'], df['Net Value'].min(), df['Net Value'].max(), 'Blues')
+    return page.style.format({c: '€{:.2f}' for c in MONEY}).apply(lambda _: css, subset=['Net Value'], axis=0)
+
+
+def timed(build, df):
+    t = time.perf_counter()
+    size = payload(build(df))
+    return time.perf_counter() - t, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--full-limit', type=int, default=200_000,
+                        help="skip the full-frame Styler above this many rows (it takes minutes)")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'full (s)':>12}{'full (MB)':>12}{'page (ms)':>12}{'page (KB)':>12}")
+    for rows in args.sizes:
+        df = parsed('orders', rows)[['Date of Purchase', *MONEY]]
+        full_s, full_b = timed(full_frame, df) if rows <= args.full_limit else (float('nan'), float('nan'))
+        page_s, page_b = timed(one_page, df)
+        print(f"{rows:>10,}{full_s:>12.2f}{full_b / 1e6:>12.1f}{page_s * 1000:>12.1f}{page_b / 1e3:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Pandas vs. DuckDB: every aggregate of sql_backend.py against its pandas path
+Runs both on the same synthetic snapshots (see run_suite.prepare), checks that
+they return the same result and prints the time of each. Exits with 1 if any
+result differs.
+Usage: python benchmarks/compare_backends.py [--rows 1M] [--repeat 5] [--seed 0]
+"""
+import argparse
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# The dataset and columns each SQL metric reads on the pandas path
+METRIC_INPUTS = {
+    'article_kpis': ('articles', ['name', 'card_prices']),
+    'price_histogram': ('articles', ['card_prices']),
+    'price_buckets': ('articles', ['card_prices']),
+    'weekday_orders': ('orders', ['Date of Purchase']),
+    'value_buckets': ('orders', ['Date of Purchase', 'Net Value']),
+    'rarity_stats': ('articles', ['card_prices', 'card_rarities']),
+    'set_stats': ('articles', ['card_prices', 'set_names']),
+    'sold_kpis': ('articles', ['card_prices', 'set_names']),
+    'rarity_counts': ('articles', ['card_rarities']),
+    'set_counts': ('articles', ['set_names']),
+    'set_values': ('articles', ['card_prices', 'set_names']),
+}
+
+
+def checks(paths):
+    """
+    (name, pandas call, SQL call) for every aggregate the backend answers; both
+    start from the snapshot files, pandas by reading the columns it needs
+    paths: {dataset: snapshot path}
+    """
+    import data_loader
+    import metrics
+    import rollups
+    import sql_backend
+    from snapshots import read_snapshot
+
+    def read(dataset, columns):
+        # The orders metrics summarise the model (WeekDay, ...), as the pages pass it
+        if dataset == 'orders':
+            return data_loader.read_model(paths['orders'], columns, 'orders')
+        return read_snapshot(paths[dataset], columns)
+
+    table = ['Order_Date', 'Store_Name', 'Store_Country', 'Cost_Category', 'Item_Price', 'Description']
+    categories, countries = ['Inventory', 'Shipping'], ['Germany', 'France']
+    found = [
+        ('orders_cube',
+         lambda: rollups.orders_cube(read('orders', ['Date of Purchase', 'Country', *rollups.ORDER_SUM_COLUMNS])),
+         lambda: sql_backend.orders_cube(paths['orders'])),
+        ('expenses_cube',
+         lambda: rollups.expenses_cube(read('expenses', ['Order_Date', 'Cost_Category', 'Store_Country',
+                                                         'Item_Price'])),
+         lambda: sql_backend.expenses_cube(paths['expenses'])),
+        ('transactions',
+         lambda: metrics.transactions(read('expenses', table), categories, countries),
+         lambda: sql_backend.transactions(paths['expenses'], categories, countries, table)),
+    ]
+    missing = set(sql_backend.QUERIES) - set(METRIC_INPUTS)
+    if missing:
+        raise SystemExit(f"No inputs for {', '.join(sorted(missing))}, add them to METRIC_INPUTS")
+    for name, query in sql_backend.QUERIES.items():
+        dataset, columns = METRIC_INPUTS[name]
+        found.append((name,
+                      lambda f=getattr(metrics, name).compute, d=dataset, c=columns: f(read(d, c)),
+                      lambda q=query, p=paths[dataset]: q(p)))
+    return found
+
+
+def differences(expected, actual):
+    """
+    Why `actual` isn't the same result as `expected`, None if it is
+    Row labels aren't compared: SQL results are numbered from 0, filtered pandas
+    frames keep the labels of their rows
+    """
+    try:
+        if isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(expected.reset_index(drop=True), actual.reset_index(drop=True),
+                                          check_categorical=False)
+        elif isinstance(expected, pd.Series):
+            pd.testing.assert_series_equal(expected, actual, check_categorical=False, check_index_type=False)
+        elif expected.keys() != actual.keys():
+            return f"keys {sorted(expected)} vs. {sorted(actual)}"
+        else:
+            for key, value in expected.items():
+                other = actual[key]
+                if isinstance(value, str) or value is None:
+                    same = value == other
+                else:
+                    same = math.isclose(value, other, rel_tol=1e-9) or (math.isnan(value) and math.isnan(other))
+                if not same:
+                    return f"{key}: {value!r} vs. {other!r}"
+    except AssertionError as e:
+        return str(e).strip().splitlines()[0]
+    return None
+
+
+def median_ms(fn, repeat):
+    fn()
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', default='100k', help='orders and articles, e.g. 100k, 1M')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix='mtg-backends-'))
+    os.environ['MTG_CACHE_DIR'] = str(work / 'cache')
+
+    import sql_backend
+    from run_suite import prepare
+    from synthetic import parse_size
+
+    if sql_backend.duckdb is None:
+        sys.exit("duckdb isn't installed: pip install duckdb")
+
+    rows = parse_size(args.rows)
+    print(f"Preparing {rows:,} orders ...")
+    paths = prepare(work / 'exports', rows, args.seed)['snapshots']
+
+    failed = 0
+    print(f"\n{'aggregate':<18}{'pandas ms':>12}{'duckdb ms':>12}{'speedup':>10}  result")
+    for name, on_pandas, on_duckdb in checks(paths):
+        problem = differences(on_pandas(), on_duckdb())
+        failed += problem is not None
+        pandas_ms, duckdb_ms = median_ms(on_pandas, args.repeat), median_ms(on_duckdb, args.repeat)
+        print(f"{name:<18}{pandas_ms:>12.1f}{duckdb_ms:>12.1f}{pandas_ms / duckdb_ms:>9.1f}x  "
+              f"{'same' if problem is None else 'DIFFERS: ' + problem}")
+
+    if failed:
+        print(f"\n{failed} aggregate(s) differ")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
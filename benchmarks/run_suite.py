@@ -0,0 +1,346 @@
+"""
+Benchmark suite: each loader step and page aggregation on synthetic data
+Runs in process on exports written by synthetic.py: no Streamlit server and
+no network. Every case is timed in isolation (median of --repeat runs, caches
+bypassed) and the results are saved as a JSON baseline; --compare reports the
+change against an earlier baseline and exits with 1 on a regression.
+Usage: python benchmarks/run_suite.py [--sizes 10k,100k] [--save] [--compare benchmarks/baselines/<commit>.json]
+"""
+import argparse
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+BASELINES = Path(__file__).resolve().parent / 'baselines'
+
+CASES = {}  # name -> function of the prepared inputs, in registration order
+
+
+def case(name):
+    """
+    Register a benchmark case; `name` is '<loader|page>.<step>'
+    """
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+# ── Inputs ────────────────────────────────────────────────────────────────────
+def prepare(folder, rows, seed):
+    """
+    Write the exports for `rows` orders and build what the cases start from:
+    parsed frames, snapshots, models and cubes, as the loaders hand them out
+    """
+    import data_loader
+    from snapshots import write_snapshot
+    from synthetic import write_exports
+
+    paths = write_exports(folder, rows, seed)
+    parsed = {
+        'orders': data_loader._parse_orders(paths['orders']),
+        'articles': data_loader._parse_articles(paths['articles']),
+        'expenses': data_loader._parse_expenses(paths['expenses']),
+    }
+    snapshots = {name: str(write_snapshot(df, name, f'bench{rows}')) for name, df in parsed.items()}
+    model = inspect.unwrap(data_loader._model)
+    return {
+        'paths': paths,
+        'parsed': parsed,
+        'snapshots': snapshots,
+        'orders_model': model(snapshots['orders'], None, 'orders'),
+        'articles': inspect.unwrap(data_loader._read_snapshot)(snapshots['articles'], None),
+        'expenses_model': model(snapshots['expenses'], None, 'expenses'),
+        'orders_cube': inspect.unwrap(data_loader._orders_cube)(snapshots['orders']),
+        'expenses_cube': inspect.unwrap(data_loader._expenses_cube)(snapshots['expenses']),
+    }
+
+
+# ── Loaders ───────────────────────────────────────────────────────────────────
+@case('loader.parse_orders')
+def parse_orders(d):
+    import data_loader
+    return data_loader._parse_orders(d['paths']['orders'])
+
+
+@case('loader.parse_articles')
+def parse_articles(d):
+    import data_loader
+    return data_loader._parse_articles(d['paths']['articles'])
+
+
+@case('loader.parse_expenses')
+def parse_expenses(d):
+    import data_loader
+    return data_loader._parse_expenses(d['paths']['expenses'])
+
+
+@case('loader.write_snapshot')
+def write_orders_snapshot(d):
+    from snapshots import write_snapshot
+    # Under its own name: a new version of 'orders' would replace the prepared one
+    return write_snapshot(d['parsed']['orders'], 'scratch', 'write')
+
+
+@case('loader.read_snapshot')
+def read_orders_snapshot(d):
+    from snapshots import read_snapshot
+    return read_snapshot(d['snapshots']['orders'])
+
+
+@case('loader.read_snapshot_columns')
+def read_orders_columns(d):
+    from snapshots import read_snapshot
+    return read_snapshot(d['snapshots']['orders'], ['Date of Purchase', 'Country', 'Net Value'])
+
+
+@case('loader.orders_model')
+def orders_model(d):
+    import data_loader
+    return inspect.unwrap(data_loader._model)(d['snapshots']['orders'], None, 'orders')
+
+
+@case('loader.orders_cube')
+def orders_cube(d):
+    import data_loader
+    return inspect.unwrap(data_loader._orders_cube)(d['snapshots']['orders'])
+
+
+@case('loader.expenses_cube')
+def expenses_cube(d):
+    import data_loader
+    return inspect.unwrap(data_loader._expenses_cube)(d['snapshots']['expenses'])
+
+
+# ── Pages ─────────────────────────────────────────────────────────────────────
+# The page aggregates from metrics.py, uncached (.compute). The frames passed to
+# histogram and bucket_counts are copies, so they compute instead of answering
+# from st.cache_data by data version.
+@case('overview.kpis')
+def overview_kpis(d):
+    import metrics
+    return (metrics.order_kpis.compute(d['orders_cube']), metrics.monthly_revenue.compute(d['orders_cube']),
+            metrics.article_kpis.compute(d['articles']))
+
+
+@case('overview.cumulative_net')
+def overview_cumulative_net(d):
+    from downsample import downsample
+    df = d['orders_model']
+    return downsample(df['Date of Purchase'], df['Cumulative Net'])
+
+
+@case('overview.price_histogram')
+def overview_price_histogram(d):
+    import metrics
+    return metrics.price_histogram(d['articles'].copy(), bins=30)
+
+
+@case('overview.price_buckets')
+def overview_price_buckets(d):
+    import metrics
+    return metrics.price_buckets(d['articles'].copy())
+
+
+@case('overview.table_page')
+def overview_table_page(d):
+    from tables import page_positions
+    return page_positions(d['orders_model']['Net Value'], False, 0, 50)
+
+
+@case('analytics.geography')
+def analytics_geography(d):
+    import metrics
+    cube = d['orders_cube']
+    return metrics.country_kpis.compute(cube), metrics.country_map.compute(cube), metrics.country_revenue.compute(cube)
+
+
+@case('analytics.cumulative_orders')
+def analytics_cumulative_orders(d):
+    import metrics
+    top = metrics.top_country_names.compute(d['orders_cube'])
+    return metrics.country_cumulative_orders.compute(d['orders_model'], top)
+
+
+@case('analytics.monthly_revenue')
+def analytics_monthly_revenue(d):
+    import metrics
+    top = metrics.top_country_names.compute(d['orders_cube'])
+    return metrics.monthly_country_revenue.compute(d['orders_cube'], top)
+
+
+@case('analytics.day_of_week')
+def analytics_day_of_week(d):
+    import metrics
+    return metrics.weekday_orders.compute(d['orders_model'])
+
+
+@case('analytics.value_buckets')
+def analytics_value_buckets(d):
+    import metrics
+    return metrics.value_buckets(d['orders_model'].copy())
+
+
+@case('analytics.rarity')
+def analytics_rarity(d):
+    import metrics
+    return metrics.rarity_stats.compute(d['articles'])
+
+
+@case('analytics.sets')
+def analytics_sets(d):
+    import metrics
+    return metrics.set_stats.compute(d['articles'])
+
+
+@case('costs.filters')
+def costs_filters(d):
+    import metrics
+    cube = d['expenses_cube']
+    categories, countries = metrics.expense_dimensions.compute(cube)
+    filters = dict(categories=categories[:3], countries=countries)
+    return [aggregate.compute(cube, **filters) for aggregate in (
+        metrics.cost_kpis, metrics.category_spend, metrics.monthly_spend, metrics.country_spend,
+        metrics.spend_heatmap,
+    )]
+
+
+@case('costs.table_page')
+def costs_table_page(d):
+    import metrics
+    from tables import page_positions
+    rows = metrics.transactions(d['expenses_model'], ['Inventory', 'Shipping'], ['Germany', 'France'])
+    return page_positions(rows['Item_Price'], False, 0, 50)
+
+
+@case('sold.sets')
+def sold_sets(d):
+    import metrics
+    articles = d['articles']
+    return (metrics.sold_kpis.compute(articles), metrics.rarity_counts.compute(articles),
+            metrics.set_counts.compute(articles), metrics.set_values.compute(articles))
+
+
+@case('sold.table_page')
+def sold_table_page(d):
+    from tables import page_positions
+    return page_positions(d['articles']['card_prices'], False, 0, 50)
+
+
+# ── Running and comparing ─────────────────────────────────────────────────────
+def time_case(fn, inputs, repeat):
+    """
+    Median and minimum of `repeat` runs in ms, after one warm-up run
+    """
+    fn(inputs)
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn(inputs)
+        times.append((time.perf_counter() - t) * 1000)
+    return {'median_ms': round(statistics.median(times), 3), 'min_ms': round(min(times), 3)}
+
+
+def environment(seed, repeat):
+    import numpy as np
+    import pandas as pd
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'seed': seed,
+        'repeat': repeat,
+    }
+
+
+def compare(baseline, current, threshold, min_ms):
+    """
+    Print baseline vs. current per size and case
+    Returns: number of cases slower than `threshold` (a fraction) and by more
+             than `min_ms`, below which timer noise dominates
+    """
+    regressions = 0
+    print(f"Baseline {baseline['env']['commit']} vs. {current['env']['commit']}")
+    for size, cases in current['results'].items():
+        before = baseline['results'].get(size, {})
+        print(f"\n{size} orders")
+        print(f"{'case':<34}{'before ms':>12}{'now ms':>12}{'change':>10}")
+        for name, result in cases.items():
+            if name not in before:
+                print(f"{name:<34}{'—':>12}{result['median_ms']:>12.1f}{'new':>10}")
+                continue
+            old, new = before[name]['median_ms'], result['median_ms']
+            change = (new - old) / old if old else 0.0
+            flag = ''
+            if change > threshold and new - old > min_ms:
+                regressions += 1
+                flag = '  ← slower'
+            print(f"{name:<34}{old:>12.1f}{new:>12.1f}{change:>+10.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', default='10k,100k', help='orders per run, e.g. 10k,100k,1M,10M')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cases', default=None, help='only cases whose name contains this, e.g. loader.')
+    parser.add_argument('--save', nargs='?', const='', default=None,
+                        help='write the results as JSON (default: benchmarks/baselines/<commit>.json)')
+    parser.add_argument('--compare', default=None, help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='slowdown counted as a regression')
+    parser.add_argument('--min-ms', type=float, default=1.0, help='ignore slowdowns smaller than this')
+    args = parser.parse_args()
+
+    # Snapshots go to a scratch cache, never to the app's own
+    work = Path(tempfile.mkdtemp(prefix='mtg-suite-'))
+    os.environ['MTG_CACHE_DIR'] = str(work / 'cache')
+
+    from synthetic import parse_size
+
+    cases = {name: fn for name, fn in CASES.items() if not args.cases or args.cases in name}
+    current = {'env': environment(args.seed, args.repeat), 'results': {}}
+    for size in args.sizes.split(','):
+        rows = parse_size(size)
+        print(f"Preparing {rows:,} orders ...")
+        inputs = prepare(work / f'exports-{rows}', rows, args.seed)
+        results = current['results'][str(rows)] = {}
+        for name, fn in cases.items():
+            results[name] = time_case(fn, inputs, args.repeat)
+            print(f"  {name:<34}{results[name]['median_ms']:>10.1f} ms")
+
+    if args.save is not None:
+        path = Path(args.save) if args.save else BASELINES / f"{current['env']['commit'] or 'local'}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(current, indent=2))
+        print(f"\nSaved {path}")
+
+    if args.compare:
+        print()
+        regressions = compare(json.loads(Path(args.compare).read_text()), current, args.threshold, args.min_ms)
+        if regressions:
+            print(f"\n{regressions} case(s) more than {args.threshold:.0%} slower")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
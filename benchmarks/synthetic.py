@@ -0,0 +1,206 @@
+"""
+Deterministic synthetic exports: orders, articles and expenses
+Same seed and size give byte-identical files. The columns and formats match
+what data_loader reads: comma-decimal money strings ("12,50") in the CSV
+exports and an ODS workbook for the expenses.
+Usage: python benchmarks/synthetic.py --rows 1M --out /tmp/mtg-exports [--seed 0]
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+COUNTRIES = ['Germany', 'France', 'Netherlands', 'Italy', 'Spain', 'Belgium', 'Austria', 'Poland',
+             'Portugal', 'Ireland', 'Denmark', 'Sweden']
+RARITIES = ['Common', 'Uncommon', 'Rare', 'Mythic', 'Special']
+STORES = ['Magic Madhouse', 'Games Island', 'Spellbound', 'Card Kingdom', 'Dragon Vault']
+STORE_COUNTRIES = ['Netherlands', 'France', 'Germany']
+COST_CATEGORIES = ['Inventory', 'Storage', 'Shipping', 'Postage', 'Trustee Service', 'Draft']
+DESCRIPTIONS = ['Booster box', 'Sleeves', 'Toploaders', 'Envelopes', 'Singles lot', 'Binder']
+
+# Columns held in integer cents and written as comma-decimal strings
+MONEY = {
+    'orders': ['Merchandise Value', 'Shipment Costs', 'Total Value', 'Commission'],
+    'articles': ['card_prices'],
+}
+
+START = pd.Timestamp('2019-01-01')
+DAYS = 6 * 365
+
+# Expenses per order; the workbook stays far smaller than the exports
+EXPENSES_PER_ORDER = 0.01
+# Data rows an ODS sheet can hold
+ODS_MAX_ROWS = 1_048_575
+# Rows formatted and written at a time, bounds memory for 10M-row exports
+CHUNK_ROWS = 1_000_000
+
+
+def parse_size(text):
+    """
+    '10k', '2.5M' or '100000' as a number of rows
+    """
+    text = str(text).strip().lower()
+    scale = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def _rng(seed, stream):
+    # Independent streams per dataset, so adding one doesn't change the others
+    return np.random.default_rng([seed, stream])
+
+
+def _cents(rng, shape, scale, rows):
+    return np.round(rng.gamma(shape, scale, rows) * 100).astype(np.int64)
+
+
+def money_strings(cents):
+    """
+    Integer cents as comma-decimal strings: 1250 -> '12,50'
+    """
+    cents = pd.Series(cents)
+    return (cents // 100).astype(str) + ',' + (cents % 100).astype(str).str.zfill(2)
+
+
+def orders(rows, seed=0):
+    """
+    Orders as the export has them, sorted by Date of Purchase
+    Money columns are integer cents: Merchandise Value, Shipment Costs,
+    Total Value and Commission (5% of the merchandise)
+    """
+    rng = _rng(seed, 1)
+    seconds = np.sort(rng.integers(0, DAYS * 86400, rows))
+    weights = np.linspace(2, 0.2, len(COUNTRIES))
+    merchandise = _cents(rng, 1.5, 8.0, rows)
+    shipment = rng.choice(np.array([125, 210, 550, 1190]), rows)
+    return pd.DataFrame({
+        'Date of Purchase': START + pd.to_timedelta(seconds, unit='s'),
+        'Country': rng.choice(COUNTRIES, rows, p=weights / weights.sum()),
+        'Merchandise Value': merchandise,
+        'Shipment Costs': shipment,
+        'Total Value': merchandise + shipment,
+        'Commission': np.round(merchandise * 0.05).astype(np.int64),
+    })
+
+
+def articles(rows, seed=0):
+    """
+    Sold articles; card_prices in integer cents
+    """
+    rng = _rng(seed, 2)
+    return pd.DataFrame({
+        'name': 'Card ' + pd.Series(rng.integers(0, 20_000, rows)).astype(str),
+        'card_prices': _cents(rng, 1.2, 2.0, rows),
+        'card_rarities': rng.choice(RARITIES, rows, p=[0.45, 0.3, 0.17, 0.05, 0.03]),
+        'set_names': rng.choice([f'Set {i:03d}' for i in range(250)], rows),
+    })
+
+
+def expenses(rows, seed=0):
+    """
+    Expenses as the workbook has them, Item_Price in euros
+    """
+    rng = _rng(seed, 3)
+    return pd.DataFrame({
+        'Order_Date': START + pd.to_timedelta(rng.integers(0, DAYS, rows), unit='D'),
+        'Store_Name': rng.choice(STORES, rows),
+        'Store_Country': rng.choice(STORE_COUNTRIES, rows),
+        'Cost_Category': rng.choice(COST_CATEGORIES, rows),
+        'Item_Price': _cents(rng, 2.0, 15.0, rows) / 100,
+        'Description': rng.choice(DESCRIPTIONS, rows),
+    })
+
+
+def parsed(dataset, rows, seed=0):
+    """
+    `dataset` as data_loader parses its export, without writing one: money in
+    euros, Net Value for orders, sorted by date and cast to the schema
+    """
+    from schema import apply_schema
+
+    df = {'orders': orders, 'articles': articles, 'expenses': expenses}[dataset](rows, seed)
+    for col in MONEY.get(dataset, []):
+        df[col] = df[col] / 100
+    if dataset == 'orders':
+        df['Net Value'] = df['Total Value'] - df['Commission']
+    if dataset == 'expenses':
+        df = df.sort_values('Order_Date', kind='stable').reset_index(drop=True)
+    return apply_schema(df, dataset)
+
+
+def _write_csv(df, path, money):
+    # Chunked, so the money strings of a 10M-row export never exist all at once
+    with open(path, 'w', newline='') as f:
+        for start in range(0, max(len(df), 1), CHUNK_ROWS):
+            chunk = df.iloc[start:start + CHUNK_ROWS]
+            chunk = chunk.assign(**{c: money_strings(chunk[c]).to_numpy() for c in money})
+            chunk.to_csv(f, index=False, header=start == 0, date_format='%Y-%m-%d %H:%M:%S')
+    return path
+
+
+def write_orders_csv(path, rows, seed=0):
+    """
+    Write an orders export with comma-decimal money
+    """
+    return _write_csv(orders(rows, seed), path, MONEY['orders'])
+
+
+def write_articles_csv(path, rows, seed=0):
+    """
+    Write an articles export with comma-decimal prices
+    """
+    return _write_csv(articles(rows, seed), path, MONEY['articles'])
+
+
+def write_expenses_ods(path, rows, seed=0):
+    """
+    Write an Expenses.ods workbook (odfpy; slow, keep it to a few 10k rows)
+    """
+    if rows > ODS_MAX_ROWS:
+        raise ValueError(f"An ODS sheet holds at most {ODS_MAX_ROWS:,} rows, got {rows:,}")
+    expenses(rows, seed).to_excel(path, engine='odf', index=False)
+    return path
+
+
+def expense_rows(order_rows):
+    """
+    Size of the expenses workbook that goes with `order_rows` orders
+    """
+    return min(max(int(order_rows * EXPENSES_PER_ORDER), 100), ODS_MAX_ROWS)
+
+
+def write_exports(folder, rows, seed=0, articles_rows=None, expenses_rows=None):
+    """
+    Write orders.csv, articles.csv and Expenses.ods to `folder`
+    rows: orders; articles default to the same number, expenses to expense_rows(rows)
+    Returns: {dataset: path}
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    return {
+        'orders': write_orders_csv(folder / 'orders.csv', rows, seed),
+        'articles': write_articles_csv(folder / 'articles.csv', articles_rows or rows, seed),
+        'expenses': write_expenses_ods(folder / 'Expenses.ods', expenses_rows or expense_rows(rows), seed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', default='100k', help='orders, e.g. 10k, 1M, 10M')
+    parser.add_argument('--articles', default=None, help='articles (default: same as --rows)')
+    parser.add_argument('--expenses', default=None, help='expense rows (default: 1%% of --rows)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args()
+
+    paths = write_exports(
+        args.out, parse_size(args.rows), args.seed,
+        articles_rows=parse_size(args.articles) if args.articles else None,
+        expenses_rows=parse_size(args.expenses) if args.expenses else None,
+    )
+    for dataset, path in paths.items():
+        print(f"{dataset:<10}{path}  {path.stat().st_size / 1e6:,.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Histogram binning on the server
+Counts are computed with NumPy and cached per data version, so a
+distribution chart only sends its bins to the browser instead of every value.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from invalidation import tracked
+from timing import cache_miss, timed
+
+# Buckets of the card price and order value distribution charts
+PRICE_BUCKET_BINS   = [0, 0.5, 1, 2, 5, 10, 25, 50, float('inf')]
+PRICE_BUCKET_LABELS = ['<€0.50', '€0.50–1', '€1–2', '€2–5', '€5–10', '€10–25', '€25–50', '€50+']
+VALUE_BUCKET_BINS   = [0, 5, 10, 20, 50, 100, 200, float('inf')]
+VALUE_BUCKET_LABELS = ['<€5', '€5–10', '€10–20', '€20–50', '€50–100', '€100–200', '€200+']
+
+
+def fixed_edges(values, bins):
+    """
+    `bins` equal-width bins from the smallest to the largest value
+    """
+    values = np.asarray(values, dtype='float64')
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return np.array([0.0, 1.0])
+    lo, hi = values.min(), values.max()
+    return np.linspace(lo, hi if hi > lo else lo + 1, bins + 1)
+
+
+def log_edges(values, bins):
+    """
+    `bins` log-spaced bins over the positive values, for long-tailed data
+    such as card prices
+    """
+    values = np.asarray(values, dtype='float64')
+    values = values[values > 0]
+    if not len(values):
+        return np.array([0.0, 1.0])
+    lo, hi = values.min(), values.max()
+    return np.geomspace(lo, hi if hi > lo else lo * 10, bins + 1)
+
+
+def bin_counts(values, edges):
+    """
+    Values per bin, binned like pd.cut(values, edges): (left, right] intervals,
+    values outside the edges and NaN are not counted
+    Returns: numpy array of len(edges) - 1 counts
+    """
+    values = np.asarray(values, dtype='float64')
+    idx = np.searchsorted(edges, values, side='left')
+    inside = (idx >= 1) & (idx < len(edges)) & ~np.isnan(values)
+    return np.bincount(idx[inside] - 1, minlength=len(edges) - 1)
+
+
+def _edges(values, bins, log):
+    if np.ndim(bins):
+        return np.asarray(bins, dtype='float64')
+    return log_edges(values, bins) if log else fixed_edges(values, bins)
+
+
+@tracked('version')
+@st.cache_data(max_entries=32)  # Keyed by data version, column and bins; the values themselves aren't hashed
+def _histogram(version, column, bins, log, _values):
+    return _compute_histogram(_values, bins, log)
+
+
+def _compute_histogram(values, bins, log):
+    cache_miss()
+    values = np.asarray(values, dtype='float64')
+    edges = _edges(values, bins, log)
+    counts = np.histogram(values[~np.isnan(values)], bins=edges)[0]
+    return pd.DataFrame({'Left': edges[:-1], 'Right': edges[1:], 'Count': counts})
+
+
+@timed('histogram', cache=True)
+def histogram(df, column, bins=30, log=False):
+    """
+    Histogram of df[column] with numpy.histogram semantics (last bin closed)
+    bins: number of bins, or the edges themselves
+    log: log-spaced instead of equal-width bins (when bins is a number)
+    Cached per data version for shared frames (see readonly.freeze)
+    Returns: DataFrame with Left, Right and Count, one row per bin
+    """
+    version = getattr(df, 'version', None)
+    bins = tuple(bins) if np.ndim(bins) else bins
+    if version is None:
+        return _compute_histogram(df[column].to_numpy(dtype='float64', na_value=np.nan), bins, log)
+    return _histogram(version, column, bins, log, df[column].to_numpy(dtype='float64', na_value=np.nan))
+
+
+@tracked('version')
+@st.cache_data(max_entries=32)  # Keyed by data version, column and buckets; the values themselves aren't hashed
+def _buckets(version, column, edges, labels, _values):
+    return _compute_buckets(_values, edges, labels)
+
+
+def _compute_buckets(values, edges, labels):
+    cache_miss()
+    counts = bin_counts(values, np.asarray(edges, dtype='float64'))
+    return pd.DataFrame({'Bucket': list(labels), 'Count': counts})
+
+
+@timed('bucket counts', cache=True)
+def bucket_counts(df, column, edges, labels):
+    """
+    Number of rows per labelled bucket, the same as
+    pd.cut(df[column], edges, labels=labels).value_counts() in label order
+    Cached per data version for shared frames (see readonly.freeze)
+    Returns: DataFrame with Bucket and Count, one row per label
+    """
+    version = getattr(df, 'version', None)
+    edges, labels = tuple(edges), tuple(labels)
+    values = df[column].to_numpy(dtype='float64', na_value=np.nan)
+    if version is None:
+        return _compute_buckets(values, edges, labels)
+    return _buckets(version, column, edges, labels, values)
@@ -0,0 +1,170 @@
+"""
+Build a precomputed dashboard snapshot
+Reads the orders, articles and expenses exports (the S3 URLs by default, or
+local files), parses them with the app's own parsers and writes one versioned
+snapshot with the typed datasets, their cubes and every metric the pages show
+(see precomputed.py). Run the app with MTG_SNAPSHOT set to the same folder to
+serve it without downloading or parsing anything.
+Usage: python build_snapshot.py --out /srv/mtg-snapshot [--orders orders.csv] [--articles ...] [--expenses ...]
+       MTG_SNAPSHOT=/srv/mtg-snapshot streamlit run streamlit_app.py
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import data_loader
+import metrics
+import precomputed
+from export_cache import fetch_export
+from readonly import freeze
+from snapshots import read_snapshot
+
+PARSERS = {
+    'orders': data_loader._parse_orders,
+    'articles': data_loader._parse_articles,
+    'expenses': data_loader._parse_expenses,
+}
+
+
+def plan(orders, articles, orders_cube, expenses_cube):
+    """
+    Every metric call the pages make on first view, with the arguments they pass
+    A call missing here still works in snapshot mode, it's computed on first use
+    Returns: list of (metric, *arguments)
+    """
+    top = metrics.top_country_names.compute(orders_cube)
+    categories, countries = metrics.expense_dimensions.compute(expenses_cube)
+    return [
+        # Orders Overview
+        (metrics.order_kpis, orders_cube),
+        (metrics.monthly_revenue, orders_cube),
+        (metrics.revenue_breakdown, orders_cube),
+        (metrics.article_kpis, articles),
+        (metrics.price_histogram, articles, 30),
+        (metrics.price_buckets, articles),
+        # Analytics
+        (metrics.top_country_names, orders_cube),
+        (metrics.country_kpis, orders_cube, 4),
+        (metrics.country_map, orders_cube),
+        (metrics.country_revenue, orders_cube),
+        (metrics.monthly_country_revenue, orders_cube, top),
+        (metrics.country_cumulative_orders, orders, top),
+        (metrics.weekday_orders, orders),
+        (metrics.value_buckets, orders),
+        (metrics.rarity_stats, articles),
+        (metrics.set_stats, articles),
+        # Costs, with every category and country selected
+        (metrics.expense_dimensions, expenses_cube),
+        (metrics.cost_kpis, expenses_cube, categories, countries),
+        (metrics.category_spend, expenses_cube, categories, countries),
+        (metrics.monthly_spend, expenses_cube, categories, countries),
+        (metrics.country_spend, expenses_cube, categories, countries),
+        (metrics.spend_heatmap, expenses_cube, categories, countries),
+        # Sold Articles
+        (metrics.sold_kpis, articles),
+        (metrics.rarity_counts, articles),
+        (metrics.set_counts, articles),
+        (metrics.set_values, articles),
+    ]
+
+
+def _file_version(path):
+    # Content hash, as export_cache computes it for downloads
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def export(source):
+    """
+    Local copy of an export given as URL or path
+    Returns: (path, dict with source, version and size)
+    """
+    if source.startswith(('http://', 'https://')):
+        meta = fetch_export(source)
+        return meta['path'], {'source': source, 'version': meta['version'], 'size': meta['size']}
+    return source, {'source': os.path.abspath(source), 'version': _file_version(source),
+                    'size': os.path.getsize(source)}
+
+
+def build(out, sources, keep=2, force=False, log=print):
+    """
+    Build and publish a snapshot of the exports in `sources` {dataset: URL or path}
+    force: rebuild even when a snapshot of these export versions exists
+    Returns: path of the published snapshot
+    """
+    root = Path(out)
+    root.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+
+    paths, exports = {}, {}
+    for dataset, source in sources.items():
+        paths[dataset], exports[dataset] = export(source)
+    tokens = {dataset: f"{dataset}-{meta['version']}" for dataset, meta in exports.items()}
+    existing = root / precomputed.snapshot_version(tokens)
+    if existing.exists() and not force:
+        # Still re-point CURRENT: the exports may be back to the versions of
+        # an older snapshot while a newer one is published
+        log(f"{existing.name} is up to date")
+        return precomputed.point_to(root, existing.name)
+
+    folder = precomputed.staging_dir(root)
+    try:
+        snapshots, cubes = {}, {}
+        for dataset, parse in PARSERS.items():
+            t = time.perf_counter()
+            df = parse(paths[dataset])
+            snapshots[dataset] = precomputed.write_dataset(folder, tokens[dataset], df, exports[dataset])
+            if dataset in ('orders', 'expenses'):
+                cubes[dataset] = data_loader.build_cube(snapshots[dataset], dataset)
+                precomputed.write_cube(snapshots[dataset], cubes[dataset])
+            log(f"{dataset:<10}{len(df):>12,} rows  {(time.perf_counter() - t) * 1000:>8,.0f} ms")
+
+        # The frames as the loaders hand them out in snapshot mode, same versions
+        t = time.perf_counter()
+        calls = plan(
+            orders=freeze(data_loader.read_model(snapshots['orders'], None, 'orders'), 'orders model', tokens['orders']),
+            articles=freeze(read_snapshot(snapshots['articles']), 'articles', tokens['articles']),
+            orders_cube=freeze(cubes['orders'], 'orders cube', tokens['orders']),
+            expenses_cube=freeze(cubes['expenses'], 'expenses cube', tokens['expenses']),
+        )
+        results = [metrics.evaluate(func, *args) for func, *args in calls]
+        index = precomputed.write_results(folder, results)
+        log(f"{'metrics':<10}{len(results):>12,} calls {(time.perf_counter() - t) * 1000:>8,.0f} ms")
+
+        path = precomputed.publish(folder, root, exports, tokens, index, keep=keep)
+    except BaseException:
+        shutil.rmtree(folder, ignore_errors=True)
+        raise
+
+    size = sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+    log(f"Published {path} ({size / 1e6:,.1f} MB) in {time.perf_counter() - started:,.1f} s")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--out', default=precomputed.SNAPSHOT_ROOT, required=not precomputed.SNAPSHOT_ROOT,
+                        help='snapshot folder (default: $MTG_SNAPSHOT)')
+    parser.add_argument('--orders', default=data_loader.ORDERS_CSV_URL)
+    parser.add_argument('--articles', default=data_loader.ARTICLES_CSV_URL)
+    parser.add_argument('--expenses', default=data_loader.EXPENSES_ODS_URL)
+    parser.add_argument('--keep', type=int, default=2, help='snapshots kept, the older ones are removed')
+    parser.add_argument('--force', action='store_true', help='rebuild even if the exports are unchanged')
+    args = parser.parse_args()
+
+    try:
+        build(args.out, {'orders': args.orders, 'articles': args.articles, 'expenses': args.expenses},
+              keep=args.keep, force=args.force)
+    except Exception as e:
+        sys.exit(f"Snapshot build failed: {e}")
+
+
+if __name__ == '__main__':
+    main()
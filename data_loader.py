@@ -2,9 +2,34 @@
 Data loader for CardMarket Dashboard
 Reads CSV files from public S3 bucket
 """
+import concurrent.futures
+import io
+import os
+import threading
+import time
+import warnings
+import weakref
+from collections import defaultdict
+from contextlib import contextmanager
+
 import pandas as pd
 import streamlit as st
 
+from export_cache import fetch_export, read_meta
+from figure_cache import evict_figures, figures_of
+from invalidation import cached_entries, dataset_of, invalidate, tracked, version_token
+import precomputed
+from readonly import freeze
+from revalidate import stale_while_revalidate
+from rollups import ORDER_SUM_COLUMNS, expenses_cube, orders_cube
+from schema import CSV_FORMATS, MONEY, SCHEMAS, apply_schema
+from snapshots import (
+    append_snapshot, ensure_snapshot, read_snapshot, read_snapshot_meta, snapshot_lock,
+    snapshot_path, write_snapshot,
+)
+import sql_backend
+from timing import cache_miss, timed
+
 # S3 Configuration - Public bucket, geen credentials nodig!
 BUCKET_NAME = "mtg-streamlit-dashboard-s3-bucket"
 PUBLIC_BASE_URL = f"https://{BUCKET_NAME}.s3.eu-central-1.amazonaws.com"
@@ -14,82 +39,549 @@ ORDERS_CSV_URL = f"{PUBLIC_BASE_URL}/public/exports/cardmarket_orders_data.csv"
 ARTICLES_CSV_URL = f"{PUBLIC_BASE_URL}/public/exports/cardmarket_articles_sold.csv"
 EXPENSES_ODS_URL = f"{PUBLIC_BASE_URL}/raw/monthly_expenses/Expenses.ods"
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def load_orders_data():
+# CSV parser for the exports: 'c' (pandas default) or 'pyarrow' (multi-threaded, opt-in)
+CSV_ENGINE = os.environ.get("MTG_CSV_ENGINE", "c")
+
+# Columns of the expenses workbook used by the dashboard
+EXPENSES_COLUMNS = ['Order_Date', 'Store_Name', 'Store_Country', 'Cost_Category', 'Item_Price', 'Description']
+
+# Calendar labels, in display order
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# Cold loads run on a small shared pool so the exports download and parse side by side
+LOAD_WORKERS = int(os.environ.get("MTG_LOAD_WORKERS", 3))
+# Seconds a cold load of each dataset may take before the page reports it
+LOAD_TIMEOUTS = {'orders': 60, 'articles': 60, 'expenses': 120}
+
+_pool = concurrent.futures.ThreadPoolExecutor(max_workers=LOAD_WORKERS, thread_name_prefix='load')
+_inflight = {}  # dataset -> (future, deadline) of its running cold load
+_inflight_lock = threading.Lock()
+_timings = {}   # dataset -> fetch / parse timings of its last load
+_resident = weakref.WeakValueDictionary()  # id -> shared frame a loader cache still holds
+
+
+def prefetch(*datasets):
+    """
+    Download and parse the exports of `datasets` ('orders', 'articles',
+    'expenses') concurrently, so a cold start waits for the slowest file
+    instead of the sum. Datasets that are already loaded cost nothing; a
+    failure is left for the loaders to report.
+    Returns: {dataset: timings} (see load_timings)
+    """
+    if precomputed.enabled():
+        # Snapshot mode: nothing to download or parse
+        return {name: {} for name in datasets}
+    jobs = {name: _submit(name) for name in datasets if _SNAPSHOTS[name].loaded_at() is None}
+    for name, job in jobs.items():
+        try:
+            _wait(name, job)
+        except Exception:
+            pass
+    return {name: load_timings().get(name, {}) for name in datasets}
+
+
+def load_timings():
+    """
+    Timings of the last load of each dataset
+    Returns: {dataset: dict with fetch_ms, parse_ms, status (of the export,
+             see export_cache.fetch_export) and loaded_at (epoch seconds)}
+    """
+    return {name: dict(timings) for name, timings in _timings.items()}
+
+
+def _shared(frame):
+    # Remember a frame handed out from st.cache_resource, for cached_frames();
+    # it drops out once the cache evicts it
+    _resident[id(frame)] = frame
+    return frame
+
+
+def cached_frames():
+    """
+    The shared frames the loaders hold right now: datasets (per column
+    projection), models and cubes. Nothing is loaded.
+    Returns: {dataset: [frame, ...]} for every dataset, [] when none of its
+             frames is loaded
+    """
+    frames = defaultdict(list)
+    for frame in list(_resident.values()):
+        frames[dataset_of(frame.version)].append(frame)
+    return {dataset: frames[dataset] for dataset in _SNAPSHOTS}
+
+
+@contextmanager
+def _timed(dataset, step):
+    start = time.perf_counter()
+    try:
+        with timed(f"{dataset} {step}"):
+            yield
+    finally:
+        _timings.setdefault(dataset, {})[f"{step}_ms"] = (time.perf_counter() - start) * 1000
+
+
+def _submit(dataset):
+    # One cold load per dataset at a time, later callers join the running one
+    with _inflight_lock:
+        job = _inflight.get(dataset)
+        if job is None or job[0].done():
+            job = (_pool.submit(_SNAPSHOTS[dataset]), time.monotonic() + LOAD_TIMEOUTS[dataset])
+            _inflight[dataset] = job
+        return job
+
+
+def _wait(dataset, job):
+    future, deadline = job
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except concurrent.futures.TimeoutError:
+        raise TimeoutError(
+            f"{dataset} took longer than {LOAD_TIMEOUTS[dataset]} s to download and parse, "
+            f"it keeps loading in the background"
+        ) from None
+
+
+def _snapshot(dataset):
+    """
+    Path of the current snapshot of `dataset`; a cold load runs on the pool
+    and raises TimeoutError after LOAD_TIMEOUTS[dataset]. In snapshot mode
+    it's the dataset in the precomputed snapshot (see precomputed.py).
+    """
+    if precomputed.enabled():
+        return precomputed.dataset_path(dataset)
+    snapshot = _SNAPSHOTS[dataset]
+    if snapshot.loaded_at() is not None:
+        return snapshot()
+    cache_miss()
+    return _wait(dataset, _submit(dataset))
+
+
+@timed('load_orders_data', cache=True)
+def load_orders_data(columns=None):
     """
     Load orders data from S3
+    columns: only read these columns from the snapshot (default: all)
     Returns: pandas DataFrame
     """
     try:
-        df = pd.read_csv(ORDERS_CSV_URL)
-        
-        # Convert Date of Purchase to datetime
-        df['Date of Purchase'] = pd.to_datetime(df['Date of Purchase'])
-        
-        # Convert numeric columns (handle European format)
-        numeric_columns = ['Merchandise Value', 'Shipment Costs', 'Total Value', 'Commission']
-        for col in numeric_columns:
-            if col in df.columns and df[col].dtype == 'object':
-                df[col] = df[col].str.replace(',', '.').astype(float)
-        
-        # Calculate net value
-        df['Net Value'] = df['Total Value'] - df['Commission']
-        
-        # Sort by date
-        df = df.sort_values('Date of Purchase')
-        
-        return df
+        return _read_snapshot(_snapshot('orders'), columns)
     except Exception as e:
         st.error(f"Error loading orders data: {str(e)}")
         st.error(f"Tried to load from: {ORDERS_CSV_URL}")
         return None
 
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def load_articles_data():
+@timed('load_orders_model', cache=True)
+def load_orders_model(columns=None):
+    """
+    Orders plus the derived columns the pages use: Month, MonthLabel, WeekDay,
+    MonthNum and MonthName (see add_calendar_columns), and when Net Value is
+    read, Cumulative Net
+    Built once per data version and shared by all sessions (read-only)
+    columns: raw columns to include (default: all), Date of Purchase is always read
+    Returns: pandas DataFrame
+    """
+    try:
+        return _model(_snapshot('orders'), columns, 'orders')
+    except Exception as e:
+        st.error(f"Error loading orders data: {str(e)}")
+        st.error(f"Tried to load from: {ORDERS_CSV_URL}")
+        return None
+
+
+@timed('load_orders_cube', cache=True)
+def load_orders_cube():
+    """
+    Orders rolled up per Month x Country (see rollups.orders_cube)
+    Built once per data version; KPI cards and charts read this instead of the orders
+    Returns: pandas DataFrame
+    """
+    try:
+        return _orders_cube(_snapshot('orders'))
+    except Exception as e:
+        st.error(f"Error loading orders data: {str(e)}")
+        st.error(f"Tried to load from: {ORDERS_CSV_URL}")
+        return None
+
+
+@tracked('path')
+@st.cache_resource(max_entries=4)  # Shared by all sessions, keyed by snapshot path (= content version)
+def _orders_cube(path):
+    cache_miss()
+    return _shared(freeze(build_cube(path, 'orders'), 'orders cube', os.path.basename(path)))
+
+
+def build_cube(path, dataset):
+    """
+    Cube of a dataset snapshot ('orders' or 'expenses', see rollups.py): the
+    one stored with it by build_snapshot.py, else rolled up from its rows, in
+    SQL with the DuckDB backend
+    """
+    cube = precomputed.read_cube(path)
+    if cube is not None:
+        return cube
+    if sql_backend.enabled():
+        return sql_backend.orders_cube(path) if dataset == 'orders' else sql_backend.expenses_cube(path)
+    if dataset == 'orders':
+        return orders_cube(read_snapshot(path, ['Date of Purchase', 'Country', *ORDER_SUM_COLUMNS]))
+    return expenses_cube(read_snapshot(path, ['Order_Date', 'Cost_Category', 'Store_Country', 'Item_Price']))
+
+
+@stale_while_revalidate()  # Shared by all sessions, revalidated against S3 in the background (see revalidate.py)
+def _orders_snapshot():
+    with _timed('orders', 'fetch'):
+        export = fetch_export(ORDERS_CSV_URL, incremental=True)
+    with _timed('orders', 'parse'):
+        path = str(_ingest_orders(export))
+    _timings['orders'].update(status=export['status'], loaded_at=time.time())
+    return path
+
+
+def _ingest_orders(export):
+    """
+    Bring the orders snapshot up to date with the local copy of the export
+    The orders export only grows. When new rows were appended after the last
+    ingested byte offset, only that tail is parsed and added to the previous
+    snapshot; anything else falls back to a full reload.
+    """
+    with snapshot_lock('orders'):
+        path = snapshot_path('orders', export['version'])
+        if path.exists():
+            return path
+
+        state = {}
+        if export.get('appended_from'):
+            state = read_snapshot_meta(snapshot_path('orders', export['previous_version']))
+        if state and state.get('offset') == export['appended_from']:
+            tail = _parse_orders(_read_tail(export['path'], export['appended_from']))
+            # New rows must come after what we have, otherwise the sort order breaks
+            if tail['Date of Purchase'].min() >= pd.Timestamp(state['last_date']):
+                try:
+                    return append_snapshot(
+                        tail, 'orders', export['version'], export['previous_version'],
+                        meta=_orders_state(tail, export, state),
+                    )
+                except (ValueError, TypeError, KeyError):
+                    pass  # columns changed, reload everything
+
+        df = _parse_orders(export['path'])
+        return write_snapshot(df, 'orders', export['version'], meta=_orders_state(df, export))
+
+
+def _orders_state(df, export, previous=None):
+    # Last ingested Date of Purchase and byte offset, used by the next incremental load
+    last_date = df['Date of Purchase'].max()
+    if previous:
+        last_date = max(last_date, pd.Timestamp(previous['last_date']))
+    return {
+        'offset': export['size'],
+        'last_date': last_date.isoformat(),
+        'rows': len(df) + (previous or {}).get('rows', 0),
+    }
+
+
+def _read_tail(path, offset):
+    # Header line plus everything after `offset`, as a CSV buffer
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(offset)
+        return io.BytesIO(header + f.read())
+
+
+def _read_csv(source, dataset, engine=None):
+    """
+    Read a CSV export with the dtypes of its schema, so there is no inference
+    pass, and with European decimals ('1,25') parsed by the reader itself
+    A malformed money cell doesn't fail the load: only the affected columns are
+    re-read as text and coerced, bad cells become NaN.
+    engine: 'c' or 'pyarrow' (default: CSV_ENGINE)
+    """
+    engine = engine or CSV_ENGINE
+    schema = SCHEMAS[dataset]
+    money = [c for c, t in schema.items() if t == MONEY]
+    # Dates are parsed afterwards, everything else straight into its final dtype
+    dtype = {c: 'str' if t.startswith('datetime') else t for c, t in schema.items()}
+
+    try:
+        return pd.read_csv(source, engine=engine, dtype=dtype, **CSV_FORMATS[dataset])
+    except ValueError:
+        pass
+
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    df = pd.read_csv(source, engine=engine, dtype={**dtype, **{c: 'str' for c in money}},
+                     **CSV_FORMATS[dataset])
+    for col in money:
+        if col not in df.columns or pd.api.types.is_float_dtype(df[col]):
+            continue
+        # Accept both '1,25' and '1.25', anything else is malformed
+        values = pd.to_numeric(df[col].str.replace(',', '.', regex=False), errors='coerce')
+        bad = int((values.isna() & df[col].notna()).sum())
+        if bad:
+            warnings.warn(f"{dataset}: {bad} malformed value(s) in {col!r} were read as NaN")
+        df[col] = values
+    return df
+
+
+def _parse_orders(source):
+    df = _read_csv(source, 'orders')
+    
+    # Convert Date of Purchase to datetime
+    df['Date of Purchase'] = pd.to_datetime(df['Date of Purchase'])
+    
+    # Calculate net value
+    df['Net Value'] = df['Total Value'] - df['Commission']
+    
+    # Sort by date
+    df = df.sort_values('Date of Purchase', kind='stable').reset_index(drop=True)
+    
+    return apply_schema(df, 'orders')
+
+
+@timed('load_articles_data', cache=True)
+def load_articles_data(columns=None):
     """
     Load articles data from S3
+    columns: only read these columns from the snapshot (default: all)
     Returns: pandas DataFrame
     """
     try:
-        df = pd.read_csv(ARTICLES_CSV_URL)
-        
-        # Convert card_prices (handle European format)
-        if 'card_prices' in df.columns and df['card_prices'].dtype == 'object':
-            df['card_prices'] = df['card_prices'].str.replace(',', '.').astype(float)
-        
-        return df
+        return _read_snapshot(_snapshot('articles'), columns)
     except Exception as e:
         st.error(f"Error loading articles data: {str(e)}")
         st.error(f"Tried to load from: {ARTICLES_CSV_URL}")
         return None
 
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def load_expenses_data():
+@stale_while_revalidate()  # Shared by all sessions, revalidated against S3 in the background (see revalidate.py)
+def _articles_snapshot():
+    with _timed('articles', 'fetch'):
+        export = fetch_export(ARTICLES_CSV_URL)
+    with _timed('articles', 'parse'):
+        path = str(ensure_snapshot('articles', export['version'], lambda: _parse_articles(export['path'])))
+    _timings['articles'].update(status=export['status'], loaded_at=time.time())
+    return path
+
+
+def _parse_articles(path):
+    df = _read_csv(path, 'articles')
+    
+    return apply_schema(df, 'articles')
+
+
+def _dataset_name(path):
+    return os.path.basename(path).rsplit('-', 1)[0]
+
+
+@tracked('path')
+@st.cache_resource(max_entries=8)  # Shared by all sessions, keyed by snapshot path (= content version) and columns
+def _read_snapshot(path, columns):
+    cache_miss()
+    return _shared(freeze(read_snapshot(path, columns), _dataset_name(path), os.path.basename(path)))
+
+
+@tracked('path')
+@st.cache_resource(max_entries=8)  # Shared by all sessions, keyed by snapshot path (= content version) and columns
+def _model(path, columns, dataset):
+    cache_miss()
+    return _shared(freeze(read_model(path, columns, dataset), f"{dataset} model", os.path.basename(path)))
+
+
+def read_model(path, columns, dataset):
+    """
+    A dataset snapshot plus the derived columns of its model (see
+    load_orders_model); the date column is always read
+    """
+    date_col = {'orders': 'Date of Purchase', 'expenses': 'Order_Date'}.get(dataset)
+    if columns is not None and date_col and date_col not in columns:
+        columns = [date_col, *columns]
+    df = read_snapshot(path, columns)
+
+    if date_col:
+        df = add_calendar_columns(df, date_col)
+    if dataset == 'orders' and 'Net Value' in df.columns:
+        df['Cumulative Net'] = df['Net Value'].cumsum()
+    return df
+
+
+@timed('calendar columns')
+def add_calendar_columns(df, date_col):
+    """
+    Add Month, MonthLabel, WeekDay, MonthNum and MonthName derived from `date_col`
+    Labels are categoricals built from the few unique months instead of
+    formatting every row with dt.strftime.
+    """
+    dates = df[date_col]
+    df['Month'] = dates.values.astype('datetime64[M]').astype('datetime64[ns]')
+
+    months = pd.DatetimeIndex(df['Month'].dropna().unique()).sort_values()
+    codes = pd.Categorical(df['Month'], categories=months).codes
+    df['MonthLabel'] = pd.Categorical.from_codes(codes, categories=months.strftime('%b %Y'), ordered=True)
+
+    weekday = dates.dt.dayofweek.fillna(-1).astype(int)
+    df['WeekDay'] = pd.Categorical.from_codes(weekday, categories=DAY_NAMES, ordered=True)
+    df['MonthNum'] = pd.to_numeric(dates.dt.month, downcast='integer')
+    month_num = df['MonthNum'].fillna(0).astype(int) - 1
+    df['MonthName'] = pd.Categorical.from_codes(month_num, categories=MONTH_NAMES, ordered=True)
+    return df
+
+
+@timed('load_expenses_data', cache=True)
+def load_expenses_data(columns=None):
     """
     Load monthly expenses data from S3 (ODS format)
+    The workbook is only parsed when its content changed, later loads read the snapshot
+    columns: only read these columns from the snapshot (default: all)
     Returns: pandas DataFrame
     """
     try:
-        df = pd.read_excel(EXPENSES_ODS_URL, engine='odf')
-        
-        # Convert Order_Date to datetime
-        df['Order_Date'] = pd.to_datetime(df['Order_Date'])
-        
-        # Sort by date
-        df = df.sort_values('Order_Date')
-        
-        return df
+        return _read_snapshot(_snapshot('expenses'), columns)
     except Exception as e:
         st.error(f"Error loading expenses data: {str(e)}")
         st.error(f"Tried to load from: {EXPENSES_ODS_URL}")
         return None
 
 
+@timed('load_expenses_model', cache=True)
+def load_expenses_model(columns=None):
+    """
+    Expenses plus the derived calendar columns of Order_Date (see add_calendar_columns)
+    Built once per data version and shared by all sessions (read-only)
+    Returns: pandas DataFrame
+    """
+    try:
+        return _model(_snapshot('expenses'), columns, 'expenses')
+    except Exception as e:
+        st.error(f"Error loading expenses data: {str(e)}")
+        st.error(f"Tried to load from: {EXPENSES_ODS_URL}")
+        return None
+
+
+@timed('load_expenses_cube', cache=True)
+def load_expenses_cube():
+    """
+    Expenses rolled up per Month x Cost_Category x Store_Country (see rollups.expenses_cube)
+    Built once per data version; the Costs filters and charts slice this instead of the rows
+    Returns: pandas DataFrame
+    """
+    try:
+        return _expenses_cube(_snapshot('expenses'))
+    except Exception as e:
+        st.error(f"Error loading expenses data: {str(e)}")
+        st.error(f"Tried to load from: {EXPENSES_ODS_URL}")
+        return None
+
+
+@tracked('path')
+@st.cache_resource(max_entries=4)  # Shared by all sessions, keyed by snapshot path (= content version)
+def _expenses_cube(path):
+    cache_miss()
+    return _shared(freeze(build_cube(path, 'expenses'), 'expenses cube', os.path.basename(path)))
+
+
+@stale_while_revalidate()  # Shared by all sessions, revalidated against S3 in the background (see revalidate.py)
+def _expenses_snapshot():
+    with _timed('expenses', 'fetch'):
+        export = fetch_export(EXPENSES_ODS_URL)
+    with _timed('expenses', 'parse'):
+        path = str(ensure_snapshot('expenses', export['version'], lambda: _parse_expenses(export['path'])))
+    _timings['expenses'].update(status=export['status'], loaded_at=time.time())
+    return path
+
+
+def _parse_expenses(path):
+    # odfpy is slow: read only the first sheet and the columns the dashboard uses
+    df = pd.read_excel(path, engine='odf', sheet_name=0, usecols=lambda c: c in EXPENSES_COLUMNS)
+    
+    # Convert Order_Date to datetime
+    df['Order_Date'] = pd.to_datetime(df['Order_Date'])
+    df['Item_Price'] = df['Item_Price'].astype(float)
+
+    # Text cells may hold numbers in the sheet, keep them as strings for the snapshot
+    for col in ['Store_Name', 'Store_Country', 'Cost_Category', 'Description']:
+        if col in df.columns:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+
+    # Sort by date
+    df = df.sort_values('Order_Date').reset_index(drop=True)
+    
+    return apply_schema(df, 'expenses')
+
+
+_SNAPSHOTS = {
+    'orders':   _orders_snapshot,
+    'articles': _articles_snapshot,
+    'expenses': _expenses_snapshot,
+}
+
+
+def refresh_dataset(dataset):
+    """
+    Check `dataset` against S3 again right away and evict everything cached
+    from it: its frames, models, rollups, histograms and figures. The other
+    datasets keep their caches.
+    In snapshot mode the CURRENT snapshot is read again instead.
+    Returns: number of cached entries and figures evicted
+    """
+    if precomputed.enabled():
+        precomputed.reload()
+    else:
+        _SNAPSHOTS[dataset].clear()
+    return invalidate(dataset) + evict_figures(dataset)
+
+
+def dataset_status():
+    """
+    Current version, age and size of each dataset; nothing is loaded or checked
+    Returns: list of dicts with dataset, version (token of the snapshot in use,
+             None before the first load), size (bytes of the export),
+             fetched_at (when this content was downloaded), checked_at (last
+             check against S3), loaded_at (epoch seconds) and cached (entries
+             and figures built from it)
+    """
+    if precomputed.enabled():
+        return _precomputed_status()
+    urls = {'orders': ORDERS_CSV_URL, 'articles': ARTICLES_CSV_URL, 'expenses': EXPENSES_ODS_URL}
+    status = []
+    for dataset, snapshot in _SNAPSHOTS.items():
+        meta = read_meta(urls[dataset]) or {}
+        path = snapshot.peek()
+        status.append({
+            'dataset': dataset,
+            'version': version_token(path) if path is not None else None,
+            'size': meta.get('size'),
+            'fetched_at': meta.get('fetched_at'),
+            'checked_at': meta.get('checked_at'),
+            'loaded_at': snapshot.loaded_at(),
+            'cached': cached_entries(dataset) + figures_of(dataset),
+        })
+    return status
+
+
+def _precomputed_status():
+    # Snapshot mode: everything comes from the build, nothing is checked against S3
+    bundle = precomputed.current()
+    return [
+        {
+            'dataset': dataset,
+            'version': token,
+            'size': bundle['exports'][dataset].get('size'),
+            'fetched_at': bundle['built_at'],
+            'checked_at': None,
+            'loaded_at': bundle['built_at'],
+            'cached': cached_entries(dataset) + figures_of(dataset),
+        }
+        for dataset, token in bundle['datasets'].items()
+    ]
+
+
 def refresh_data():
     """
-    Clear cache to force data refresh
+    Refresh every dataset (see refresh_dataset)
     """
-    st.cache_data.clear()
-    st.success("Data cache cleared! Reload the page to fetch fresh data.")
\ No newline at end of file
+    for dataset in _SNAPSHOTS:
+        refresh_dataset(dataset)
+    if precomputed.enabled():
+        st.success("Data cache cleared! The latest precomputed snapshot is read again.")
+    else:
+        st.success("Data cache cleared! Every dataset is fetched again from S3.")
@@ -0,0 +1,84 @@
+"""
+Downsampling of long time series for the charts
+A line with one point per order grows with the history; the browser only
+needs enough points to draw the shape. LTTB (Largest-Triangle-Three-Buckets)
+keeps the points that carry the shape: peaks, dips and steps.
+"""
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+
+# Points per trace sent to the browser
+MAX_POINTS = int(os.environ.get("MTG_MAX_POINTS", 2000))
+# Traces with more points than this are drawn with WebGL (go.Scattergl). Kept
+# above MAX_POINTS: a downsampled line is drawn as SVG, which plotly handles
+# well at that size; WebGL only takes over when the budget is raised past it.
+WEBGL_THRESHOLD = int(os.environ.get("MTG_WEBGL_THRESHOLD", 5000))
+
+
+def _numeric(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype('datetime64[ns]').view('i8')
+    return values.astype('float64')
+
+
+def lttb(x, y, n_out):
+    """
+    Positions of the `n_out` points LTTB keeps, first and last included
+    x: sorted, numeric or datetime; y: numeric
+    Returns: sorted numpy array of positions
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x, y = _numeric(x), _numeric(y)
+
+    # n_out - 2 buckets between the fixed first and last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    mean_x = np.add.reduceat(x[:-1], edges[:-1]) / sizes
+    mean_y = np.add.reduceat(y[:-1], edges[:-1]) / sizes
+    mean_x, mean_y = np.append(mean_x, x[-1]), np.append(mean_y, y[-1])
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Triangle of the last kept point, each candidate and the next bucket's mean
+        area = np.abs((x[a] - mean_x[i + 1]) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (mean_y[i + 1] - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(x, y, max_points=MAX_POINTS, x_range=None):
+    """
+    At most `max_points` points of the series, optionally only those inside
+    x_range = (start, end) plus one neighbour on each side so the line
+    reaches the edges of the window
+    x must be sorted. Returns: (x, y) as numpy arrays
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    if x_range is not None:
+        start, end = (np.asarray(v, dtype=x.dtype) for v in x_range)
+        lo = max(int(np.searchsorted(x, start, side='left')) - 1, 0)
+        hi = min(int(np.searchsorted(x, end, side='right')) + 1, len(x))
+        x, y = x[lo:hi], y[lo:hi]
+    keep = lttb(x, y, max_points)
+    return x[keep], y[keep]
+
+
+def time_series_trace(x, y, max_points=MAX_POINTS, x_range=None,
+                      webgl_threshold=WEBGL_THRESHOLD, **trace):
+    """
+    Scatter trace of the downsampled series; Scattergl when it still has
+    more than `webgl_threshold` points
+    trace: any other go.Scatter arguments (mode, line, fill, hovertemplate, ...)
+    """
+    x, y = downsample(x, y, max_points, x_range)
+    scatter = go.Scattergl if len(x) > webgl_threshold else go.Scatter
+    return scatter(x=x, y=y, **trace)
@@ -0,0 +1,199 @@
+"""
+On-disk cache for the S3 exports
+Keeps a local copy of every export together with its ETag/Last-Modified and
+revalidates it with a conditional GET, so an unchanged file costs one 304.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+# Cache directory - survives reruns and is reused on a cold start of the app
+CACHE_DIR = Path(os.environ.get("MTG_CACHE_DIR", Path.home() / ".cache" / "mtg-bi-suite"))
+REQUEST_TIMEOUT = 30  # seconds
+
+# Bytes re-read before the old end of file to check an export was only appended to
+APPEND_OVERLAP = 4096
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(url):
+    with _locks_guard:
+        return _locks.setdefault(url, threading.Lock())
+
+
+def local_path(url):
+    """
+    Path of the local copy of an export
+    """
+    return CACHE_DIR / url.rsplit('/', 1)[-1]
+
+
+def _meta_path(url):
+    path = local_path(url)
+    return path.with_name(path.name + '.meta.json')
+
+
+def _atomic_write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def read_meta(url):
+    """
+    Metadata of the local copy of an export, or None if there is no usable copy
+    """
+    try:
+        with open(_meta_path(url)) as f:
+            meta = json.load(f)
+        size = local_path(url).stat().st_size
+    except (OSError, ValueError):
+        return None
+    # An interrupted append leaves the copy out of step with its metadata
+    if size != meta.get('size'):
+        return None
+    return meta
+
+
+def _write_meta(url, meta):
+    _atomic_write(_meta_path(url), json.dumps(meta, indent=2).encode())
+
+
+def _get(url, headers, timeout):
+    request = urllib.request.Request(url, headers=headers)
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.status, response.read(), response.headers
+
+
+def _conditional_headers(meta):
+    headers = {}
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+    return headers
+
+
+def _store_download(url, body, headers):
+    path = local_path(url)
+    _atomic_write(path, body)
+    now = time.time()
+    meta = {
+        'url': url,
+        'path': str(path),
+        'version': hashlib.sha256(body).hexdigest()[:16],
+        'etag': headers.get('ETag'),
+        'last_modified': headers.get('Last-Modified'),
+        'size': len(body),
+        'fetched_at': now,
+        'checked_at': now,
+        'status': 'downloaded',
+    }
+    _write_meta(url, meta)
+    return meta
+
+
+def _fetch_appended(url, meta, timeout):
+    """
+    Extend the local copy with only the bytes appended to the export since
+    The request starts APPEND_OVERLAP bytes before the old end of file; those
+    bytes must come back unchanged, otherwise the export was rewritten.
+    Returns the new metadata, or None if a full download is needed
+    """
+    size = meta['size']
+    overlap = min(APPEND_OVERLAP, size)
+    with open(local_path(url), 'rb') as f:
+        f.seek(size - overlap)
+        known = f.read()
+    if not known.endswith(b'\n'):
+        return None
+
+    headers = {**_conditional_headers(meta), 'Range': f'bytes={size - overlap}-'}
+    try:
+        status, body, response_headers = _get(url, headers, timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 416:  # export is shorter than the local copy
+            return None
+        raise
+
+    if status == 200:  # server ignored the Range header and sent everything
+        return _store_download(url, body, response_headers)
+    content_range = response_headers.get('Content-Range', '')
+    if status != 206 or not content_range.startswith(f'bytes {size - overlap}-') or not body.startswith(known):
+        return None
+
+    tail = body[overlap:]
+    with open(local_path(url), 'ab') as f:
+        f.write(tail)
+    now = time.time()
+    meta = {
+        **meta,
+        'etag': response_headers.get('ETag'),
+        'last_modified': response_headers.get('Last-Modified'),
+        'checked_at': now,
+    }
+    if tail:
+        meta.update(
+            version=hashlib.sha256(meta['version'].encode() + tail).hexdigest()[:16],
+            previous_version=meta['version'],
+            appended_from=size,
+            size=size + len(tail),
+            fetched_at=now,
+            status='appended',
+        )
+    else:
+        meta['status'] = 'not-modified'
+    _write_meta(url, meta)
+    return meta
+
+
+def fetch_export(url, timeout=REQUEST_TIMEOUT, incremental=False):
+    """
+    Make sure the local copy of an export is up to date
+    Sends If-None-Match / If-Modified-Since when a copy exists, so an unchanged
+    export is answered with a 304 and never downloaded again. If S3 can't be
+    reached the existing copy is used as is.
+    incremental: the export only grows, fetch just the new tail with a Range
+                 request. Falls back to a full download when the file was
+                 rewritten or the server doesn't support ranges.
+    Returns: dict with path, version (content hash), etag, last_modified, size,
+             fetched_at, checked_at and status ('downloaded', 'appended',
+             'not-modified' or 'offline'). An appended copy also has
+             appended_from (old size in bytes) and previous_version.
+    """
+    with _lock_for(url):
+        meta = read_meta(url)
+        headers = _conditional_headers(meta) if meta is not None else {}
+
+        try:
+            if incremental and meta is not None:
+                appended = _fetch_appended(url, meta, timeout)
+                if appended is not None:
+                    return appended
+                # Rewritten rather than appended: download it again from scratch
+                headers = {}
+            status, body, headers = _get(url, headers, timeout)
+        except urllib.error.HTTPError as e:
+            if meta is None:
+                raise
+            if e.code == 304:
+                meta.update(status='not-modified', checked_at=time.time())
+                _write_meta(url, meta)
+                return meta
+            return {**meta, 'status': 'offline'}
+        except OSError:
+            # URLError, timeouts, DNS failures: fall back to the disk copy
+            if meta is None:
+                raise
+            return {**meta, 'status': 'offline'}
+
+        return _store_download(url, body, headers)
@@ -0,0 +1,170 @@
+"""
+Cache of built Plotly figures, shared by all sessions
+A figure is stored as its JSON, keyed by the version of the data it was built
+from, a chart id and the parameters that change it. A hit skips both the
+aggregation and the Plotly build; only the (cheap) JSON decode remains.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from invalidation import dataset_of
+from timing import cache_miss, timed
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library json is the fallback
+    orjson = None
+
+MAX_FIGURES = int(os.environ.get("MTG_FIGURE_CACHE_SIZE", 256))
+
+
+def fingerprint(df):
+    """
+    Identifies the content of `df`: the snapshot version of a shared frame,
+    otherwise a hash of its values (for frames derived on the page)
+    """
+    version = getattr(df, 'version', None)
+    if version is not None:
+        return version
+    return f"{len(df)}:{pd.util.hash_pandas_object(df, index=True).sum():x}"
+
+
+def _dumps(fig):
+    return pio.to_json(fig, validate=False, engine="orjson" if orjson else "json")
+
+
+def _loads(text):
+    # The JSON came from a figure Plotly built itself, validating it again is wasted work
+    return go.Figure(orjson.loads(text) if orjson else json.loads(text), _validate=False)
+
+
+class FigureCache:
+    """
+    LRU cache of figure JSON with hit / miss counters
+    """
+
+    def __init__(self, max_entries=MAX_FIGURES):
+        self.max_entries = max_entries
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key, build):
+        """
+        The figure stored under `key`, or build(), store and return it
+        """
+        with self._lock:
+            text = self._figures.get(key)
+            if text is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+        if text is not None:
+            with timed('plotly decode'):
+                return _loads(text)
+
+        cache_miss()
+        with timed('plotly build'):
+            fig = build()
+        with timed('plotly serialize'):
+            text = _dumps(fig)
+        with self._lock:
+            self.misses += 1
+            self._figures[key] = text
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return fig
+
+    def stats(self):
+        """
+        Returns: dict with entries, max_entries, bytes, hits, misses and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._figures),
+                'max_entries': self.max_entries,
+                'bytes': sum(len(t) for t in self._figures.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+            self.hits = self.misses = 0
+
+    def evict(self, match):
+        """
+        Drop the figures whose key satisfies match(key)
+        Returns: number of figures dropped
+        """
+        with self._lock:
+            keys = [key for key in self._figures if match(key)]
+            for key in keys:
+                del self._figures[key]
+        return len(keys)
+
+    def count(self, match):
+        with self._lock:
+            return sum(1 for key in self._figures if match(key))
+
+
+_cache = FigureCache()
+
+
+def cached_figure(chart_id, build, *frames, **params):
+    """
+    Figure `chart_id` built by build(), reused while its inputs are unchanged
+    frames: the data the figure is built from (see fingerprint)
+    params: anything else that changes the figure, e.g. the selected filters
+    Returns: plotly Figure
+    """
+    key = (
+        chart_id,
+        tuple(fingerprint(df) for df in frames),
+        json.dumps(params, sort_keys=True, default=str),
+    )
+    with timed(chart_id, cache=True):
+        return _cache.get(key, build)
+
+
+def figure_cache_stats():
+    """
+    Counters of the shared figure cache (see FigureCache.stats)
+    """
+    return _cache.stats()
+
+
+def _built_from(dataset):
+    # Keys hold the fingerprints of their frames; shared frames use their version token
+    return lambda key: any(dataset_of(fp) == dataset for fp in key[1])
+
+
+def figures_of(dataset):
+    """
+    Number of cached figures built from `dataset`
+    """
+    return _cache.count(_built_from(dataset))
+
+
+def evict_figures(dataset):
+    """
+    Drop the cached figures built from any version of `dataset`
+    Returns: number of figures dropped
+    """
+    return _cache.evict(_built_from(dataset))
+
+
+def clear_figure_cache():
+    """
+    Drop every cached figure and reset the counters
+    """
+    _cache.clear()
@@ -0,0 +1,97 @@
+"""
+Per-dataset cache invalidation
+Everything cached from a dataset is keyed by its version token, the name of
+the snapshot it was read from: '<dataset>-<content hash>'. The cached
+functions register their entries here under that token, so refreshing one
+dataset evicts only what was built from it and leaves the others warm.
+"""
+import functools
+import inspect
+import os
+import threading
+from collections import OrderedDict
+
+# cached function -> {hashable key: (args, version token)}, least recently used
+# first and capped at the cache's max_entries, so it evicts what the cache does
+_entries = {}
+_lock = threading.Lock()
+
+
+def version_token(value):
+    """
+    Version token of a snapshot path or frame version
+    """
+    return os.path.basename(str(value))
+
+
+def dataset_of(token):
+    """
+    Dataset a version token belongs to, e.g. 'orders' for 'orders-3f2a...'
+    """
+    return str(token).rsplit('-', 1)[0]
+
+
+def tracked(version_arg):
+    """
+    Decorator for an st.cache_data / st.cache_resource function, placed above
+    the cache decorator, that records every entry under the version token in
+    argument `version_arg` (a snapshot path or a frame version)
+    Arguments starting with an underscore aren't part of the cache key and
+    aren't kept.
+    """
+    def wrap(cached):
+        signature = inspect.signature(cached)
+        max_entries = getattr(getattr(cached, '_info', None), 'max_entries', None)
+        entries = _entries[cached] = OrderedDict()
+
+        @functools.wraps(cached)
+        def call(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            key = tuple(None if name.startswith('_') else value for name, value in bound.arguments.items())
+            token = version_token(bound.arguments[version_arg])
+            hashed = _hashable(key)
+            with _lock:
+                entries[hashed] = (key, token)
+                entries.move_to_end(hashed)
+                if max_entries is not None and len(entries) > max_entries:
+                    entries.popitem(last=False)
+            return cached(*args, **kwargs)
+
+        call.clear = cached.clear
+        return call
+    return wrap
+
+
+def _hashable(key):
+    # Arguments such as lists of countries can't be hashed; their repr can
+    try:
+        hash(key)
+        return key
+    except TypeError:
+        return repr(key)
+
+
+def cached_entries(dataset):
+    """
+    Number of cached entries built from any version of `dataset`
+    """
+    with _lock:
+        return sum(dataset_of(token) == dataset for entries in _entries.values() for _, token in entries.values())
+
+
+def invalidate(dataset):
+    """
+    Evict every cached entry built from any version of `dataset`
+    Returns: number of entries evicted
+    """
+    calls = []
+    with _lock:
+        for cached, entries in _entries.items():
+            for hashed, (key, token) in list(entries.items()):
+                if dataset_of(token) == dataset:
+                    calls.append((cached, key))
+                    del entries[hashed]
+    for cached, key in calls:
+        cached.clear(*key)
+    return len(calls)
+
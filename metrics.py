@@ -0,0 +1,485 @@
+"""
+Every aggregate the dashboard pages show, as functions over DataFrames
+The pages only lay out what these return. A metric takes the frame it
+summarises (the shared model or cube from data_loader) plus plain arguments
+and returns a small frame, Series or dict. Shared frames are answered per data
+version (see readonly.freeze), so the work is done once for all sessions and
+evicted with the dataset it was built from (see invalidation.py); any other
+frame is computed directly. In snapshot mode the results precomputed by
+build_snapshot.py are used instead (see precomputed.py); with the DuckDB
+backend the metrics that scan every row run as SQL on the snapshot files the
+frame was read from (see sql_backend.py). Nothing here draws, so the same
+functions run in benchmarks and offline builds.
+"""
+import functools
+import inspect
+
+import pandas as pd
+import streamlit as st
+
+from binning import (
+    PRICE_BUCKET_BINS, PRICE_BUCKET_LABELS, VALUE_BUCKET_BINS, VALUE_BUCKET_LABELS, bucket_counts, histogram,
+)
+from invalidation import tracked
+import precomputed
+from readonly import freeze
+from rollups import rollup
+import sql_backend
+from timeseries import cumulative_by_group
+from timing import cache_miss, timed
+
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+_metrics = {}  # name -> uncached function
+_reads = {}  # name -> the columns the metric declared it reads (see metric)
+
+
+@tracked('version')
+@st.cache_data(max_entries=256)  # Keyed by data version, metric, columns and arguments; the frame itself isn't hashed
+def _memoized(version, name, columns, args, _df):
+    cache_miss()
+    # The SQL runs on the whole snapshot, so only for frames with every column the metric reads
+    if sql_backend.enabled() and name in sql_backend.QUERIES and set(_reads.get(name, ())) <= set(columns):
+        return sql_backend.QUERIES[name](sql_backend.snapshot_dir(version), *args)
+    return _metrics[name](_project(name, _df, columns), *args)
+
+
+def metric(func=None, reads=None):
+    """
+    Decorator registering func(df, ...) as a metric, memoized per data version
+    and columns of df (or taken from the precomputed snapshot) and timed as its
+    own stage; func.compute is the uncached function
+    reads: the columns of df the metric uses, as @metric(reads=[...]); it gets
+           df with only those of them df has, so frames that differ in other
+           columns share its results
+    """
+    if func is None:
+        return functools.partial(metric, reads=reads)
+    name = func.__name__
+    _metrics[name] = func
+    if reads is not None:
+        _reads[name] = tuple(reads)
+
+    @functools.wraps(func)
+    def call(*args, **kwargs):
+        df, rest = _arguments(func, args, kwargs)
+        version = getattr(df, 'version', None)
+        with timed(name, cache=version is not None):
+            if version is None:
+                return func(df, *rest)
+            columns = _columns(name, df)
+            value = precomputed.lookup(name, version, columns, rest)
+            if value is not precomputed.MISSING:
+                return value
+            return _memoized(version, name, columns, rest, df)
+
+    call.compute = func
+    return call
+
+
+def _columns(name, df):
+    # The columns a result depends on: those the metric reads, in declared
+    # order, or all of them
+    if name in _reads:
+        return tuple(c for c in _reads[name] if c in df.columns)
+    return tuple(df.columns)
+
+
+def _project(name, df, columns):
+    # df with only the columns the metric reads, still frozen and versioned
+    if name not in _reads:
+        return df
+    return freeze(df[list(columns)], getattr(df, 'dataset', None), getattr(df, 'version', None))
+
+
+def _arguments(func, args, kwargs):
+    # The frame and the other arguments in signature order, defaults filled in,
+    # so f(df, 6) and f(df, n=6) share their results
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    df, *rest = bound.arguments.values()
+    return df, tuple(rest)
+
+
+def evaluate(metric_func, *args, **kwargs):
+    """
+    Compute a metric call without any cache, for build_snapshot.py
+    Returns: ((name, data version, columns, arguments), result), keyed as the
+             metric looks it up in snapshot mode
+    """
+    name = metric_func.__name__
+    df, rest = _arguments(metric_func.compute, args, kwargs)
+    columns = _columns(name, df)
+    return (name, getattr(df, 'version', None), columns, rest), metric_func.compute(_project(name, df, columns), *rest)
+
+
+# ── Orders Overview ───────────────────────────────────────────────────────────
+@metric
+def monthly_revenue(cube):
+    """
+    Orders and net revenue per month, from the orders cube
+    Returns: DataFrame with Month, Orders, Net_Revenue and MonthLabel ('Jan 2024')
+    """
+    monthly = (
+        rollup(cube, 'Month')
+        .rename(columns={'Net Value': 'Net_Revenue'})
+        [['Month', 'Orders', 'Net_Revenue']]
+    )
+    monthly['MonthLabel'] = monthly['Month'].dt.strftime('%b %Y')
+    return monthly
+
+
+@metric
+def order_kpis(cube):
+    """
+    KPI cards of the orders, from the orders cube
+    Returns: dict with orders, gross, commission, net, commission_pct,
+             avg_order, orders_per_month, best_month, best_month_net and the
+             change of net revenue from the month before the last
+             (revenue_delta, revenue_delta_pct)
+    """
+    totals = rollup(cube)
+    monthly = monthly_revenue.compute(cube)
+    revenue_delta = revenue_delta_pct = 0
+    if len(monthly) >= 2:
+        last, prev = monthly['Net_Revenue'].iloc[-1], monthly['Net_Revenue'].iloc[-2]
+        revenue_delta = last - prev
+        revenue_delta_pct = (revenue_delta / prev * 100) if prev else 0
+    best = monthly.loc[monthly['Net_Revenue'].idxmax()]
+    return {
+        'orders': totals['Orders'],
+        'gross': totals['Total Value'],
+        'commission': totals['Commission'],
+        'net': totals['Net Value'],
+        'commission_pct': (totals['Commission'] / totals['Total Value'] * 100) if totals['Total Value'] else 0,
+        'avg_order': totals['Net Value'] / totals['Orders'],
+        'orders_per_month': monthly['Orders'].mean(),
+        'best_month': best['MonthLabel'],
+        'best_month_net': best['Net_Revenue'],
+        'revenue_delta': revenue_delta,
+        'revenue_delta_pct': revenue_delta_pct,
+    }
+
+
+@metric
+def revenue_breakdown(cube):
+    """
+    Net revenue vs. commission, from the orders cube
+    Returns: DataFrame with Component and Value
+    """
+    totals = rollup(cube)
+    return pd.DataFrame({
+        'Component': ['Net Revenue (Merchandise + Shipping)', 'Commission'],
+        'Value':     [round(totals['Net Value'], 2), round(totals['Commission'], 2)],
+    })
+
+
+@metric(reads=['name', 'card_prices'])
+def article_kpis(articles):
+    """
+    KPI cards of the sold singles
+    Returns: dict with sold, revenue, avg_price, median_price and the highest
+             sale (top_price and top_name, None / '' without articles)
+    """
+    prices = articles['card_prices']
+    top = articles.loc[prices.idxmax()] if not articles.empty else None
+    return {
+        'sold': len(articles),
+        'revenue': prices.sum(),
+        'avg_price': prices.mean(),
+        'median_price': prices.median(),
+        'top_price': top['card_prices'] if top is not None else None,
+        'top_name': top['name'] if top is not None and 'name' in top else '',
+    }
+
+
+@metric(reads=['card_prices'])
+def price_histogram(articles, bins=30):
+    """
+    Card prices in `bins` equal-width bins
+    Returns: DataFrame with Left, Right and Count
+    """
+    return histogram(articles, 'card_prices', bins=bins)
+
+
+@metric(reads=['card_prices'])
+def price_buckets(articles):
+    """
+    Cards sold per price range
+    Returns: DataFrame with Bucket and Count
+    """
+    return bucket_counts(articles, 'card_prices', PRICE_BUCKET_BINS, PRICE_BUCKET_LABELS)
+
+
+# ── Analytics ─────────────────────────────────────────────────────────────────
+@metric
+def country_totals(cube):
+    """
+    Orders and money per country, most orders first, from the orders cube
+    Returns: DataFrame indexed by Country with Orders and the cube's sums
+    """
+    return (
+        rollup(cube, 'Country')
+        .sort_values('Orders', ascending=False, kind='stable')
+        .set_index('Country')
+    )
+
+
+@metric
+def top_country_names(cube, n=6):
+    """
+    The `n` countries with the most orders
+    Returns: list of country names
+    """
+    return country_totals.compute(cube).head(n).index.tolist()
+
+
+@metric
+def country_kpis(cube, n=4):
+    """
+    Cards of the `n` countries with the most orders
+    Returns: DataFrame with Country, Orders, Share (% of all orders) and Revenue (net)
+    """
+    by_country = country_totals.compute(cube)
+    top = by_country.head(n)
+    return pd.DataFrame({
+        'Country': top.index,
+        'Orders': top['Orders'].to_numpy(),
+        'Share': (top['Orders'] / by_country['Orders'].sum() * 100).to_numpy(),
+        'Revenue': top['Net Value'].round(2).to_numpy(),
+    })
+
+
+@metric
+def country_map(cube):
+    """
+    Orders and net revenue per country for the choropleth
+    Returns: DataFrame with Country, order_count and net_revenue
+    """
+    country_data = (
+        country_totals.compute(cube)[['Orders', 'Net Value']]
+        .rename(columns={'Orders': 'order_count', 'Net Value': 'net_revenue'})
+        .reset_index()
+    )
+    country_data['net_revenue'] = country_data['net_revenue'].round(2)
+    return country_data
+
+
+@metric
+def country_revenue(cube):
+    """
+    Net revenue per country, largest first
+    Returns: DataFrame with Country and Net Value
+    """
+    return (
+        country_totals.compute(cube)['Net Value']
+        .round(2).reset_index()
+        .sort_values('Net Value', ascending=False)
+    )
+
+
+@metric
+def monthly_country_revenue(cube, countries):
+    """
+    Orders and net revenue per month of `countries`
+    Returns: DataFrame with Month, Country, Orders, Revenue and MonthLabel
+    """
+    monthly = (
+        cube[cube['Country'].isin(countries)][['Month', 'Country', 'Orders', 'Net Value']]
+        .rename(columns={'Net Value': 'Revenue'})
+    )
+    monthly['Revenue'] = monthly['Revenue'].round(2)
+    monthly['MonthLabel'] = monthly['Month'].dt.strftime('%b %Y')
+    return monthly
+
+
+@metric(reads=['Date of Purchase', 'Country'])
+def country_cumulative_orders(orders, countries):
+    """
+    Running number of orders per country over time, for `countries`
+    Returns: DataFrame with Date of Purchase, Country and Cumulative Orders
+    """
+    return cumulative_by_group(orders, 'Date of Purchase', 'Country', groups=countries, name='Cumulative Orders')
+
+
+@metric(reads=['WeekDay'])
+def weekday_orders(orders):
+    """
+    Orders per day of the week, Monday first
+    Returns: DataFrame with Day and Orders
+    """
+    counts = orders['WeekDay'].value_counts().reindex(DAY_ORDER).reset_index()
+    counts.columns = ['Day', 'Orders']
+    return counts
+
+
+@metric(reads=['Net Value'])
+def value_buckets(orders):
+    """
+    Orders per net value bracket
+    Returns: DataFrame with Bucket and Count
+    """
+    return bucket_counts(orders, 'Net Value', VALUE_BUCKET_BINS, VALUE_BUCKET_LABELS)
+
+
+@metric(reads=['card_rarities', 'card_prices'])
+def rarity_stats(articles):
+    """
+    Cards sold, revenue and average price per rarity, highest revenue first
+    Returns: DataFrame with card_rarities, Count, Total and Avg
+    """
+    return (
+        articles.groupby('card_rarities', observed=True)
+        .agg(Count=('card_prices', 'count'), Total=('card_prices', 'sum'), Avg=('card_prices', 'mean'))
+        .round(2)
+        .sort_values('Total', ascending=False).reset_index()
+    )
+
+
+@metric(reads=['set_names', 'card_prices'])
+def set_stats(articles):
+    """
+    Cards sold, revenue and average price per set
+    Returns: DataFrame with set_names, Cards_Sold, Total_Revenue and Avg_Price
+    """
+    return (
+        articles.groupby('set_names', observed=True)
+        .agg(Cards_Sold=('card_prices', 'count'),
+             Total_Revenue=('card_prices', 'sum'),
+             Avg_Price=('card_prices', 'mean'))
+        .round(2)
+        .reset_index()
+    )
+
+
+# ── Costs ─────────────────────────────────────────────────────────────────────
+# Filtered on the expenses cube: a few hundred cells, however long the ledger gets
+def _select(cube, categories, countries):
+    return cube[cube['Cost_Category'].isin(categories) & cube['Store_Country'].isin(countries)]
+
+
+@metric
+def expense_dimensions(cube):
+    """
+    The cost categories and store countries to filter on
+    Returns: (sorted categories, sorted countries)
+    """
+    return sorted(cube['Cost_Category'].unique()), sorted(cube['Store_Country'].unique())
+
+
+@metric
+def cost_kpis(cube, categories, countries):
+    """
+    KPI cards of the expenses in `categories` and `countries`
+    Returns: dict with total_spend, transactions, avg_transaction (NaN without
+             any), top_category ('—' without any), top_category_spend and
+             active_months
+    """
+    sel = _select(cube, categories, countries)
+    totals = rollup(sel)
+    by_category = rollup(sel, 'Cost_Category')
+    count = int(totals['Transactions'])
+    return {
+        'total_spend': totals['Item_Price'],
+        'transactions': count,
+        'avg_transaction': totals['Item_Price'] / count if count else float('nan'),
+        'top_category': by_category.loc[by_category['Item_Price'].idxmax(), 'Cost_Category'] if not sel.empty else "—",
+        'top_category_spend': by_category['Item_Price'].max() if not sel.empty else 0,
+        'active_months': sel['Month'].nunique(),
+    }
+
+
+@metric
+def category_spend(cube, categories, countries):
+    """
+    Spend per cost category
+    Returns: DataFrame with Cost_Category, Transactions and Item_Price
+    """
+    return rollup(_select(cube, categories, countries), 'Cost_Category')
+
+
+@metric
+def monthly_spend(cube, categories, countries):
+    """
+    Spend per month and cost category
+    Returns: DataFrame with Month, Cost_Category, Transactions and Item_Price
+    """
+    return rollup(_select(cube, categories, countries), ['Month', 'Cost_Category'])
+
+
+@metric
+def country_spend(cube, categories, countries):
+    """
+    Spend per store country and cost category
+    Returns: DataFrame with Store_Country, Cost_Category, Transactions and Item_Price
+    """
+    return rollup(_select(cube, categories, countries), ['Store_Country', 'Cost_Category'])
+
+
+@metric
+def spend_heatmap(cube, categories, countries):
+    """
+    Spend as a month x category grid
+    Returns: DataFrame indexed by month label ('Jan 2024'), one column per category
+    """
+    # Months come out of the rollup in order, only the labels need formatting
+    pivot = (
+        rollup(_select(cube, categories, countries), ['Month', 'Cost_Category'])
+        .set_index(['Month', 'Cost_Category'])['Item_Price']
+        .unstack(fill_value=0)
+    )
+    pivot.index = pivot.index.strftime('%b %Y')
+    return pivot
+
+
+def transactions(expenses, categories, countries):
+    """
+    The expense rows in `categories` and `countries` (row-sized, so not memoized)
+    With the DuckDB backend the filter runs on the snapshot the frame was read from
+    """
+    version = getattr(expenses, 'version', None)
+    if version is not None and sql_backend.enabled():
+        return sql_backend.transactions(sql_backend.snapshot_dir(version), categories, countries,
+                                        list(expenses.columns))
+    return expenses[expenses['Cost_Category'].isin(categories) & expenses['Store_Country'].isin(countries)]
+
+
+# ── Sold Articles ─────────────────────────────────────────────────────────────
+@metric(reads=['card_prices', 'set_names'])
+def sold_kpis(articles):
+    """
+    Key metrics of the sold articles
+    Returns: dict with sold, revenue and unique_sets
+    """
+    return {
+        'sold': len(articles),
+        'revenue': articles['card_prices'].sum(),
+        'unique_sets': articles['set_names'].nunique(),
+    }
+
+
+@metric(reads=['card_rarities'])
+def rarity_counts(articles):
+    """
+    Articles sold per rarity, most first
+    Returns: Series indexed by card_rarities
+    """
+    return articles['card_rarities'].value_counts()
+
+
+@metric(reads=['set_names'])
+def set_counts(articles):
+    """
+    Cards sold per set
+    Returns: DataFrame with set_names and count
+    """
+    return articles.groupby('set_names', observed=True).size().reset_index(name='count')
+
+
+@metric(reads=['set_names', 'card_prices'])
+def set_values(articles):
+    """
+    Total value of the cards sold per set
+    Returns: DataFrame with set_names and total_value
+    """
+    return articles.groupby('set_names', observed=True)['card_prices'].sum().reset_index(name='total_value')
@@ -6,10 +6,16 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
-from data_loader import load_articles_data, load_orders_data
+from data_loader import load_articles_data, load_orders_cube, load_orders_model, prefetch
+from downsample import time_series_trace
+from figure_cache import cached_figure
+from metrics import article_kpis, monthly_revenue, order_kpis, price_buckets, price_histogram, revenue_breakdown
+from tables import paginated_table
+from timing import end_page, start_page
 
 # ── Page config ───────────────────────────────────────────────────────────────
 st.set_page_config(page_title="Orders Overview", page_icon="📊", layout="wide")
+start_page("Orders Overview")
 
 # ── Palette ───────────────────────────────────────────────────────────────────
 BG        = '#f0f8f8'   # very light teal-white — blends with white Streamlit bg
@@ -109,10 +115,13 @@ PLOTLY_BASE = dict(
 M = dict(l=0, r=0, t=10, b=0)
 
 # ── Load data ─────────────────────────────────────────────────────────────────
-df          = load_orders_data()
-articles_df = load_articles_data()
+# Download and parse both exports at once on a cold start, not one after the other
+prefetch('orders', 'articles')
+df          = load_orders_model(columns=['Date of Purchase', 'Total Value', 'Commission', 'Net Value'])
+articles_df = load_articles_data(columns=['name', 'card_prices'])
+cube        = load_orders_cube()
 
-if df is None or df.empty:
+if df is None or df.empty or cube is None:
     st.error("Could not load orders data.")
     st.stop()
 
@@ -121,25 +130,9 @@ if articles_df is None or articles_df.empty:
     st.stop()
 
 # ── Prep ──────────────────────────────────────────────────────────────────────
-df['Date of Purchase'] = pd.to_datetime(df['Date of Purchase'])
-df['Month']            = df['Date of Purchase'].dt.to_period('M').dt.to_timestamp()
-df['MonthLabel']       = df['Date of Purchase'].dt.strftime('%b %Y')
-df['Cumulative Net']   = df['Net Value'].cumsum()
-
-monthly = (
-    df.groupby('Month')
-    .agg(Orders=('Net Value', 'count'), Net_Revenue=('Net Value', 'sum'))
-    .reset_index()
-)
-monthly['MonthLabel'] = monthly['Month'].dt.strftime('%b %Y')
-
-if len(monthly) >= 2:
-    last_rev  = monthly.iloc[-1]['Net_Revenue']
-    prev_rev  = monthly.iloc[-2]['Net_Revenue']
-    rev_delta = last_rev - prev_rev
-    rev_pct   = (rev_delta / prev_rev * 100) if prev_rev else 0
-else:
-    rev_delta = rev_pct = 0
+# KPI cards and monthly charts are answered from the Month x Country cube (see metrics.py)
+kpis    = order_kpis(cube)
+monthly = monthly_revenue(cube)
 
 # ── Page header ───────────────────────────────────────────────────────────────
 st.markdown(
@@ -159,10 +152,7 @@ st.markdown('<div class="section-header">Orders</div>', unsafe_allow_html=True)
 
 k1, k2, k3, k4, k5 = st.columns(5)
 
-commission_pct = (df['Commission'].sum() / df['Total Value'].sum() * 100) if df['Total Value'].sum() else 0
-avg_order_val  = df['Net Value'].mean()
-best_month_row = monthly.loc[monthly['Net_Revenue'].idxmax()]
-
+rev_delta, rev_pct = kpis['revenue_delta'], kpis['revenue_delta_pct']
 delta_html = (
     f"<div class='delta-pos'>▲ €{rev_delta:,.2f} ({rev_pct:.1f}%) vs prev month</div>"
     if rev_delta >= 0 else
@@ -170,11 +160,11 @@ delta_html = (
 )
 
 for col, label, val, sub in [
-    (k1, "Total Orders",     f"{len(df):,}",                        f"{monthly['Orders'].mean():.1f} avg / month"),
-    (k2, "Gross Revenue",    f"€{df['Total Value'].sum():,.2f}",    "incl. shipping"),
-    (k3, "Total Commission", f"€{df['Commission'].sum():,.2f}",     f"{commission_pct:.1f}% of gross"),
-    (k4, "Net Revenue",      f"€{df['Net Value'].sum():,.2f}",      f"avg €{avg_order_val:.2f} / order"),
-    (k5, "Best Month",       best_month_row['MonthLabel'],          f"€{best_month_row['Net_Revenue']:,.2f} net"),
+    (k1, "Total Orders",     f"{kpis['orders']:,.0f}",              f"{kpis['orders_per_month']:.1f} avg / month"),
+    (k2, "Gross Revenue",    f"€{kpis['gross']:,.2f}",              "incl. shipping"),
+    (k3, "Total Commission", f"€{kpis['commission']:,.2f}",         f"{kpis['commission_pct']:.1f}% of gross"),
+    (k4, "Net Revenue",      f"€{kpis['net']:,.2f}",                f"avg €{kpis['avg_order']:.2f} / order"),
+    (k5, "Best Month",       kpis['best_month'],                    f"€{kpis['best_month_net']:,.2f} net"),
 ]:
     col.markdown(f"""
     <div class="metric-card">
@@ -190,16 +180,15 @@ st.markdown('<div class="section-header">Singles Sold</div>', unsafe_allow_html=
 
 a1, a2, a3, a4 = st.columns(4)
 
-median_price = articles_df['card_prices'].median()
-top_card     = articles_df.loc[articles_df['card_prices'].idxmax()] if not articles_df.empty else None
+singles = article_kpis(articles_df)
 
 for col, label, val, sub in [
-    (a1, "Singles Sold",     f"{len(articles_df):,}",                       "individual cards"),
-    (a2, "Articles Revenue", f"€{articles_df['card_prices'].sum():,.2f}",   "total card value"),
-    (a3, "Avg Card Price",   f"€{articles_df['card_prices'].mean():,.2f}",  f"median €{median_price:.2f}"),
+    (a1, "Singles Sold",     f"{singles['sold']:,}",                "individual cards"),
+    (a2, "Articles Revenue", f"€{singles['revenue']:,.2f}",         "total card value"),
+    (a3, "Avg Card Price",   f"€{singles['avg_price']:,.2f}",       f"median €{singles['median_price']:.2f}"),
     (a4, "Highest Sale",
-         f"€{top_card['card_prices']:.2f}" if top_card is not None else "—",
-         top_card['name'] if top_card is not None and 'name' in top_card else ""),
+         f"€{singles['top_price']:.2f}" if singles['top_price'] is not None else "—",
+         singles['top_name']),
 ]:
     col.markdown(f"""
     <div class="metric-card">
@@ -216,42 +205,64 @@ st.markdown('<div class="section-header">Revenue Over Time</div>', unsafe_allow_
 col_left, col_right = st.columns([3, 2])
 
 with col_left:
-    fig_cum = go.Figure()
-    fig_cum.add_trace(go.Scatter(
-        x=df['Date of Purchase'],
-        y=df['Cumulative Net'],
-        mode='lines',
-        fill='tozeroy',
-        line=dict(color=ACCENT, width=2),
-        fillcolor='rgba(26,144,144,0.12)',
-        hovertemplate='%{x|%d %b %Y}<br>€%{y:,.2f}<extra>Cumulative Net</extra>',
-    ))
-    fig_cum.update_layout(
-        **PLOTLY_BASE,
-        xaxis=dict(showgrid=False),
-        yaxis=dict(showgrid=True, gridcolor=GRID, tickprefix='€', tickformat=',.2f'),
-        hovermode='x unified',
-        margin=M,
-    )
-    st.plotly_chart(fig_cum, use_container_width=True)
+    chart_slot = st.container()
+
+    # Zoom: the selected window is downsampled again, so it gets the full point budget
+    first, last = df['Date of Purchase'].min().date(), df['Date of Purchase'].max().date()
+    window = None
+    if first < last:
+        start, end = st.slider(
+            "Zoom", min_value=first, max_value=last, value=(first, last),
+            format="DD MMM YYYY", key='cum_window', label_visibility='collapsed',
+        )
+        if (start, end) != (first, last):
+            window = (pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1))
+
+    def build_cum():
+        fig_cum = go.Figure()
+        fig_cum.add_trace(time_series_trace(
+            df['Date of Purchase'],
+            df['Cumulative Net'],
+            x_range=window,
+            mode='lines',
+            fill='tozeroy',
+            line=dict(color=ACCENT, width=2),
+            fillcolor='rgba(26,144,144,0.12)',
+            hovertemplate='%{x|%d %b %Y}<br>€%{y:,.2f}<extra>Cumulative Net</extra>',
+        ))
+        fig_cum.update_layout(
+            **PLOTLY_BASE,
+            xaxis=dict(showgrid=False),
+            yaxis=dict(showgrid=True, gridcolor=GRID, tickprefix='€', tickformat=',.2f'),
+            hovermode='x unified',
+            margin=M,
+        )
+        return fig_cum
+
+    with chart_slot:
+        st.plotly_chart(cached_figure('overview.cumulative_net', build_cum, df, window=window),
+                        use_container_width=True)
 
 with col_right:
-    fig_mbar = px.bar(
-        monthly,
-        x='MonthLabel', y='Net_Revenue',
-        labels={'MonthLabel': '', 'Net_Revenue': 'Net Revenue (€)'},
-        color='Net_Revenue',
-        color_continuous_scale=TEAL_GRAD,
-    )
-    fig_mbar.update_traces(hovertemplate='<b>%{x}</b><br>€%{y:,.2f}<extra></extra>')
-    fig_mbar.update_layout(
-        **PLOTLY_BASE,
-        coloraxis_showscale=False,
-        xaxis=dict(tickangle=-45),
-        yaxis=dict(tickprefix='€', tickformat=',.2f', gridcolor=GRID),
-        margin=M,
-    )
-    st.plotly_chart(fig_mbar, use_container_width=True)
+    def build_mbar():
+        fig_mbar = px.bar(
+            monthly,
+            x='MonthLabel', y='Net_Revenue',
+            labels={'MonthLabel': '', 'Net_Revenue': 'Net Revenue (€)'},
+            color='Net_Revenue',
+            color_continuous_scale=TEAL_GRAD,
+        )
+        fig_mbar.update_traces(hovertemplate='<b>%{x}</b><br>€%{y:,.2f}<extra></extra>')
+        fig_mbar.update_layout(
+            **PLOTLY_BASE,
+            coloraxis_showscale=False,
+            xaxis=dict(tickangle=-45),
+            yaxis=dict(tickprefix='€', tickformat=',.2f', gridcolor=GRID),
+            margin=M,
+        )
+        return fig_mbar
+
+    st.plotly_chart(cached_figure('overview.monthly_revenue', build_mbar, cube), use_container_width=True)
 
 # ── Order Volume & Cost Breakdown ─────────────────────────────────────────────
 st.markdown('<div class="section-header">Order Volume &amp; Cost Breakdown</div>', unsafe_allow_html=True)
@@ -259,59 +270,57 @@ st.markdown('<div class="section-header">Order Volume &amp; Cost Breakdown</div>
 col_a, col_b = st.columns(2)
 
 with col_a:
-    fig_orders = px.bar(
-        monthly,
-        x='MonthLabel', y='Orders',
-        labels={'MonthLabel': '', 'Orders': 'Orders'},
-        color='Orders',
-        color_continuous_scale=TEAL_GRAD,
-    )
-    fig_orders.update_traces(hovertemplate='<b>%{x}</b><br>%{y} orders<extra></extra>')
-    fig_orders.update_layout(
-        **PLOTLY_BASE,
-        coloraxis_showscale=False,
-        xaxis=dict(tickangle=-45),
-        yaxis=dict(gridcolor=GRID),
-        margin=M,
-    )
-    st.plotly_chart(fig_orders, use_container_width=True)
+    def build_orders():
+        fig_orders = px.bar(
+            monthly,
+            x='MonthLabel', y='Orders',
+            labels={'MonthLabel': '', 'Orders': 'Orders'},
+            color='Orders',
+            color_continuous_scale=TEAL_GRAD,
+        )
+        fig_orders.update_traces(hovertemplate='<b>%{x}</b><br>%{y} orders<extra></extra>')
+        fig_orders.update_layout(
+            **PLOTLY_BASE,
+            coloraxis_showscale=False,
+            xaxis=dict(tickangle=-45),
+            yaxis=dict(gridcolor=GRID),
+            margin=M,
+        )
+        return fig_orders
+
+    st.plotly_chart(cached_figure('overview.monthly_orders', build_orders, cube), use_container_width=True)
 
 with col_b:
-    total_gross = df['Total Value'].sum()
-    total_net   = df['Net Value'].sum()
-    total_comm  = df['Commission'].sum()
-
-    breakdown = pd.DataFrame({
-        'Component': ['Net Revenue (Merchandise + Shipping)', 'Commission'],
-        'Value':     [round(total_net, 2), round(total_comm, 2)],
-    })
-    fig_donut = px.pie(
-        breakdown,
-        names='Component', values='Value',
-        hole=0.55,
-        color='Component',
-        color_discrete_map={
-            'Net Revenue (Merchandise + Shipping)': ACCENT,
-            'Commission':                            NEG,
-        },
-    )
-    fig_donut.update_traces(
-        textposition='outside',
-        textinfo='label+percent',
-        hovertemplate='<b>%{label}</b><br>€%{value:,.2f}<br>%{percent}<extra></extra>',
-    )
-    fig_donut.update_layout(
-        paper_bgcolor=BG,
-        font_color=TEXT,
-        showlegend=False,
-        margin=dict(l=20, r=20, t=20, b=20),
-        annotations=[dict(
-            text=f"€{total_gross:,.2f}",
-            font=dict(family='DM Serif Display', size=16, color=ACCENT2),
-            showarrow=False,
-        )],
-    )
-    st.plotly_chart(fig_donut, use_container_width=True)
+    def build_donut():
+        fig_donut = px.pie(
+            revenue_breakdown(cube),
+            names='Component', values='Value',
+            hole=0.55,
+            color='Component',
+            color_discrete_map={
+                'Net Revenue (Merchandise + Shipping)': ACCENT,
+                'Commission':                            NEG,
+            },
+        )
+        fig_donut.update_traces(
+            textposition='outside',
+            textinfo='label+percent',
+            hovertemplate='<b>%{label}</b><br>€%{value:,.2f}<br>%{percent}<extra></extra>',
+        )
+        fig_donut.update_layout(
+            paper_bgcolor=BG,
+            font_color=TEXT,
+            showlegend=False,
+            margin=dict(l=20, r=20, t=20, b=20),
+            annotations=[dict(
+                text=f"€{kpis['gross']:,.2f}",
+                font=dict(family='DM Serif Display', size=16, color=ACCENT2),
+                showarrow=False,
+            )],
+        )
+        return fig_donut
+
+    st.plotly_chart(cached_figure('overview.cost_breakdown', build_donut, cube), use_container_width=True)
 
 # ── Card Price Distribution ───────────────────────────────────────────────────
 st.markdown('<div class="section-header">Card Price Distribution</div>', unsafe_allow_html=True)
@@ -319,57 +328,58 @@ st.markdown('<div class="section-header">Card Price Distribution</div>', unsafe_
 col_x, col_y = st.columns([2, 3])
 
 with col_x:
-    fig_hist = px.histogram(
-        articles_df,
-        x='card_prices',
-        nbins=30,
-        labels={'card_prices': 'Card Price (€)', 'count': 'Count'},
-        color_discrete_sequence=[ACCENT],
-    )
-    fig_hist.update_traces(hovertemplate='€%{x:.2f}<br>%{y} cards<extra></extra>')
-    fig_hist.update_layout(
-        **PLOTLY_BASE,
-        bargap=0.05,
-        xaxis=dict(tickprefix='€', tickformat=',.2f', gridcolor=GRID),
-        yaxis=dict(gridcolor=GRID),
-        margin=M,
-    )
-    st.plotly_chart(fig_hist, use_container_width=True)
+    def build_hist():
+        # Binned on the server: only the 30 bins go to the browser
+        bins = price_histogram(articles_df, bins=30)
+        fig_hist = go.Figure(go.Bar(
+            x=(bins['Left'] + bins['Right']) / 2,
+            y=bins['Count'],
+            width=bins['Right'] - bins['Left'],
+            customdata=bins[['Left', 'Right']],
+            marker_color=ACCENT,
+            hovertemplate='€%{customdata[0]:.2f}–€%{customdata[1]:.2f}<br>%{y} cards<extra></extra>',
+        ))
+        fig_hist.update_layout(
+            **PLOTLY_BASE,
+            bargap=0.05,
+            xaxis=dict(title='Card Price (€)', tickprefix='€', tickformat=',.2f', gridcolor=GRID),
+            yaxis=dict(title='Count', gridcolor=GRID),
+            margin=M,
+        )
+        return fig_hist
+
+    st.plotly_chart(cached_figure('overview.price_histogram', build_hist, articles_df), use_container_width=True)
 
 with col_y:
-    bins   = [0, 0.5, 1, 2, 5, 10, 25, 50, float('inf')]
-    labels = ['<€0.50', '€0.50–1', '€1–2', '€2–5', '€5–10', '€10–25', '€25–50', '€50+']
-    articles_df['Price Bucket'] = pd.cut(articles_df['card_prices'], bins=bins, labels=labels)
-    bucket_counts = articles_df['Price Bucket'].value_counts().reindex(labels).reset_index()
-    bucket_counts.columns = ['Bucket', 'Count']
-
-    fig_buck = px.bar(
-        bucket_counts,
-        x='Bucket', y='Count',
-        labels={'Bucket': 'Price Range', 'Count': 'Cards Sold'},
-        color='Count',
-        color_continuous_scale=TEAL_GRAD,
-    )
-    fig_buck.update_traces(hovertemplate='<b>%{x}</b><br>%{y} cards<extra></extra>')
-    fig_buck.update_layout(
-        **PLOTLY_BASE,
-        coloraxis_showscale=False,
-        xaxis=dict(tickangle=-20),
-        yaxis=dict(gridcolor=GRID),
-        margin=M,
-    )
-    st.plotly_chart(fig_buck, use_container_width=True)
+    def build_buck():
+        fig_buck = px.bar(
+            price_buckets(articles_df),
+            x='Bucket', y='Count',
+            labels={'Bucket': 'Price Range', 'Count': 'Cards Sold'},
+            color='Count',
+            color_continuous_scale=TEAL_GRAD,
+        )
+        fig_buck.update_traces(hovertemplate='<b>%{x}</b><br>%{y} cards<extra></extra>')
+        fig_buck.update_layout(
+            **PLOTLY_BASE,
+            coloraxis_showscale=False,
+            xaxis=dict(tickangle=-20),
+            yaxis=dict(gridcolor=GRID),
+            margin=M,
+        )
+        return fig_buck
+
+    st.plotly_chart(cached_figure('overview.price_buckets', build_buck, articles_df), use_container_width=True)
 
 # ── Raw orders table ──────────────────────────────────────────────────────────
 with st.expander("📋 Raw Orders", expanded=False):
     display_cols = [c for c in ['Date of Purchase', 'Total Value', 'Commission', 'Net Value'] if c in df.columns]
-    st.dataframe(
-        df[display_cols]
-        .sort_values('Date of Purchase', ascending=False)
-        .reset_index(drop=True)
-        .style
-        .format({c: '€{:.2f}' for c in ['Total Value', 'Commission', 'Net Value'] if c in display_cols})
-        .background_gradient(subset=['Net Value'], cmap='Blues'),
-        use_container_width=True,
-        height=350,
-    )
\ No newline at end of file
+    paginated_table(
+        df, key='raw_orders',
+        columns=display_cols,
+        sort_by='Date of Purchase',
+        formats={c: '€{:.2f}' for c in ['Total Value', 'Commission', 'Net Value']},
+        gradient='Net Value', cmap='Blues',
+    )
+
+end_page()
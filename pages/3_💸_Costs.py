@@ -1,16 +1,25 @@
 """
 Costs Dashboard - Monthly Expenses Analysis
 """
-import pandas as pd
+import time
+
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
-from data_loader import load_expenses_data
+from data_loader import load_expenses_cube, load_expenses_data
+from figure_cache import cached_figure
+from metrics import (
+    category_spend, cost_kpis, country_spend, expense_dimensions, monthly_spend, spend_heatmap, transactions,
+)
+from sections import lazy_expander
+from tables import paginated_table
+from timing import end_page, start_page, timed
 
 # ── Page config ──────────────────────────────────────────────────────────────
 st.set_page_config(page_title="Costs", page_icon="💸", layout="wide")
+start_page("Costs")
 
 # ── Custom CSS ────────────────────────────────────────────────────────────────
 st.markdown("""
@@ -112,17 +121,17 @@ if not st.session_state.authenticated:
     st.stop()
 
 # ── Load data ─────────────────────────────────────────────────────────────────
-df = load_expenses_data()
+# Filters, KPIs and charts slice the Month x Category x Country cube; the rows
+# are only read for the transactions table
+TABLE_COLUMNS = ['Order_Date', 'Store_Name', 'Store_Country', 'Cost_Category', 'Item_Price', 'Description']
+cube = load_expenses_cube()
+df   = load_expenses_data(columns=TABLE_COLUMNS)
 
-if df is None or df.empty:
+if cube is None or df is None or df.empty:
     st.error("Could not load expenses data.")
     st.stop()
 
 # ── Prep ──────────────────────────────────────────────────────────────────────
-df['Order_Date'] = pd.to_datetime(df['Order_Date'], dayfirst=True)
-df['Month']      = df['Order_Date'].dt.to_period('M').dt.to_timestamp()
-df['MonthLabel'] = df['Order_Date'].dt.strftime('%b %Y')
-
 CATEGORY_COLORS = {
     'Inventory':       '#7b5ea7',
     'Storage':         '#4e9af1',
@@ -137,63 +146,14 @@ COUNTRY_COLORS = {
     'Germany':     '#e63946',
 }
 
-all_cats      = sorted(df['Cost_Category'].unique())
-all_countries = sorted(df['Store_Country'].unique())
+all_cats, all_countries = expense_dimensions(cube)
 
-# ── Sidebar filters ───────────────────────────────────────────────────────────
+# ── Sidebar ───────────────────────────────────────────────────────────────────
 with st.sidebar:
-    st.markdown("### 🔍 Filters")
-
-    # ── Cost Category filter with Select All ──
-    cat_all = st.checkbox("All Categories", value=True, key="cat_all")
-    if cat_all:
-        selected_cats = all_cats
-        st.multiselect(
-            "Cost Category",
-            options=all_cats,
-            default=all_cats,
-            disabled=True,
-            key="cat_multi",
-        )
-    else:
-        selected_cats = st.multiselect(
-            "Cost Category",
-            options=all_cats,
-            default=all_cats,
-            key="cat_multi",
-        )
-
-    st.markdown("---")
-
-    # ── Country filter with Select All ──
-    country_all = st.checkbox("All Countries", value=True, key="country_all")
-    if country_all:
-        selected_countries = all_countries
-        st.multiselect(
-            "Country",
-            options=all_countries,
-            default=all_countries,
-            disabled=True,
-            key="country_multi",
-        )
-    else:
-        selected_countries = st.multiselect(
-            "Country",
-            options=all_countries,
-            default=all_countries,
-            key="country_multi",
-        )
-
-    st.markdown("---")
     if st.button("🔒 Lock page", use_container_width=True):
         st.session_state.authenticated = False
         st.rerun()
 
-dff = df[
-    df['Cost_Category'].isin(selected_cats) &
-    df['Store_Country'].isin(selected_countries)
-]
-
 # ── Page title ────────────────────────────────────────────────────────────────
 st.markdown(
     "<h1 style='font-family:DM Serif Display,serif; color:#e8e4ff; margin-bottom:4px;'>💸 Cost Overview</h1>"
@@ -202,153 +162,182 @@ st.markdown(
 )
 st.divider()
 
-# ── KPI row ───────────────────────────────────────────────────────────────────
-total_spend   = dff['Item_Price'].sum()
-avg_order     = dff['Item_Price'].mean()
-num_orders    = len(dff)
-biggest_cat   = dff.groupby('Cost_Category')['Item_Price'].sum().idxmax() if not dff.empty else "—"
-biggest_spend = dff.groupby('Cost_Category')['Item_Price'].sum().max() if not dff.empty else 0
-
-k1, k2, k3, k4 = st.columns(4)
-for col, label, val, sub in [
-    (k1, "Total Spend",    f"€{total_spend:,.2f}",   f"{num_orders} transactions"),
-    (k2, "Avg per Order",  f"€{avg_order:,.2f}",     "across all categories"),
-    (k3, "Top Category",   biggest_cat,               f"€{biggest_spend:,.2f} total"),
-    (k4, "Active Months",  str(dff['Month'].nunique()), "in date range"),
-]:
-    col.markdown(f"""
-    <div class="metric-card">
-      <div class="label">{label}</div>
-      <div class="value">{val}</div>
-      <div class="sub">{sub}</div>
-    </div>""", unsafe_allow_html=True)
-
-st.markdown("<br>", unsafe_allow_html=True)
-
-# ── Row 1: Monthly spend line + Category donut ────────────────────────────────
-st.markdown('<div class="section-header">Spend Over Time</div>', unsafe_allow_html=True)
-
-col_left, col_right = st.columns([3, 2])
-
-with col_left:
-    monthly = (
-        dff.groupby(['Month', 'Cost_Category'])['Item_Price']
-        .sum()
-        .reset_index()
-    )
-    fig_line = px.area(
-        monthly,
-        x='Month', y='Item_Price',
-        color='Cost_Category',
-        color_discrete_map=CATEGORY_COLORS,
-        labels={'Item_Price': 'Spend (€)', 'Month': ''},
-        template='plotly_dark',
-    )
-    fig_line.update_layout(
-        paper_bgcolor='#1a1a2e',
-        plot_bgcolor='#1a1a2e',
-        legend_title_text='',
-        legend=dict(orientation='h', y=-0.2),
-        margin=dict(l=0, r=0, t=10, b=0),
-        hovermode='x unified',
-    )
-    fig_line.update_traces(line_width=2)
-    st.plotly_chart(fig_line, use_container_width=True)
-
-with col_right:
-    cat_totals = dff.groupby('Cost_Category')['Item_Price'].sum().reset_index()
-    fig_donut = px.pie(
-        cat_totals,
-        names='Cost_Category', values='Item_Price',
-        hole=0.55,
-        color='Cost_Category',
-        color_discrete_map=CATEGORY_COLORS,
-        template='plotly_dark',
-    )
-    fig_donut.update_traces(textposition='outside', textinfo='label+percent')
-    fig_donut.update_layout(
-        paper_bgcolor='#1a1a2e',
-        showlegend=False,
-        margin=dict(l=20, r=20, t=20, b=20),
-        annotations=[dict(
-            text=f"€{total_spend:,.0f}",
-            font=dict(family='DM Serif Display', size=18, color='#e8e4ff'),
-            showarrow=False,
-        )],
-    )
-    st.plotly_chart(fig_donut, use_container_width=True)
-
-# ── Row 2: Country grouped bar + Heatmap ─────────────────────────────────────
-st.markdown('<div class="section-header">Country Breakdown</div>', unsafe_allow_html=True)
-
-col_a, col_b = st.columns([2, 3])
-
-with col_a:
-    country_cat = (
-        dff.groupby(['Store_Country', 'Cost_Category'])['Item_Price']
-        .sum()
-        .reset_index()
-    )
-    fig_bar = px.bar(
-        country_cat,
-        x='Store_Country', y='Item_Price',
-        color='Cost_Category',
-        color_discrete_map=CATEGORY_COLORS,
-        barmode='stack',
-        labels={'Item_Price': 'Spend (€)', 'Store_Country': ''},
-        template='plotly_dark',
-    )
-    fig_bar.update_layout(
-        paper_bgcolor='#1a1a2e',
-        plot_bgcolor='#1a1a2e',
-        legend_title_text='',
-        legend=dict(orientation='h', y=-0.25, font_size=11),
-        margin=dict(l=0, r=0, t=10, b=0),
-    )
-    st.plotly_chart(fig_bar, use_container_width=True)
-
-with col_b:
-    pivot = (
-        dff.groupby(['MonthLabel', 'Cost_Category'])['Item_Price']
-        .sum()
-        .unstack(fill_value=0)
-    )
-    # Keep month order
-    month_order = (
-        dff[['Month', 'MonthLabel']]
-        .drop_duplicates()
-        .sort_values('Month')['MonthLabel']
-        .tolist()
-    )
-    pivot = pivot.reindex([m for m in month_order if m in pivot.index])
-
-    fig_heat = go.Figure(go.Heatmap(
-        z=pivot.values,
-        x=pivot.columns.tolist(),
-        y=pivot.index.tolist(),
-        colorscale='Purples',
-        hovertemplate='%{y} · %{x}<br>€%{z:,.2f}<extra></extra>',
-        colorbar=dict(tickfont=dict(color='#7c7caa'), title='€'),
-    ))
-    fig_heat.update_layout(
-        paper_bgcolor='#1a1a2e',
-        plot_bgcolor='#1a1a2e',
-        xaxis=dict(tickfont=dict(color='#a0a0cc'), side='bottom'),
-        yaxis=dict(tickfont=dict(color='#a0a0cc')),
-        margin=dict(l=0, r=0, t=10, b=0),
-        font_color='#e8e4ff',
-    )
-    st.plotly_chart(fig_heat, use_container_width=True)
-
-# ── Row 3: Transaction table ──────────────────────────────────────────────────
-with st.expander("📋 Raw Transactions", expanded=False):
-    display_cols = ['Order_Date', 'Store_Name', 'Store_Country', 'Cost_Category', 'Item_Price', 'Description']
-    st.dataframe(
-        dff[display_cols]
-        .sort_values('Order_Date', ascending=False)
-        .reset_index(drop=True)
-        .style.format({'Item_Price': '€{:.2f}'})
-        .background_gradient(subset=['Item_Price'], cmap='Purples'),
-        use_container_width=True,
-        height=350,
-    )
\ No newline at end of file
+
+def filter_select(label, all_label, options, key):
+    """
+    "All ..." checkbox plus a multiselect that is only editable when it's unticked
+    Returns: the selected options
+    """
+    select_all = st.checkbox(all_label, value=True, key=f"{key}_all")
+    selected = st.multiselect(label, options=options, default=options,
+                              disabled=select_all, key=f"{key}_multi")
+    return options if select_all else selected
+
+
+@st.fragment
+@timed('filters to charts')
+def cost_dashboard(cube, df):
+    """
+    Filter panel plus everything it drives. A filter change reruns only this
+    function over the already loaded cube: the login gate, CSS and data load
+    above are not executed again.
+    """
+    start_page("Costs", fragment=True)
+    started = time.perf_counter()
+
+    # ── Filters ──
+    with st.container(border=True):
+        f_cat, f_country = st.columns(2)
+        with f_cat:
+            selected_cats = filter_select("Cost Category", "All Categories", all_cats, "cat")
+        with f_country:
+            selected_countries = filter_select("Country", "All Countries", all_countries, "country")
+        timing = st.empty()
+
+    # Answered from the cube: a few hundred cells, however long the ledger gets
+    filters = dict(categories=selected_cats, countries=selected_countries)  # part of every figure key
+    kpis    = cost_kpis(cube, **filters)
+
+    # ── KPI row ───────────────────────────────────────────────────────────────
+    k1, k2, k3, k4 = st.columns(4)
+    for col, label, val, sub in [
+        (k1, "Total Spend",    f"€{kpis['total_spend']:,.2f}",     f"{kpis['transactions']} transactions"),
+        (k2, "Avg per Order",  f"€{kpis['avg_transaction']:,.2f}", "across all categories"),
+        (k3, "Top Category",   kpis['top_category'],                f"€{kpis['top_category_spend']:,.2f} total"),
+        (k4, "Active Months",  str(kpis['active_months']),          "in date range"),
+    ]:
+        col.markdown(f"""
+        <div class="metric-card">
+          <div class="label">{label}</div>
+          <div class="value">{val}</div>
+          <div class="sub">{sub}</div>
+        </div>""", unsafe_allow_html=True)
+
+    st.markdown("<br>", unsafe_allow_html=True)
+
+    # ── Row 1: Monthly spend line + Category donut ────────────────────────────
+    st.markdown('<div class="section-header">Spend Over Time</div>', unsafe_allow_html=True)
+
+    col_left, col_right = st.columns([3, 2])
+
+    with col_left:
+        def build_line():
+            fig_line = px.area(
+                monthly_spend(cube, **filters),
+                x='Month', y='Item_Price',
+                color='Cost_Category',
+                color_discrete_map=CATEGORY_COLORS,
+                labels={'Item_Price': 'Spend (€)', 'Month': ''},
+                template='plotly_dark',
+            )
+            fig_line.update_layout(
+                paper_bgcolor='#1a1a2e',
+                plot_bgcolor='#1a1a2e',
+                legend_title_text='',
+                legend=dict(orientation='h', y=-0.2),
+                margin=dict(l=0, r=0, t=10, b=0),
+                hovermode='x unified',
+            )
+            fig_line.update_traces(line_width=2)
+            return fig_line
+
+        st.plotly_chart(cached_figure('costs.monthly_spend', build_line, cube, **filters), use_container_width=True)
+
+    with col_right:
+        def build_donut():
+            fig_donut = px.pie(
+                category_spend(cube, **filters),
+                names='Cost_Category', values='Item_Price',
+                hole=0.55,
+                color='Cost_Category',
+                color_discrete_map=CATEGORY_COLORS,
+                template='plotly_dark',
+            )
+            fig_donut.update_traces(textposition='outside', textinfo='label+percent')
+            fig_donut.update_layout(
+                paper_bgcolor='#1a1a2e',
+                showlegend=False,
+                margin=dict(l=20, r=20, t=20, b=20),
+                annotations=[dict(
+                    text=f"€{kpis['total_spend']:,.0f}",
+                    font=dict(family='DM Serif Display', size=18, color='#e8e4ff'),
+                    showarrow=False,
+                )],
+            )
+            return fig_donut
+
+        st.plotly_chart(cached_figure('costs.category_share', build_donut, cube, **filters), use_container_width=True)
+
+    # ── Row 2: Country grouped bar + Heatmap ─────────────────────────────────
+    st.markdown('<div class="section-header">Country Breakdown</div>', unsafe_allow_html=True)
+
+    col_a, col_b = st.columns([2, 3])
+
+    with col_a:
+        def build_bar():
+            fig_bar = px.bar(
+                country_spend(cube, **filters),
+                x='Store_Country', y='Item_Price',
+                color='Cost_Category',
+                color_discrete_map=CATEGORY_COLORS,
+                barmode='stack',
+                labels={'Item_Price': 'Spend (€)', 'Store_Country': ''},
+                template='plotly_dark',
+            )
+            fig_bar.update_layout(
+                paper_bgcolor='#1a1a2e',
+                plot_bgcolor='#1a1a2e',
+                legend_title_text='',
+                legend=dict(orientation='h', y=-0.25, font_size=11),
+                margin=dict(l=0, r=0, t=10, b=0),
+            )
+            return fig_bar
+
+        st.plotly_chart(cached_figure('costs.country_spend', build_bar, cube, **filters), use_container_width=True)
+
+    with col_b:
+        def build_heat():
+            pivot = spend_heatmap(cube, **filters)
+
+            fig_heat = go.Figure(go.Heatmap(
+                z=pivot.values,
+                x=pivot.columns.tolist(),
+                y=pivot.index.tolist(),
+                colorscale='Purples',
+                hovertemplate='%{y} · %{x}<br>€%{z:,.2f}<extra></extra>',
+                colorbar=dict(tickfont=dict(color='#7c7caa'), title='€'),
+            ))
+            fig_heat.update_layout(
+                paper_bgcolor='#1a1a2e',
+                plot_bgcolor='#1a1a2e',
+                xaxis=dict(tickfont=dict(color='#a0a0cc'), side='bottom'),
+                yaxis=dict(tickfont=dict(color='#a0a0cc')),
+                margin=dict(l=0, r=0, t=10, b=0),
+                font_color='#e8e4ff',
+            )
+            return fig_heat
+
+        st.plotly_chart(cached_figure('costs.month_category_heatmap', build_heat, cube, **filters), use_container_width=True)
+
+    # ── Row 3: Transaction table ──────────────────────────────────────────────
+    # Filtered, sorted and styled only while the expander is open
+    raw, raw_open = lazy_expander("📋 Raw Transactions", key='raw_transactions_open')
+    if raw_open:
+        with raw:
+            paginated_table(
+                transactions(df, **filters), key='raw_transactions',
+                columns=TABLE_COLUMNS,
+                sort_by='Order_Date',
+                formats={'Item_Price': '€{:.2f}'},
+                gradient='Item_Price', cmap='Purples',
+            )
+
+    # Filter-to-chart latency: the whole fragment, i.e. the charts alone
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    st.session_state.costs_fragment_ms = elapsed_ms
+    timing.caption(f"⏱ Filters → charts in {elapsed_ms:,.0f} ms")
+
+
+cost_dashboard(cube, df)
+
+end_page()
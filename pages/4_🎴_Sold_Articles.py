@@ -3,12 +3,17 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from data_loader import load_articles_data
+from figure_cache import cached_figure
+from metrics import rarity_counts, set_counts, set_values, sold_kpis
+from tables import paginated_table
+from timing import end_page, start_page
 
 # Set page configuration
 st.set_page_config(
     page_title="Sold Articles Overview",
     layout="wide"
 )
+start_page("Sold Articles")
 
 st.title("🎴 Sold Articles Overview")
 
@@ -19,31 +24,28 @@ if df is None:
     st.error("Could not load articles data. Please check your S3 bucket configuration.")
     st.stop()
 
-# Display the dataframe
-st.dataframe(df, use_container_width=True)
+# Display the dataframe, one page at a time
+paginated_table(df, key='articles', sort_by='card_prices', formats={'card_prices': '€{:.2f}'})
 
 # Display variety of stats about the sold articles
 st.markdown("### Key Metrics")
 
 col1, col2, col3 = st.columns(3)
+kpis = sold_kpis(df)
 
 with col1:
-    total_articles_sold = len(df)
-    st.metric("Total Articles Sold", total_articles_sold)
+    st.metric("Total Articles Sold", kpis['sold'])
 
 with col2:
-    total_revenue = df['card_prices'].sum()
-    st.metric("Total Revenue", f"€{total_revenue:.2f}")
+    st.metric("Total Revenue", f"€{kpis['revenue']:.2f}")
 
 with col3:
-    unique_sets = df['set_names'].nunique()
-    st.metric("Unique Sets", unique_sets)
+    st.metric("Unique Sets", kpis['unique_sets'])
 
 # Display the number of cards sold per card_rarity
 st.markdown("---")
 st.markdown("### Articles Sold by Rarity")
-rarity_counts = df['card_rarities'].value_counts()
-st.bar_chart(rarity_counts)
+st.bar_chart(rarity_counts(df))
 
 
 # ===============================
@@ -52,67 +54,73 @@ st.bar_chart(rarity_counts)
 st.markdown("---")
 st.title("🌳 Cards Sold by Set")
 
-treemap_count = df.groupby('set_names').size().reset_index(name='count')
-
-fig1 = go.Figure(go.Treemap(
-    labels=treemap_count['set_names'],
-    parents=[''] * len(treemap_count),
-    values=treemap_count['count'],
-    marker=dict(
-        colors=treemap_count['count'],
-        colorscale='Viridis_r',
-        showscale=True,
-        colorbar=dict(
-            title='Cards Sold',
-            thickness=15,       # 👈 same thickness for both
-            len=0.95,           # 👈 same length for both
-        )
-    ),
-    textposition="middle center",
-    textfont=dict(size=14),
-    hovertemplate='<b>%{label}</b><br>Cards Sold: %{value}<extra></extra>',
-))
-
-fig1.update_layout(
-    title='Cards Sold per Set',
-    margin=dict(t=50, l=0, r=0, b=0),  # 👈 remove all padding
-)
 
-st.plotly_chart(fig1, use_container_width=True)
+def build_set_count():
+    treemap_count = set_counts(df)
+
+    fig1 = go.Figure(go.Treemap(
+        labels=treemap_count['set_names'],
+        parents=[''] * len(treemap_count),
+        values=treemap_count['count'],
+        marker=dict(
+            colors=treemap_count['count'],
+            colorscale='Viridis_r',
+            showscale=True,
+            colorbar=dict(
+                title='Cards Sold',
+                thickness=15,       # 👈 same thickness for both
+                len=0.95,           # 👈 same length for both
+            )
+        ),
+        textposition="middle center",
+        textfont=dict(size=14),
+        hovertemplate='<b>%{label}</b><br>Cards Sold: %{value}<extra></extra>',
+    ))
+
+    fig1.update_layout(
+        title='Cards Sold per Set',
+        margin=dict(t=50, l=0, r=0, b=0),  # 👈 remove all padding
+    )
+    return fig1
+
+
+st.plotly_chart(cached_figure('sold.set_count_treemap', build_set_count, df), use_container_width=True)
 
 
 # =====================================
 # 🌳 Total Value of Cards Sold per Set
 # =====================================
 
-treemap_value = (
-    df.groupby('set_names')['card_prices']
-      .sum()
-      .reset_index(name='total_value')
-)
-
-fig2 = go.Figure(go.Treemap(
-    labels=treemap_value['set_names'],
-    parents=[''] * len(treemap_value),
-    values=treemap_value['total_value'],
-    marker=dict(
-        colors=treemap_value['total_value'],
-        colorscale='Viridis_r',
-        showscale=True,
-        colorbar=dict(
-            title='Total Value (EUR)',
-            thickness=15,       # 👈 same thickness for both
-            len=0.95,           # 👈 same length for both
-        )
-    ),
-    textposition="middle center",
-    textfont=dict(size=14),
-    hovertemplate='<b>%{label}</b><br>Total Value: €%{value:,.2f}<extra></extra>',
-))
-
-fig2.update_layout(
-    title='Total Value of Cards Sold per Set',
-    margin=dict(t=50, l=0, r=0, b=0),  # 👈 remove all padding
-)
 
-st.plotly_chart(fig2, use_container_width=True)
\ No newline at end of file
+def build_set_value():
+    treemap_value = set_values(df)
+
+    fig2 = go.Figure(go.Treemap(
+        labels=treemap_value['set_names'],
+        parents=[''] * len(treemap_value),
+        values=treemap_value['total_value'],
+        marker=dict(
+            colors=treemap_value['total_value'],
+            colorscale='Viridis_r',
+            showscale=True,
+            colorbar=dict(
+                title='Total Value (EUR)',
+                thickness=15,       # 👈 same thickness for both
+                len=0.95,           # 👈 same length for both
+            )
+        ),
+        textposition="middle center",
+        textfont=dict(size=14),
+        hovertemplate='<b>%{label}</b><br>Total Value: €%{value:,.2f}<extra></extra>',
+    ))
+
+    fig2.update_layout(
+        title='Total Value of Cards Sold per Set',
+        margin=dict(t=50, l=0, r=0, b=0),  # 👈 remove all padding
+    )
+    return fig2
+
+
+st.plotly_chart(cached_figure('sold.set_value_treemap', build_set_value, df), use_container_width=True)
+
+end_page()
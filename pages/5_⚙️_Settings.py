@@ -1,19 +1,182 @@
+import time
+
+import pandas as pd
+import precomputed
 import streamlit as st
-from data_loader import refresh_data
+from data_loader import (
+    cached_frames, dataset_status, load_timings, prefetch, refresh_data, refresh_dataset,
+)
+from figure_cache import figure_cache_stats
+from revalidate import TTL
+from schema import memory_report
+import sql_backend
+from timing import end_page, start_page, timing_summary
 
 st.set_page_config(
     page_title="Settings",
     layout="wide"
 )
+start_page("Settings")
 
 st.title("⚙️ Settings")
 
 st.markdown("### Data Management")
 
-st.write("The dashboard loads data from AWS S3. Data is cached for 1 hour to improve performance.")
+snapshot = precomputed.current()
+if snapshot:
+    st.write(
+        f"The dashboard runs from the precomputed snapshot `{snapshot['version']}` in `{precomputed.SNAPSHOT_ROOT}`: "
+        f"nothing is downloaded or parsed and the aggregates are read, not computed. Run `build_snapshot.py` "
+        f"to build a new one, then refresh."
+    )
+else:
+    st.write(
+        f"The dashboard loads data from AWS S3. Data is cached and checked for a new version every "
+        f"{TTL / 60:.0f} minutes in the background; pages keep showing the current data until it's ready."
+    )
+
+
+def age(timestamp):
+    if not timestamp:
+        return "–"
+    minutes = (time.time() - timestamp) / 60
+    if minutes < 1:
+        return "just now"
+    if minutes < 60:
+        return f"{minutes:.0f} min ago"
+    if minutes < 48 * 60:
+        return f"{minutes / 60:.0f} h ago"
+    return f"{minutes / 60 / 24:.0f} days ago"
+
+
+def refresh(dataset):
+    evicted = refresh_dataset(dataset)
+    prefetch(dataset)
+    source = "the current snapshot" if precomputed.enabled() else "S3"
+    st.toast(f"{dataset.capitalize()} checked against {source} again, {evicted} cached entries and figures evicted")
+
+
+st.write(
+    "Datasets load when a page first needs them, or here with their Refresh button. Refreshing a dataset only "
+    "rebuilds what depends on it; the other datasets stay cached."
+)
+
+widths = [2, 3, 2, 2, 2, 2, 2]
+for col, label in zip(st.columns(widths), ["Dataset", "Version", "Downloaded", "Checked", "Export size", "Cached", ""]):
+    col.caption(label)
+for status in dataset_status():
+    dataset = status['dataset']
+    c_name, c_version, c_fetched, c_checked, c_size, c_cached, c_button = st.columns(widths)
+    c_name.markdown(f"**{dataset.capitalize()}**")
+    c_version.code(status['version'] or "not loaded", language=None)
+    c_fetched.write(age(status['fetched_at']))
+    c_checked.write(age(status['checked_at']))
+    c_size.write(f"{status['size'] / 1e6:,.2f} MB" if status['size'] else "–")
+    c_cached.write(f"{status['cached']:,} entries")
+    c_button.button("🔄 Refresh", key=f"refresh_{dataset}", on_click=refresh, args=(dataset,))
 
-if st.button("🔄 Refresh Data"):
-    refresh_data()
+st.button("🔄 Refresh All Data", on_click=refresh_data)
+
+st.markdown("---")
+
+st.markdown("### Memory")
+
+st.write(
+    "Resident size of the frames the pages have loaded so far (every column projection, model and cube, shared by "
+    "all sessions) with the typed schema (categoricals, Arrow strings) versus plain object columns."
+)
+
+frames = cached_frames()
+report = memory_report(frames)
+totals = report.groupby('Dataset', sort=False)[['Before', 'After']].sum()
+for col, dataset in zip(st.columns(len(frames)), frames):
+    if dataset not in totals.index:
+        col.metric(dataset.capitalize(), "not loaded")
+        continue
+    row = totals.loc[dataset]
+    col.metric(
+        dataset.capitalize(),
+        f"{row['After'] / 1e6:,.2f} MB",
+        f"-{row['Before'] / 1e6 - row['After'] / 1e6:,.2f} MB vs object columns",
+        delta_color="inverse",
+    )
+
+with st.expander("Bytes per column"):
+    st.dataframe(report, use_container_width=True, hide_index=True)
+
+st.markdown("---")
+
+st.markdown("### Data Loading")
+
+st.write("On a cold start the exports are downloaded and parsed side by side; time of the last load per dataset.")
+
+timings = load_timings()
+st.dataframe(
+    pd.DataFrame([
+        {
+            'Dataset': dataset.capitalize(),
+            'Download (ms)': t.get('fetch_ms'),
+            'Parse (ms)': t.get('parse_ms'),
+            'Export': t.get('status'),
+            'Loaded': pd.Timestamp(t['loaded_at'], unit='s', tz='UTC') if t.get('loaded_at') else None,
+        }
+        for dataset, t in timings.items()
+    ]),
+    use_container_width=True,
+    hide_index=True,
+    column_config={
+        'Download (ms)': st.column_config.NumberColumn(format="%.0f"),
+        'Parse (ms)': st.column_config.NumberColumn(format="%.0f"),
+    },
+)
+
+st.markdown("---")
+
+st.markdown("### Figure Cache")
+
+st.write("Charts are cached per data version and filter selection and shared by all sessions.")
+
+stats = figure_cache_stats()
+f1, f2, f3, f4 = st.columns(4)
+f1.metric("Hit rate", f"{stats['hit_rate'] * 100:.0f}%")
+f2.metric("Hits / misses", f"{stats['hits']:,} / {stats['misses']:,}")
+f3.metric("Figures", f"{stats['entries']:,} of {stats['max_entries']:,}")
+f4.metric("Size", f"{stats['bytes'] / 1e6:,.2f} MB")
+
+st.markdown("---")
+
+st.markdown("### Performance")
+
+st.write(
+    "Time per stage of each page: downloads, parses, loaders, rollups, tables and charts. "
+    "Cached stages show how often they were answered from the cache."
+)
+if sql_backend.enabled():
+    st.caption(
+        "The cubes and the metrics that scan every row run as DuckDB SQL on the snapshot files "
+        "(MTG_QUERY_BACKEND=duckdb); their queries are the `sql` stage."
+    )
+
+last_runs = st.slider("Last reruns per page", min_value=5, max_value=500, value=50, step=5)
+summary = timing_summary(last_runs)
+pages_total = summary[summary['Stage'] == 'page']
+
+for col, (_, row) in zip(st.columns(len(pages_total) or 1), pages_total.iterrows()):
+    col.metric(row['Page'], f"{row['p50']:,.0f} ms", f"p95 {row['p95']:,.0f} · max {row['max']:,.0f} ms",
+               delta_color="off")
+
+stages = summary[summary['Stage'] != 'page']
+st.dataframe(
+    stages.assign(**{'Hit rate': stages['Hit rate'] * 100}),
+    use_container_width=True,
+    hide_index=True,
+    column_config={
+        'Hit rate': st.column_config.NumberColumn(format="%.0f%%"),
+        'p50': st.column_config.NumberColumn("p50 (ms)", format="%.1f"),
+        'p95': st.column_config.NumberColumn("p95 (ms)", format="%.1f"),
+        'max': st.column_config.NumberColumn("max (ms)", format="%.1f"),
+    },
+)
 
 st.markdown("---")
 
@@ -33,4 +196,6 @@ st.info("""
 **Data Source:** AWS S3 (Frankfurt)  
 **Update Frequency:** Manual (monthly)  
 **Privacy:** Sensitive data (usernames, order IDs) removed before display
-""")
\ No newline at end of file
+""")
+
+end_page()
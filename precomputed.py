@@ -0,0 +1,242 @@
+"""
+Precomputed dashboard snapshots ("snapshot mode")
+build_snapshot.py parses the three exports once, offline, and writes one
+versioned directory with the typed datasets (in the layout of snapshots.py),
+their cubes and the result of every metric the pages show. With MTG_SNAPSHOT
+pointing at the builder's output folder the app reads from there instead of
+S3: nothing is downloaded or parsed and metrics are looked up, not computed.
+
+    <MTG_SNAPSHOT>/CURRENT                  name of the snapshot in use
+    <MTG_SNAPSHOT>/dashboard-<hash>/
+        manifest.json                       exports, datasets, metric index
+        orders-<version>/part-00000.parquet and cube.parquet
+        articles-<version>/part-00000.parquet
+        expenses-<version>/part-00000.parquet and cube.parquet
+        metrics/<n>.parquet                 tabular metric results
+"""
+import copy
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Folder written by build_snapshot.py; set to run the app in snapshot mode
+SNAPSHOT_ROOT = os.environ.get("MTG_SNAPSHOT")
+
+POINTER = "CURRENT"
+MANIFEST = "manifest.json"
+CUBE_FILE = "cube.parquet"
+
+MISSING = object()  # lookup() result for a metric that isn't in the snapshot
+
+_bundle = None   # manifest of the snapshot in use, plus its folder under 'path'
+_values = {}     # metric key -> result read from the snapshot
+_lock = threading.Lock()
+
+
+def enabled():
+    """
+    Whether the app runs from a precomputed snapshot
+    """
+    return bool(SNAPSHOT_ROOT)
+
+
+def current():
+    """
+    Manifest of the snapshot in use (None outside snapshot mode), read once
+    Returns: dict with version, built_at, exports, datasets, metrics and path
+    """
+    global _bundle
+    if not enabled():
+        return None
+    with _lock:
+        if _bundle is None:
+            root = Path(SNAPSHOT_ROOT)
+            pointer = root / POINTER
+            folder = root / pointer.read_text().strip() if pointer.exists() else root
+            with open(folder / MANIFEST) as f:
+                _bundle = {**json.load(f), 'path': str(folder)}
+            _values.clear()
+        return _bundle
+
+
+def reload():
+    """
+    Forget the snapshot in use; the next access follows CURRENT again
+    """
+    global _bundle
+    with _lock:
+        _bundle = None
+        _values.clear()
+
+
+def dataset_path(dataset):
+    """
+    Path of the dataset snapshot of `dataset` ('orders', 'articles', 'expenses')
+    """
+    bundle = current()
+    return os.path.join(bundle['path'], bundle['datasets'][dataset])
+
+
+def read_cube(path):
+    """
+    The precomputed cube stored with a dataset snapshot, None if there is none
+    """
+    cube = Path(path) / CUBE_FILE
+    return pd.read_parquet(cube) if cube.exists() else None
+
+
+def metric_key(name, version, columns, args):
+    """
+    Key of a metric result: metric name, data version, the columns it was
+    computed on and arguments
+    """
+    return json.dumps([name, version, list(columns), list(args)], default=str)
+
+
+def lookup(name, version, columns, args):
+    """
+    Result of metric `name` on `columns` of data `version` with `args` from the snapshot
+    Returns: a copy of the result, or MISSING outside snapshot mode or when the
+             builder didn't compute this call
+    """
+    bundle = current()
+    if bundle is None:
+        return MISSING
+    key = metric_key(name, version, columns, args)
+    entry = bundle['metrics'].get(key)
+    if entry is None:
+        return MISSING
+    if key not in _values:
+        _values[key] = _read_result(bundle['path'], entry)
+    # Pages may add columns to what they get, as with st.cache_data results
+    return copy.deepcopy(_values[key])
+
+
+def _read_result(folder, entry):
+    if entry['kind'] == 'json':
+        return entry['value']
+    df = pd.read_parquet(os.path.join(folder, entry['file']))
+    return df.iloc[:, 0] if entry['kind'] == 'series' else df
+
+
+# ── Writing ───────────────────────────────────────────────────────────────────
+def staging_dir(root):
+    """
+    Empty folder to build the next snapshot in, inside `root`
+    """
+    tmp = Path(root) / f".building.{os.getpid()}.{threading.get_ident()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    (tmp / "metrics").mkdir(parents=True)
+    return tmp
+
+
+def write_dataset(folder, token, df, meta=None):
+    """
+    Write a dataset snapshot named `token` ('orders-<version>'), readable with
+    snapshots.read_snapshot
+    Returns: path of the dataset snapshot
+    """
+    path = Path(folder) / token
+    path.mkdir()
+    df.to_parquet(path / "part-00000.parquet", index=False)
+    with open(path / "_meta.json", "w") as f:
+        json.dump(meta or {}, f, indent=2, default=str)
+    return path
+
+
+def write_cube(path, cube):
+    """
+    Store the cube of the dataset snapshot at `path` (see read_cube)
+    """
+    cube.to_parquet(Path(path) / CUBE_FILE, index=False)
+
+
+def _json_value(value):
+    # numpy scalars and tuples as plain JSON
+    if hasattr(value, 'item'):
+        return value.item()
+    if isinstance(value, tuple):
+        return list(value)
+    return str(value)
+
+
+def write_results(folder, results):
+    """
+    Store metric results [((name, version, columns, args), value)]: frames and Series
+    as Parquet, everything else inline in the manifest
+    Returns: the metric index of the manifest
+    """
+    index = {}
+    for n, ((name, version, columns, args), value) in enumerate(results):
+        key = metric_key(name, version, columns, args)
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            kind = 'series' if isinstance(value, pd.Series) else 'frame'
+            file = f"metrics/{n:04d}.parquet"
+            frame = value.to_frame() if kind == 'series' else value
+            if isinstance(frame.columns, pd.CategoricalIndex):
+                # Pivots on a category column; Parquet can't restore those labels
+                frame = frame.set_axis(frame.columns.astype(object), axis=1)
+            frame.to_parquet(Path(folder) / file)
+            index[key] = {'kind': kind, 'file': file}
+        else:
+            index[key] = {'kind': 'json', 'value': json.loads(json.dumps(value, default=_json_value))}
+    return index
+
+
+def snapshot_version(datasets):
+    """
+    Name of the snapshot of the dataset versions {dataset: token}
+    """
+    return "dashboard-" + hashlib.sha256(json.dumps(datasets, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def point_to(root, version):
+    """
+    Make the snapshot `version` already built under `root` the current one
+    Returns: its path
+    """
+    root = Path(root)
+    path = root / version
+    # Older snapshots are pruned by mtime: the current one counts as the newest
+    os.utime(path)
+    tmp = root / f"{POINTER}.{os.getpid()}.tmp"
+    tmp.write_text(version)
+    os.replace(tmp, root / POINTER)
+    return path
+
+
+def publish(folder, root, exports, datasets, metrics, keep=2):
+    """
+    Write the manifest and make the snapshot in `folder` the current one;
+    older snapshots beyond the last `keep` are removed
+    exports: {dataset: dict with source, version and size of the export}
+    datasets: {dataset: token of its dataset snapshot}
+    Returns: path of the published snapshot
+    """
+    root = Path(root)
+    version = snapshot_version(datasets)
+    manifest = {
+        'version': version,
+        'built_at': time.time(),
+        'exports': exports,
+        'datasets': datasets,
+        'metrics': metrics,
+    }
+    with open(Path(folder) / MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=1, default=str)
+
+    path = root / version
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(folder, path)
+    point_to(root, version)
+
+    built = sorted(root.glob("dashboard-*"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in built[keep:]:
+        shutil.rmtree(old, ignore_errors=True)
+    return path
@@ -0,0 +1,103 @@
+"""
+Read-only DataFrames shared by every session
+The loaders hand out the same cached frame to every rerun of every session
+(st.cache_resource, no copy). A page that writes to it would change the data
+for everybody, so every way of mutating the frame raises instead.
+"""
+import pandas as pd
+
+
+class SharedDataMutationError(TypeError):
+    """
+    Raised when a page tries to modify a shared dataset
+    """
+
+
+def _refuse(name, action):
+    raise SharedDataMutationError(
+        f"The {name} dataset is shared between sessions and read-only ({action}). "
+        f"Derive a new frame with .assign(...) / .copy(), or add the column to the model in data_loader."
+    )
+
+
+class _ReadOnlyIndexer:
+    def __init__(self, frame, indexer):
+        self._frame = frame
+        self._indexer = indexer
+
+    def __getitem__(self, key):
+        return self._indexer[key]
+
+    def __setitem__(self, key, value):
+        _refuse(self._frame.dataset, "item assignment via an indexer")
+
+
+class ReadOnlyFrame(pd.DataFrame):
+    """
+    DataFrame that refuses in-place changes; anything derived from it
+    (selections, groupbys, .assign, .copy) is a normal DataFrame again
+    """
+    _metadata = ['dataset', 'version']
+
+    @property
+    def _constructor(self):
+        return pd.DataFrame
+
+    def __setitem__(self, key, value):
+        _refuse(self.dataset, f"setting column {key!r}")
+
+    def __delitem__(self, key):
+        _refuse(self.dataset, f"deleting column {key!r}")
+
+    def __setattr__(self, name, value):
+        if name in ('columns', 'index') or (name not in self._metadata and name in self.columns):
+            _refuse(self.dataset, f"assigning {name!r}")
+        super().__setattr__(name, value)
+
+    def insert(self, loc, column, value, allow_duplicates=False):
+        _refuse(self.dataset, f"inserting column {column!r}")
+
+    def pop(self, item):
+        _refuse(self.dataset, f"popping column {item!r}")
+
+    def _update_inplace(self, result, verify_is_copy=True):
+        # Every `inplace=True` operation ends up here
+        _refuse(self.dataset, "inplace operation")
+
+    @property
+    def loc(self):
+        return _ReadOnlyIndexer(self, super().loc)
+
+    @property
+    def iloc(self):
+        return _ReadOnlyIndexer(self, super().iloc)
+
+    @property
+    def at(self):
+        return _ReadOnlyIndexer(self, super().at)
+
+    @property
+    def iat(self):
+        return _ReadOnlyIndexer(self, super().iat)
+
+
+def freeze(df, dataset, version=None):
+    """
+    Wrap `df` as a ReadOnlyFrame named `dataset` (no data is copied)
+    version: identifies the content, e.g. the snapshot it was read from
+    """
+    frozen = ReadOnlyFrame(df, copy=False)
+    object.__setattr__(frozen, 'dataset', dataset)
+    object.__setattr__(frozen, 'version', version)
+    _lock_arrays(frozen)
+    return frozen
+
+
+def _lock_arrays(frame):
+    # A column or array taken from the frame is a view of its data; with the
+    # arrays read-only, writing through such a view raises as well. Arrow-backed
+    # columns are immutable already.
+    for block in frame._mgr.blocks:
+        values = getattr(block.values, '_ndarray', block.values)  # datetimes and categoricals wrap one
+        if hasattr(values, 'flags'):
+            values.flags.writeable = False
@@ -0,0 +1,123 @@
+"""
+Stale-while-revalidate cache for the S3 exports
+Once a value is older than its TTL it keeps being served while a background
+thread fetches and prepares the next version, which then replaces it in one
+step. Only a cold start, or a value older than the maximum staleness, makes
+the caller wait for the download and parse.
+"""
+import functools
+import os
+import threading
+import time
+import warnings
+
+# Seconds before a value is revalidated in the background
+TTL = float(os.environ.get("MTG_REFRESH_TTL", 3600))
+# Seconds after which a value is too old to serve and callers wait for a fresh one
+MAX_STALENESS = float(os.environ.get("MTG_MAX_STALENESS", 24 * 3600))
+# Seconds to wait before retrying a failed background refresh
+RETRY_AFTER = float(os.environ.get("MTG_REFRESH_RETRY", 60))
+
+
+class Revalidating:
+    """
+    Function without arguments whose result is cached and refreshed in the
+    background after `ttl` seconds; see stale_while_revalidate
+    """
+
+    def __init__(self, load, ttl=TTL, max_staleness=MAX_STALENESS):
+        functools.update_wrapper(self, load)
+        self._load = load
+        self.ttl = ttl
+        self.max_staleness = max(max_staleness, ttl)
+        self._entry = None  # (value, loaded_at), replaced as a whole
+        self._lock = threading.Lock()
+        self._loading = threading.Lock()
+        self._worker = None
+        self._failed_at = None
+        self.error = None
+
+    def __call__(self):
+        with self._lock:
+            entry = self._entry
+            if entry is not None:
+                age = time.time() - entry[1]
+                if age < self.ttl:
+                    return entry[0]
+                if age < self.max_staleness:
+                    self._start_refresh()
+                    return entry[0]
+        # Cold start, or too old to serve: wait for the new value
+        return self._refresh(wait_for=self.ttl)
+
+    def _refresh(self, wait_for):
+        # One load at a time; whoever waited on it reuses its result
+        with self._loading:
+            entry = self._entry
+            if entry is not None and time.time() - entry[1] < wait_for:
+                return entry[0]
+            value = self._load()
+            with self._lock:
+                self._entry = (value, time.time())
+                self._failed_at = self.error = None
+            return value
+
+    def _start_refresh(self):
+        # Called with self._lock held
+        if self._worker is not None and self._worker.is_alive():
+            return
+        if self._failed_at is not None and time.time() - self._failed_at < RETRY_AFTER:
+            return
+        self._worker = threading.Thread(target=self._refresh_in_background, daemon=True,
+                                        name=f"refresh-{self.__name__}")
+        self._worker.start()
+
+    def _refresh_in_background(self):
+        try:
+            self._refresh(wait_for=0)
+        except Exception as e:
+            # The previous value stays in use until a retry succeeds
+            with self._lock:
+                self._failed_at, self.error = time.time(), e
+            warnings.warn(f"Background refresh of {self.__name__} failed: {e}")
+
+    def peek(self):
+        """
+        The current value without loading or revalidating it, None before the first load
+        """
+        entry = self._entry
+        return entry[0] if entry is not None else None
+
+    def loaded_at(self):
+        """
+        When the current value was loaded (epoch seconds), None before the first load
+        """
+        entry = self._entry
+        return entry[1] if entry is not None else None
+
+    def refreshing(self):
+        """
+        Whether a background refresh is running
+        """
+        return self._worker is not None and self._worker.is_alive()
+
+    def clear(self):
+        """
+        Forget the value; the next call loads it again and waits for it
+        """
+        with self._lock:
+            self._entry = None
+            self._failed_at = self.error = None
+
+
+def stale_while_revalidate(ttl=TTL, max_staleness=MAX_STALENESS):
+    """
+    Decorator caching a function without arguments, shared by all sessions
+    ttl: seconds before the value is refreshed in a background thread; the
+         old value is returned until the new one is ready
+    max_staleness: seconds after which the old value isn't served anymore and
+                   callers wait for the refresh instead
+    """
+    def wrap(load):
+        return Revalidating(load, ttl, max_staleness)
+    return wrap
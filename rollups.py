@@ -0,0 +1,61 @@
+"""
+Pre-aggregated rollups of the datasets
+A cube holds a few hundred rows and answers the KPI cards and charts without
+scanning every order again.
+"""
+import pandas as pd
+
+from timing import timed
+
+# Money columns of the orders export that are summed per cube cell
+ORDER_SUM_COLUMNS = ['Total Value', 'Commission', 'Net Value', 'Merchandise Value', 'Shipment Costs']
+
+
+@timed('orders cube')
+def orders_cube(df):
+    """
+    Orders rolled up per Month x Country
+    Returns: DataFrame with Month, Country, Orders (count), one sum per money
+             column and Net Min / Net Max (smallest and largest order, net)
+    """
+    month = df['Date of Purchase'].values.astype('datetime64[M]').astype('datetime64[ns]')
+    sums = {c: (c, 'sum') for c in ORDER_SUM_COLUMNS if c in df.columns}
+    return (
+        df.assign(Month=month)
+        .groupby(['Month', 'Country'], observed=True, dropna=False)
+        .agg(Orders=('Net Value', 'size'), **sums,
+             **{'Net Min': ('Net Value', 'min'), 'Net Max': ('Net Value', 'max')})
+        .reset_index()
+    )
+
+
+@timed('expenses cube')
+def expenses_cube(df):
+    """
+    Expenses rolled up per Month x Cost_Category x Store_Country
+    Returns: DataFrame with Month, Cost_Category, Store_Country, Transactions
+             (count) and Item_Price (sum); a mean is Item_Price / Transactions
+    """
+    month = df['Order_Date'].values.astype('datetime64[M]').astype('datetime64[ns]')
+    return (
+        df.assign(Month=month)
+        .groupby(['Month', 'Cost_Category', 'Store_Country'], observed=True, dropna=False)
+        .agg(Transactions=('Item_Price', 'size'), Item_Price=('Item_Price', 'sum'))
+        .reset_index()
+    )
+
+
+@timed('rollup')
+def rollup(cube, by=None):
+    """
+    Roll a cube further up: counts and sums add up, Min/Max columns combine
+    by: column(s) to keep, e.g. 'Month' or 'Country'; None returns the grand
+        totals as a Series
+    """
+    keys = [by] if isinstance(by, str) else list(by or [])
+    values = [c for c in cube.columns if c not in keys and not pd.api.types.is_datetime64_any_dtype(cube[c])
+              and pd.api.types.is_numeric_dtype(cube[c])]
+    how = {c: 'min' if c.endswith(' Min') else 'max' if c.endswith(' Max') else 'sum' for c in values}
+    if not keys:
+        return cube[values].agg(how)
+    return cube.groupby(keys, observed=True).agg(how).reset_index()
@@ -0,0 +1,101 @@
+"""
+Typed, compact schema per dataset plus memory accounting
+All sessions share one process, so the resident size of the cached frames
+limits how many concurrent viewers the app can serve.
+"""
+import pandas as pd
+
+# Money stays float64: totals are shown to the cent and float32 sums drift
+MONEY = 'float64'
+# Free text with few repeats: Arrow-backed strings instead of Python objects
+TEXT = 'string[pyarrow]'
+
+SCHEMAS = {
+    'orders': {
+        'Date of Purchase':  'datetime64[ns]',
+        'Country':           'category',
+        'Merchandise Value': MONEY,
+        'Shipment Costs':    MONEY,
+        'Total Value':       MONEY,
+        'Commission':        MONEY,
+        'Net Value':         MONEY,
+    },
+    'articles': {
+        'name':          TEXT,
+        'card_prices':   MONEY,
+        'card_rarities': 'category',
+        'set_names':     'category',
+    },
+    'expenses': {
+        'Order_Date':    'datetime64[ns]',
+        'Store_Name':    'category',
+        'Store_Country': 'category',
+        'Cost_Category': 'category',
+        'Item_Price':    MONEY,
+        'Description':   TEXT,
+    },
+}
+
+
+# How numbers are written in the CSV exports. The readers only take one
+# setting per file, so this is per dataset rather than per column.
+CSV_FORMATS = {
+    'orders':   {'decimal': ','},
+    'articles': {'decimal': ','},
+}
+
+
+def apply_schema(df, dataset):
+    """
+    Cast the known columns of `dataset` to their schema dtype; any other
+    numeric column is downcast to the smallest type that holds its values
+    """
+    schema = SCHEMAS[dataset]
+    df = df.astype({c: t for c, t in schema.items() if c in df.columns})
+    for col in df.columns:
+        if col in schema or pd.api.types.is_bool_dtype(df[col]):
+            continue
+        if pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+        elif pd.api.types.is_float_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast='float')
+    return df
+
+
+def _uncompacted(series):
+    # What the column would cost as loaded without a schema
+    if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(series):
+        return series.astype(object)
+    if pd.api.types.is_integer_dtype(series):
+        return series.astype('int64')
+    if pd.api.types.is_float_dtype(series):
+        return series.astype('float64')
+    return series
+
+
+def memory_report(frames):
+    """
+    Bytes per column before (plain object / 64-bit columns) and after the schema
+    frames: dict of dataset name -> DataFrame, or -> list of DataFrames when a
+            dataset is held in several frames (projections, models, cubes)
+    Returns: DataFrame with Dataset, Frame, Column, Dtype, Before, After and Saved (%)
+    """
+    rows = []
+    for dataset, held in frames.items():
+        for df in held if isinstance(held, (list, tuple)) else [held]:
+            if df is None:
+                continue
+            frame = f"{getattr(df, 'dataset', dataset)} ({len(df.columns)} columns)"
+            for col in df.columns:
+                before = _uncompacted(df[col]).memory_usage(index=False, deep=True)
+                after = df[col].memory_usage(index=False, deep=True)
+                rows.append({
+                    'Dataset': dataset,
+                    'Frame':   frame,
+                    'Column':  col,
+                    'Dtype':   str(df[col].dtype),
+                    'Before':  before,
+                    'After':   after,
+                    'Saved (%)': round((1 - after / before) * 100, 1) if before else 0.0,
+                })
+    return pd.DataFrame(rows, columns=['Dataset', 'Frame', 'Column', 'Dtype', 'Before', 'After', 'Saved (%)'])
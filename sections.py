@@ -0,0 +1,147 @@
+"""
+Lazily rendered page sections
+A page declares its sections together with the data each one needs. Only the
+open section runs, and only the datasets and aggregations it asks for are
+loaded or built; the others cost nothing until they are opened.
+"""
+import inspect
+import time
+
+import streamlit as st
+
+from timing import timed
+
+# st.tabs can only run the selected tab alone once it reports which tab is open
+LAZY_TABS = 'on_change' in inspect.signature(st.tabs).parameters
+# Same for st.expander and whether it is expanded
+LAZY_EXPANDERS = 'on_change' in inspect.signature(st.expander).parameters
+
+
+def lazy_expander(label, key):
+    """
+    Collapsed expander whose body only needs to run while it is open
+
+        box, is_open = lazy_expander("📋 Raw Transactions", key='costs_raw')
+        if is_open:
+            with box:
+                ...
+
+    Returns: (expander, whether it is open); older Streamlit can't tell, so a
+             toggle inside the expander decides instead
+    """
+    if LAZY_EXPANDERS:
+        box = st.expander(label, expanded=False, key=key, on_change='rerun')
+        return box, bool(box.open)
+    box = st.expander(label, expanded=False)
+    return box, box.toggle("Show rows", key=key)
+
+
+class LazyData:
+    """
+    Named datasets and aggregations, each built on first use and kept for the
+    rest of the run
+
+        data = LazyData(cube=load_orders_cube)
+
+        @data.add('by_country', needs=['cube'])
+        def by_country(cube):
+            ...
+
+    loaders: {name: function()} for the datasets themselves
+    A name is None when its loader returned None or one of its needs is None.
+    """
+
+    def __init__(self, **loaders):
+        self._builders = {name: ((), load) for name, load in loaders.items()}
+        self._values = {}
+        self.timings = {}
+
+    def add(self, name, needs=()):
+        """
+        Decorator registering an aggregation of other names; the function is
+        called with the values named in `needs` as keyword arguments
+        """
+        def register(build):
+            self._builders[name] = (tuple(needs), build)
+            return build
+        return register
+
+    def __getitem__(self, name):
+        if name not in self._values:
+            needs, build = self._builders[name]
+            inputs = {need: self[need] for need in needs}
+            start = time.perf_counter()
+            if any(value is None for value in inputs.values()):
+                self._values[name] = None
+            else:
+                with timed(name):
+                    self._values[name] = build(**inputs)
+            self.timings[name] = (time.perf_counter() - start) * 1000
+        return self._values[name]
+
+
+class Sections:
+    """
+    Page sections shown as tabs, of which only the open one is rendered
+
+        sections = Sections(data)
+
+        @sections.add("🌍 Geography", needs=['by_country'])
+        def geography(by_country):
+            ...
+
+        sections.render(key='analytics_section')
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._sections = []
+
+    def add(self, label, needs=()):
+        """
+        Decorator registering a section; the function is called with the
+        datasets named in `needs` as keyword arguments
+        """
+        def register(render):
+            self._sections.append((label, tuple(needs), render))
+            return render
+        return register
+
+    def render(self, key):
+        """
+        Tabs of every section, rendering only the selected one
+        Returns: {label: {'data_ms', 'render_ms'}} for the section(s) rendered
+        """
+        labels = [label for label, _, _ in self._sections]
+        if LAZY_TABS:
+            tabs = st.tabs(labels, key=key, on_change='rerun')
+            containers = [(tab, tab.open) for tab in tabs]
+        else:
+            # Older Streamlit runs the body of every tab; a radio keeps it to one
+            selected = st.radio("Section", labels, horizontal=True, key=key, label_visibility='collapsed')
+            containers = [(st.container(), label == selected) for label in labels]
+
+        timings = {}
+        for (label, needs, render), (container, is_open) in zip(self._sections, containers):
+            if not is_open:
+                continue
+            with container, timed(label, cache=True):
+                timings[label] = self._render_one(needs, render)
+        st.session_state[f"{key}_timings"] = timings
+        return timings
+
+    def _render_one(self, needs, render):
+        start = time.perf_counter()
+        inputs = {name: self.data[name] for name in needs}
+        loaded = time.perf_counter()
+        if any(value is None for value in inputs.values()):
+            st.error("Could not load data. Please check your S3 bucket configuration.")
+            return {'data_ms': (loaded - start) * 1000, 'render_ms': 0.0}
+
+        render(**inputs)
+        done = time.perf_counter()
+        timing = {'data_ms': (loaded - start) * 1000, 'render_ms': (done - loaded) * 1000}
+        st.caption(f"Section built in {timing['data_ms'] + timing['render_ms']:,.0f} ms · "
+                   f"data {timing['data_ms']:,.0f} ms ({', '.join(needs) or 'none'}) · "
+                   f"charts {timing['render_ms']:,.0f} ms")
+        return timing
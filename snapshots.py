@@ -0,0 +1,140 @@
+"""
+Columnar snapshots of the raw exports
+Every export is parsed once per content version into a typed Parquet snapshot.
+Later loads read that snapshot directly and only the columns a page asks for.
+A snapshot is a directory of Parquet parts, so rows appended to an export can
+be added as a new part without rewriting the history.
+"""
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from export_cache import CACHE_DIR
+
+SNAPSHOT_DIR = CACHE_DIR / "snapshots"
+
+# Read string columns as Arrow-backed pandas strings instead of Python objects
+_ARROW_STRINGS = {pa.string(): pd.StringDtype('pyarrow'), pa.large_string(): pd.StringDtype('pyarrow')}
+
+# Versions kept per dataset: the new snapshot and the one it replaces, which
+# sessions still read until the reloaded path is swapped in
+KEEP_VERSIONS = 2
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def snapshot_lock(name):
+    """
+    Lock held while a snapshot of dataset `name` is being built
+    """
+    with _locks_guard:
+        return _locks.setdefault(name, threading.Lock())
+
+
+def snapshot_path(name, version):
+    """
+    Directory of the snapshot of dataset `name` at content `version`
+    """
+    return SNAPSHOT_DIR / f"{name}-{version}"
+
+
+def _parts(path):
+    return sorted(path.glob("part-*.parquet"))
+
+
+def _tmp_dir(path):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    return tmp
+
+
+def _publish(tmp, path, name, meta):
+    with open(tmp / "_meta.json", "w") as f:
+        json.dump(meta or {}, f, indent=2, default=str)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+
+    built = [p for p in SNAPSHOT_DIR.glob(f"{name}-*") if p != path and not p.name.endswith(".tmp")]
+    built.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in built[KEEP_VERSIONS - 1:]:
+        shutil.rmtree(old, ignore_errors=True)
+    return path
+
+
+def write_snapshot(df, name, version, meta=None):
+    """
+    Write a snapshot atomically and drop older versions of the same dataset,
+    all but the one it replaces
+    meta: small JSON-serialisable dict stored next to the data
+    """
+    path = snapshot_path(name, version)
+    tmp = _tmp_dir(path)
+    df.to_parquet(tmp / "part-00000.parquet", index=False)
+    return _publish(tmp, path, name, meta)
+
+
+def append_snapshot(df, name, version, previous_version, meta=None):
+    """
+    Build snapshot `version` from `previous_version` plus the rows in `df`
+    The existing parts are hard-linked, not rewritten, so this costs O(len(df)).
+    Raises if `df` doesn't fit the schema of the previous snapshot.
+    """
+    previous = snapshot_path(name, previous_version)
+    parts = _parts(previous)
+    schema = pq.read_schema(parts[0])
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+    path = snapshot_path(name, version)
+    tmp = _tmp_dir(path)
+    for part in parts:
+        try:
+            os.link(part, tmp / part.name)
+        except OSError:
+            shutil.copy2(part, tmp / part.name)
+    pq.write_table(table, tmp / f"part-{len(parts):05d}.parquet")
+    return _publish(tmp, path, name, meta)
+
+
+def ensure_snapshot(name, version, build, meta=None):
+    """
+    Return the snapshot path, building it with `build()` if it doesn't exist yet
+    meta: optional function turning the built DataFrame into the snapshot metadata
+    """
+    path = snapshot_path(name, version)
+    if path.exists():
+        return path
+    with snapshot_lock(name):
+        if path.exists():
+            return path
+        df = build()
+        return write_snapshot(df, name, version, meta(df) if meta else None)
+
+
+def read_snapshot_meta(path):
+    """
+    Metadata stored with a snapshot ({} if there is none)
+    """
+    try:
+        with open(os.path.join(path, "_meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def read_snapshot(path, columns=None):
+    """
+    Read a snapshot, projecting to `columns` (unknown columns are ignored)
+    """
+    dataset = ds.dataset([str(p) for p in _parts(Path(path))], format="parquet")
+    if columns is not None:
+        columns = [c for c in columns if c in dataset.schema.names]
+    return dataset.to_table(columns=columns).to_pandas(types_mapper=_ARROW_STRINGS.get)
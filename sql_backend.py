@@ -0,0 +1,327 @@
+"""
+Optional DuckDB query backend over the Parquet snapshots
+With MTG_QUERY_BACKEND=duckdb the cubes and the metrics that scan every row
+(the rarity and set groupbys, price and value buckets, KPI cards of the
+articles) run as SQL on the snapshot files instead of pandas on the loaded
+frame. DuckDB only reads the columns a query uses, applies the filters while
+scanning and hands back the result, so only result-sized frames reach Python.
+Every query returns what its pandas counterpart in rollups.py / metrics.py
+returns, same columns, order and dtypes, so the two can be compared (see
+benchmarks/compare_backends.py). duckdb is optional; without it, or with any
+other backend setting, everything runs on pandas.
+"""
+import os
+import threading
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from binning import (
+    PRICE_BUCKET_BINS, PRICE_BUCKET_LABELS, VALUE_BUCKET_BINS, VALUE_BUCKET_LABELS, fixed_edges,
+)
+import precomputed
+from rollups import ORDER_SUM_COLUMNS
+from schema import SCHEMAS
+from snapshots import SNAPSHOT_DIR
+from timing import timed
+
+try:
+    import duckdb
+except ImportError:  # optional, pandas is the fallback
+    duckdb = None
+
+# 'pandas' (default) or 'duckdb'
+BACKEND = os.environ.get("MTG_QUERY_BACKEND", "pandas").strip().lower()
+
+if BACKEND == "duckdb" and duckdb is None:
+    warnings.warn("MTG_QUERY_BACKEND=duckdb but duckdb isn't installed; aggregates run on pandas")
+
+QUERIES = {}  # metric name -> its SQL counterpart, called with the snapshot path instead of the frame
+
+_db = None
+_db_lock = threading.Lock()
+
+
+def enabled():
+    """
+    Whether cubes and metrics run as SQL on the snapshot files
+    """
+    return BACKEND == "duckdb" and duckdb is not None
+
+
+def metric(func):
+    """
+    Decorator registering func(path, ...) as the SQL counterpart of the
+    metric of the same name in metrics.py
+    """
+    QUERIES[func.__name__] = func
+    return func
+
+
+def snapshot_dir(version):
+    """
+    Folder of the dataset snapshot `version` ('orders-<hash>', the version of
+    every frame and cube the loaders hand out)
+    """
+    bundle = precomputed.current()
+    return Path(bundle['path'] if bundle else SNAPSHOT_DIR) / version
+
+
+def _database():
+    # One in-memory database per process; every query gets its own cursor, so
+    # sessions on different threads don't share one
+    global _db
+    with _db_lock:
+        if _db is None:
+            _db = duckdb.connect()
+        return _db
+
+
+def query(sql, params=()):
+    """
+    Run `sql` with `params` on the in-memory database
+    Returns: the result as a DataFrame
+    """
+    with timed('sql'):
+        with _database().cursor() as cursor:
+            return cursor.execute(sql, list(params)).df()
+
+
+def _parts(path):
+    return [str(p) for p in sorted(Path(path).glob("part-*.parquet"))]
+
+
+def _columns(parts):
+    return pq.read_schema(parts[0]).names
+
+
+def _typed(df, dataset):
+    # Back to the dtypes the pandas path has: categoricals, Arrow strings,
+    # nanosecond timestamps
+    schema = {**SCHEMAS[dataset], 'Month': 'datetime64[ns]'}
+    return df.astype({c: t for c, t in schema.items() if c in df.columns})
+
+
+def _bin_counts(parts, column, edges, closed):
+    # Values per bin, with the edges compared exactly as binning.py does:
+    # [left, right) and the last bin closed for a histogram, (left, right] for
+    # buckets. Values outside the edges and NULLs aren't counted.
+    n = len(edges) - 1
+    x = f'"{column}"'
+    below, lowest = ('<=', '>') if closed == 'right' else ('<', '>=')
+    bins = ' '.join(f'WHEN {x} {below} ${i + 3} THEN {i}' for i in range(n - 1))
+    found = query(f"""
+        SELECT CASE {bins} ELSE {n - 1} END AS bin, count(*) AS n
+        FROM read_parquet($1)
+        WHERE {x} {lowest} $2 AND {x} <= ${n + 2}
+        GROUP BY 1
+    """, [parts, *map(float, edges)])
+    counts = np.zeros(n, dtype='int64')
+    counts[found['bin'].to_numpy()] = found['n'].to_numpy()
+    return counts
+
+
+# ── Cubes ─────────────────────────────────────────────────────────────────────
+@timed('orders cube')
+def orders_cube(path):
+    """
+    rollups.orders_cube of the orders snapshot at `path`, grouped in SQL
+    Returns: DataFrame with Month, Country, Orders, the money sums, Net Min and Net Max
+    """
+    parts = _parts(path)
+    sums = [c for c in ORDER_SUM_COLUMNS if c in _columns(parts)]
+    cube = query(f"""
+        SELECT date_trunc('month', "Date of Purchase") AS "Month", "Country",
+               count(*) AS "Orders",
+               {''.join(f'coalesce(fsum("{c}"), 0) AS "{c}", ' for c in sums)}
+               min("Net Value") AS "Net Min", max("Net Value") AS "Net Max"
+        FROM read_parquet($1)
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """, [parts])
+    return _typed(cube, 'orders')
+
+
+@timed('expenses cube')
+def expenses_cube(path):
+    """
+    rollups.expenses_cube of the expenses snapshot at `path`, grouped in SQL
+    Returns: DataFrame with Month, Cost_Category, Store_Country, Transactions and Item_Price
+    """
+    cube = query("""
+        SELECT date_trunc('month', "Order_Date") AS "Month", "Cost_Category", "Store_Country",
+               count(*) AS "Transactions", coalesce(fsum("Item_Price"), 0) AS "Item_Price"
+        FROM read_parquet($1)
+        GROUP BY 1, 2, 3
+        ORDER BY 1, 2, 3
+    """, [_parts(path)])
+    return _typed(cube, 'expenses')
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+# Same names and arguments as in metrics.py, with the snapshot path in place of
+# the frame. Sums are compensated (fsum) like pandas' groupby sums, and ties and
+# rounding are left to pandas on the small result, so both paths agree to the cent.
+@metric
+def article_kpis(path):
+    parts = _parts(path)
+    totals = query("""
+        SELECT count(*) AS sold, coalesce(fsum(card_prices), 0) AS revenue,
+               avg(card_prices) AS avg_price, median(card_prices) AS median_price
+        FROM read_parquet($1)
+    """, [parts]).iloc[0]
+    # The first of the highest prices, in row order, as idxmax picks it
+    name = 'name' if 'name' in _columns(parts) else "''"
+    top = query(f"""
+        SELECT card_prices, {name} AS name
+        FROM read_parquet($1, filename = true, file_row_number = true)
+        WHERE card_prices IS NOT NULL
+        ORDER BY card_prices DESC, filename, file_row_number
+        LIMIT 1
+    """, [parts])
+    return {
+        'sold': int(totals['sold']),
+        'revenue': totals['revenue'],
+        'avg_price': totals['avg_price'],
+        'median_price': totals['median_price'],
+        'top_price': top['card_prices'].iloc[0] if not top.empty else None,
+        'top_name': top['name'].iloc[0] if not top.empty else '',
+    }
+
+
+@metric
+def price_histogram(path, bins=30):
+    parts = _parts(path)
+    lo, hi = query("SELECT min(card_prices), max(card_prices) FROM read_parquet($1)", [parts]).iloc[0]
+    edges = fixed_edges([] if pd.isna(lo) else [lo, hi], bins)
+    return pd.DataFrame({'Left': edges[:-1], 'Right': edges[1:], 'Count': _bin_counts(parts, 'card_prices', edges, 'left')})
+
+
+@metric
+def price_buckets(path):
+    counts = _bin_counts(_parts(path), 'card_prices', PRICE_BUCKET_BINS, 'right')
+    return pd.DataFrame({'Bucket': list(PRICE_BUCKET_LABELS), 'Count': counts})
+
+
+@metric
+def weekday_orders(path):
+    # Every weekday, Monday first (2024-01-01 was one), also those without orders
+    return query("""
+        WITH counts AS (
+            SELECT isodow("Date of Purchase") AS dow, count(*) AS n
+            FROM read_parquet($1)
+            WHERE "Date of Purchase" IS NOT NULL
+            GROUP BY 1
+        )
+        SELECT dayname(DATE '2024-01-01' + i::INTEGER) AS "Day", coalesce(n, 0) AS "Orders"
+        FROM range(7) AS days(i) LEFT JOIN counts ON dow = i + 1
+        ORDER BY i
+    """, [_parts(path)])
+
+
+@metric
+def value_buckets(path):
+    counts = _bin_counts(_parts(path), 'Net Value', VALUE_BUCKET_BINS, 'right')
+    return pd.DataFrame({'Bucket': list(VALUE_BUCKET_LABELS), 'Count': counts})
+
+
+@metric
+def rarity_stats(path):
+    stats = query("""
+        SELECT card_rarities, count(card_prices) AS "Count", coalesce(fsum(card_prices), 0) AS "Total",
+               fsum(card_prices) / count(card_prices) AS "Avg"
+        FROM read_parquet($1)
+        WHERE card_rarities IS NOT NULL
+        GROUP BY 1
+        ORDER BY 1
+    """, [_parts(path)])
+    return (
+        _typed(stats, 'articles')
+        .round(2)
+        .sort_values('Total', ascending=False).reset_index(drop=True)
+    )
+
+
+@metric
+def set_stats(path):
+    stats = query("""
+        SELECT set_names, count(card_prices) AS "Cards_Sold", coalesce(fsum(card_prices), 0) AS "Total_Revenue",
+               fsum(card_prices) / count(card_prices) AS "Avg_Price"
+        FROM read_parquet($1)
+        WHERE set_names IS NOT NULL
+        GROUP BY 1
+        ORDER BY 1
+    """, [_parts(path)])
+    return _typed(stats, 'articles').round(2)
+
+
+@metric
+def sold_kpis(path):
+    totals = query("""
+        SELECT count(*) AS sold, coalesce(fsum(card_prices), 0) AS revenue, count(DISTINCT set_names) AS unique_sets
+        FROM read_parquet($1)
+    """, [_parts(path)]).iloc[0]
+    return {'sold': int(totals['sold']), 'revenue': totals['revenue'], 'unique_sets': int(totals['unique_sets'])}
+
+
+@metric
+def rarity_counts(path):
+    counts = query("""
+        SELECT card_rarities, count(*) AS "count"
+        FROM read_parquet($1)
+        WHERE card_rarities IS NOT NULL
+        GROUP BY 1
+        ORDER BY 1
+    """, [_parts(path)])
+    return _typed(counts, 'articles').set_index('card_rarities')['count'].sort_values(ascending=False)
+
+
+@metric
+def set_counts(path):
+    counts = query("""
+        SELECT set_names, count(*) AS "count"
+        FROM read_parquet($1)
+        WHERE set_names IS NOT NULL
+        GROUP BY 1
+        ORDER BY 1
+    """, [_parts(path)])
+    return _typed(counts, 'articles')
+
+
+@metric
+def set_values(path):
+    values = query("""
+        SELECT set_names, coalesce(fsum(card_prices), 0) AS total_value
+        FROM read_parquet($1)
+        WHERE set_names IS NOT NULL
+        GROUP BY 1
+        ORDER BY 1
+    """, [_parts(path)])
+    return _typed(values, 'articles')
+
+
+# ── Rows ──────────────────────────────────────────────────────────────────────
+def transactions(path, categories, countries, columns=None):
+    """
+    metrics.transactions on the expenses snapshot at `path`: the filter runs
+    while scanning and only `columns` (default: all) are read
+    Raises KeyError for columns the snapshot doesn't have (derived model columns)
+    Returns: DataFrame of the matching rows, in snapshot order
+    """
+    parts = _parts(path)
+    present = _columns(parts)
+    columns = columns or present
+    missing = [c for c in columns if c not in present]
+    if missing:
+        raise KeyError(f"Not in the expenses snapshot: {', '.join(missing)}")
+    select = ', '.join(f'"{c}"' for c in columns)
+    rows = query(f"""
+        SELECT {select}
+        FROM read_parquet($1, filename = true, file_row_number = true)
+        WHERE list_contains($2, "Cost_Category") AND list_contains($3, "Store_Country")
+        ORDER BY filename, file_row_number
+    """, [parts, list(categories), list(countries)])
+    return _typed(rows, 'expenses')
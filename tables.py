@@ -0,0 +1,136 @@
+"""
+Paginated tables for the raw-data expanders
+Only one page is sorted into place, styled and sent to the browser, so the
+cost of a table stays flat however many rows the frame has.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from timing import timed
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+# The 9 anchor colours of matplotlib's sequential colormaps of the same name
+PALETTES = {
+    'Blues':   ['#f7fbff', '#deebf7', '#c6dbef', '#9ecae1', '#6baed6', '#4292c6', '#2171b5', '#08519c', '#08306b'],
+    'Purples': ['#fcfbfd', '#efedf5', '#dadaeb', '#bcbddc', '#9e9ac8', '#807dba', '#6a51a3', '#54278f', '#3f007d'],
+}
+# Same rule as pandas' background_gradient: light text on dark cells
+TEXT_COLOR_THRESHOLD = 0.408
+
+
+def _sort_keys(series):
+    # Numbers that order like the column (missing values are handled by the caller)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.to_numpy().view('i8')
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype='float64', na_value=np.nan)
+    return pd.factorize(series, sort=True)[0]
+
+
+def page_positions(series, ascending, offset, size):
+    """
+    Row positions of rows offset .. offset+size of `series` sorted like
+    sort_values(kind='stable') would (missing values last), without sorting
+    the whole column: one O(n) partition plus a sort of offset+size rows
+    Returns: numpy array of positions, usable with .iloc
+    """
+    missing = series.isna().to_numpy()
+    valid = np.flatnonzero(~missing)
+    keys = _sort_keys(series)[valid]
+    if not ascending:
+        keys = -keys
+    k = min(offset + size, len(valid))
+
+    if k < len(valid):
+        # Everything below the k-th key, then ties in row order until k rows
+        kth = np.partition(keys, k - 1)[k - 1]
+        below = np.flatnonzero(keys < kth)
+        ties = np.flatnonzero(keys == kth)[:k - len(below)]
+        head = np.concatenate([below, ties])
+    else:
+        head = np.arange(len(valid))
+    head = head[np.lexsort((head, keys[head]))]
+
+    order = valid[head]
+    if offset + size > len(valid):
+        order = np.concatenate([order, np.flatnonzero(missing)])
+    return order[offset:offset + size]
+
+
+def _relative_luminance(rgb):
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    return linear @ np.array([0.2126, 0.7152, 0.0722])
+
+
+def gradient_css(values, vmin, vmax, cmap='Blues'):
+    """
+    background_gradient as plain CSS strings, computed with numpy for just `values`
+    vmin / vmax: range of the whole column, so colours don't change per page
+    Returns: list of CSS strings, '' for missing values
+    """
+    anchors = np.array([[int(c[i:i + 2], 16) for i in (1, 3, 5)] for c in PALETTES[cmap]]) / 255
+    values = np.asarray(values, dtype='float64')
+    span = vmax - vmin
+    pos = np.nan_to_num((values - vmin) / span) if span else np.zeros_like(values)
+
+    # 256-colour lookup table, like matplotlib, so cells match background_gradient
+    lut_pos = np.linspace(0, 1, 256)
+    stops = np.linspace(0, 1, len(anchors))
+    lut = np.column_stack([np.interp(lut_pos, stops, anchors[:, i]) for i in range(3)])
+    rgb = lut[np.clip((pos * 256).astype(int), 0, 255)]
+    text = np.where(_relative_luminance(rgb) < TEXT_COLOR_THRESHOLD, '#f1f1f1', '#000000')
+    hexes = ['#{:02x}{:02x}{:02x}'.format(*c) for c in np.rint(rgb * 255).astype(int)]
+    return [
+        '' if np.isnan(v) else f'background-color: {h}; color: {t};'
+        for v, h, t in zip(values, hexes, text)
+    ]
+
+
+@timed('table')
+def paginated_table(df, key, columns=None, sort_by=None, ascending=False, formats=None,
+                    gradient=None, cmap='Blues', height=350):
+    """
+    st.dataframe of one page of `df`, with sort, page size and page controls
+    key: unique prefix for the widget keys of this table
+    columns: columns to show (default: all)
+    sort_by / ascending: initial sort
+    formats: {column: format string} for the shown page, e.g. {'Net Value': '€{:.2f}'}
+    gradient: column to colour with `cmap`, scaled to that column's full range
+    """
+    columns = list(columns or df.columns)
+    size_key, page_key = f"{key}_size", f"{key}_page"
+
+    def first_page():
+        st.session_state[page_key] = 1
+
+    c_sort, c_order, c_size, c_page = st.columns([3, 2, 2, 2])
+    sort_col = c_sort.selectbox("Sort by", columns, index=columns.index(sort_by or columns[0]),
+                                key=f"{key}_sort", on_change=first_page)
+    descending = c_order.radio("Order", ["Descending", "Ascending"], index=int(ascending),
+                               horizontal=True, key=f"{key}_order", on_change=first_page) == "Descending"
+    size = c_size.selectbox("Rows per page", PAGE_SIZES, index=1, key=size_key, on_change=first_page)
+
+    n_pages = max(1, -(-len(df) // size))
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages
+    page_no = c_page.number_input("Page", min_value=1, max_value=n_pages, step=1, key=page_key)
+
+    offset = (page_no - 1) * size
+    page = df.iloc[page_positions(df[sort_col], not descending, offset, size)][columns]
+    page.index = pd.RangeIndex(offset, offset + len(page))
+
+    if formats or gradient:
+        styler = page.style.format({c: f for c, f in (formats or {}).items() if c in columns})
+        if gradient:
+            full = df[gradient]
+            css = gradient_css(page[gradient], full.min(), full.max(), cmap)
+            styler = styler.apply(lambda _: css, subset=[gradient], axis=0)
+        page = styler
+
+    st.dataframe(page, use_container_width=True, height=height)
+    st.caption(f"Rows {offset + 1 if len(df) else 0:,}–{offset + size if offset + size < len(df) else len(df):,} "
+               f"of {len(df):,} · page {page_no} of {n_pages}")
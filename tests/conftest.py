@@ -0,0 +1,120 @@
+"""
+Fixtures shared by the tests: a scratch export cache and a local HTTP
+stand-in for the S3 bucket the exports are downloaded from
+"""
+import hashlib
+import socket
+import sys
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class StandIn:
+    """
+    HTTP server on 127.0.0.1 serving the files in `root`, answering
+    If-None-Match with 304 and Range with 206 (416 past the end) like S3;
+    `requests` logs (file, status) per GET
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, name):
+        return f"http://127.0.0.1:{self.server.server_port}/{name}"
+
+    def write(self, name, data):
+        (self.root / name).write_bytes(data)
+
+    def statuses(self, last):
+        return [status for _, status in self.requests[-last:]]
+
+    def handle(self, request):
+        path = self.root / request.path.rsplit('/', 1)[-1]
+        if not path.exists():
+            return self.reply(request, path.name, 404)
+        data = path.read_bytes()
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        headers = {'ETag': etag, 'Last-Modified': formatdate(path.stat().st_mtime, usegmt=True)}
+        if request.headers.get('If-None-Match') == etag:
+            return self.reply(request, path.name, 304, headers)
+        ranged = request.headers.get('Range', '')
+        if ranged.startswith('bytes='):
+            start = int(ranged[len('bytes='):].split('-')[0])
+            if start >= len(data):
+                return self.reply(request, path.name, 416, {'Content-Range': f'bytes */{len(data)}'})
+            headers['Content-Range'] = f'bytes {start}-{len(data) - 1}/{len(data)}'
+            return self.reply(request, path.name, 206, headers, data[start:])
+        self.reply(request, path.name, 200, headers, data)
+
+    def reply(self, request, name, status, headers=None, body=b''):
+        self.requests.append((name, status))
+        request.send_response(status)
+        for key, value in (headers or {}).items():
+            request.send_header(key, value)
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """
+    Downloads and snapshots go to a scratch folder, never to the app's own cache
+    """
+    import export_cache
+    import snapshots
+    import sql_backend
+
+    folder = tmp_path / 'cache'
+    monkeypatch.setenv('MTG_CACHE_DIR', str(folder))
+    monkeypatch.setattr(export_cache, 'CACHE_DIR', folder)
+    monkeypatch.setattr(snapshots, 'SNAPSHOT_DIR', folder / 'snapshots')
+    monkeypatch.setattr(sql_backend, 'SNAPSHOT_DIR', folder / 'snapshots')
+    return folder
+
+
+@pytest.fixture
+def s3(tmp_path, cache_dir):
+    """
+    S3 stand-in serving tmp_path/s3
+    """
+    root = tmp_path / 's3'
+    root.mkdir()
+    server = StandIn(root)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def closed_port_url():
+    """
+    URL of a file on a port nothing listens on: the connection is refused, as when S3 is down
+    """
+    def url(name):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        return f"http://127.0.0.1:{port}/{name}"
+    return url
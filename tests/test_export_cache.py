@@ -0,0 +1,94 @@
+"""
+export_cache.fetch_export against the S3 stand-in: the conditional GET (200,
+304, offline fallback) and the incremental fetch with Range requests
+"""
+from pathlib import Path
+
+import pandas as pd
+
+from export_cache import fetch_export, local_path
+from snapshots import ensure_snapshot
+
+ORDERS = b"Date of Purchase,Country,Total Value\n2024-01-01 10:00:00,Germany,\"12,50\"\n"
+# Longer than export_cache.APPEND_OVERLAP, so a Range request starts mid-file
+HISTORY = ORDERS + b"2024-01-02 11:00:00,France,\"7,25\"\n" * 200
+NEW_ROWS = b"2024-02-01 09:30:00,Italy,\"3,10\"\n" * 3
+
+
+def test_first_download(s3):
+    s3.write('orders.csv', ORDERS)
+    meta = fetch_export(s3.url('orders.csv'))
+    assert meta['status'] == 'downloaded'
+    assert s3.requests == [('orders.csv', 200)]
+    assert local_path(s3.url('orders.csv')).read_bytes() == ORDERS
+    assert meta['etag'] and meta['size'] == len(ORDERS)
+
+
+def test_not_modified_is_not_parsed_again(s3):
+    parses = []
+
+    def parse(path):
+        parses.append(path)
+        return pd.read_csv(path)
+
+    s3.write('orders.csv', ORDERS)
+    first = fetch_export(s3.url('orders.csv'))
+    ensure_snapshot('orders', first['version'], lambda: parse(first['path']))
+    again = fetch_export(s3.url('orders.csv'))
+    assert again['status'] == 'not-modified'
+    assert s3.requests[-1] == ('orders.csv', 304)
+    assert again['version'] == first['version']
+    # Same version, same snapshot: the export isn't parsed again
+    ensure_snapshot('orders', again['version'], lambda: parse(again['path']))
+    assert len(parses) == 1
+
+
+def test_offline_falls_back_to_the_cached_copy(s3, closed_port_url):
+    s3.write('orders.csv', ORDERS)
+    cached = fetch_export(s3.url('orders.csv'))
+    meta = fetch_export(closed_port_url('orders.csv'), timeout=2)
+    assert meta['status'] == 'offline'
+    assert meta['version'] == cached['version'] and meta['path'] == cached['path']
+    assert Path(meta['path']).read_bytes() == ORDERS
+    assert len(s3.requests) == 1
+
+
+def test_appended_export_fetches_only_the_tail(s3):
+    s3.write('history.csv', HISTORY)
+    first = fetch_export(s3.url('history.csv'), incremental=True)
+    assert first['status'] == 'downloaded'
+
+    s3.write('history.csv', HISTORY + NEW_ROWS)
+    meta = fetch_export(s3.url('history.csv'), incremental=True)
+    assert meta['status'] == 'appended'
+    assert s3.requests[-1] == ('history.csv', 206)
+    assert local_path(s3.url('history.csv')).read_bytes() == HISTORY + NEW_ROWS
+    assert meta['appended_from'] == len(HISTORY) and meta['size'] == len(HISTORY + NEW_ROWS)
+    assert meta['previous_version'] == first['version'] and meta['version'] != first['version']
+
+    again = fetch_export(s3.url('history.csv'), incremental=True)
+    assert again['status'] == 'not-modified'
+    assert again['version'] == meta['version']
+
+
+def test_rewritten_export_is_downloaded_again(s3):
+    s3.write('rewritten.csv', HISTORY)
+    first = fetch_export(s3.url('rewritten.csv'), incremental=True)
+    # Longer than before, but the bytes before the old end changed
+    changed = HISTORY.replace(b'France', b'Norway') + NEW_ROWS
+    s3.write('rewritten.csv', changed)
+    meta = fetch_export(s3.url('rewritten.csv'), incremental=True)
+    assert meta['status'] == 'downloaded'
+    assert s3.statuses(2) == [206, 200]
+    assert local_path(s3.url('rewritten.csv')).read_bytes() == changed
+    assert 'previous_version' not in meta and meta['version'] != first['version']
+
+
+def test_shrunk_export_is_downloaded_again(s3):
+    s3.write('shrunk.csv', HISTORY)
+    fetch_export(s3.url('shrunk.csv'), incremental=True)
+    s3.write('shrunk.csv', ORDERS)
+    meta = fetch_export(s3.url('shrunk.csv'), incremental=True)
+    assert meta['status'] == 'downloaded'
+    assert s3.statuses(2) == [416, 200]
+    assert local_path(s3.url('shrunk.csv')).read_bytes() == ORDERS
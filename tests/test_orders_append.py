@@ -0,0 +1,99 @@
+"""
+data_loader._ingest_orders: rows appended to the orders export are parsed on
+their own and added to the previous snapshot, and the result is the same as
+parsing the whole export; a tail that can't simply be added reloads everything
+"""
+import os
+
+import pandas as pd
+import pytest
+
+from data_loader import _ingest_orders, _parse_orders
+from snapshots import read_snapshot, read_snapshot_meta
+
+HEADER = "Date of Purchase,Country,Merchandise Value,Shipment Costs,Total Value,Commission\n"
+COUNTRIES = ['Germany', 'France', 'Italy', 'Spain']
+
+
+def order_rows(start, n):
+    # One order per hour from `start`, European decimals as in the export
+    lines = []
+    for i in range(n):
+        at = pd.Timestamp(start) + pd.Timedelta(hours=i)
+        cents = 500 + 37 * i
+        lines.append(f'{at:%Y-%m-%d %H:%M:%S},{COUNTRIES[i % len(COUNTRIES)]},'
+                     f'"{cents // 100},{cents % 100:02d}","1,25",'
+                     f'"{(cents + 125) // 100},{(cents + 125) % 100:02d}","0,{i % 90 + 10}"\n')
+    return ''.join(lines)
+
+
+@pytest.fixture
+def export(tmp_path, cache_dir):
+    """
+    Writes the export as `version` and returns what fetch_export would for it;
+    `appended_from` marks the bytes before it as unchanged since `previous`
+    """
+    def write(text, version, appended_from=None, previous=None):
+        path = tmp_path / f'orders-{version}.csv'
+        path.write_text(text)
+        meta = {'path': str(path), 'version': version, 'size': path.stat().st_size}
+        if appended_from is not None:
+            meta.update(appended_from=appended_from, previous_version=previous)
+        return meta
+    return write
+
+
+def full_parse(meta):
+    return _parse_orders(meta['path'])
+
+
+def assert_same_frame(snapshot, meta):
+    pd.testing.assert_frame_equal(read_snapshot(snapshot), full_parse(meta))
+
+
+def test_appended_rows_are_added_to_the_previous_snapshot(export):
+    history = HEADER + order_rows('2024-01-01', 300)
+    first = _ingest_orders(export(history, 'v1'))
+
+    appended = history + order_rows('2024-03-01', 20)
+    meta = export(appended, 'v2', appended_from=len(history.encode()), previous='v1')
+    second = _ingest_orders(meta)
+
+    assert_same_frame(second, meta)
+    # The earlier part is linked, not rewritten; only the tail is a new file
+    parts = sorted(second.glob('part-*.parquet'))
+    assert len(parts) == 2
+    assert os.path.samefile(parts[0], first / 'part-00000.parquet')
+    state = read_snapshot_meta(second)
+    assert state['rows'] == 320 and state['offset'] == meta['size']
+
+
+def test_out_of_order_tail_reloads_everything(export):
+    history = HEADER + order_rows('2024-03-01', 300)
+    _ingest_orders(export(history, 'v1'))
+
+    # Orders dated before the last ingested one: appending would break the date order
+    appended = history + order_rows('2024-01-15', 20)
+    meta = export(appended, 'v2', appended_from=len(history.encode()), previous='v1')
+    snapshot = _ingest_orders(meta)
+
+    assert_same_frame(snapshot, meta)
+    assert len(list(snapshot.glob('part-*.parquet'))) == 1
+    assert read_snapshot(snapshot)['Date of Purchase'].is_monotonic_increasing
+
+
+def test_tail_with_changed_columns_reloads_everything(export):
+    body = ''.join(line.rstrip('\n') + ',1\n' for line in order_rows('2024-01-01', 300).splitlines(True))
+    history = HEADER.rstrip('\n') + ",Coupon\n" + body
+    _ingest_orders(export(history, 'v1'))
+
+    # Same bytes up to the old end but for a renamed column, so the tail no
+    # longer fits the schema of the previous snapshot
+    renamed = HEADER.rstrip('\n') + ",Rebate\n" + body
+    appended = renamed + ''.join(line.rstrip('\n') + ',2\n' for line in order_rows('2024-03-01', 20).splitlines(True))
+    meta = export(appended, 'v2', appended_from=len(history.encode()), previous='v1')
+    snapshot = _ingest_orders(meta)
+
+    assert_same_frame(snapshot, meta)
+    assert len(list(snapshot.glob('part-*.parquet'))) == 1
+    assert 'Rebate' in read_snapshot(snapshot).columns
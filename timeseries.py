@@ -0,0 +1,34 @@
+"""
+Time-series helpers for the dashboard charts
+"""
+import pandas as pd
+
+
+def cumulative_by_group(df, date_col, group_col, groups=None, value_col=None, freq=None,
+                        name='Cumulative'):
+    """
+    Running total per group over time, as a tidy frame ready for px.area / px.line
+    Groups by date and group, pivots to one column per group and takes a cumsum,
+    so the cost is O(rows + dates x groups).
+    groups: only keep these groups, in this order (default: all, sorted)
+    value_col: sum this column instead of counting rows
+    freq: resample to a pandas offset alias ('W', 'MS', ...); default keeps every
+          distinct date of `df`, including dates where a group had no rows
+    Returns: DataFrame [date_col, group_col, name], grouped by group then date
+    """
+    rows = df if groups is None else df[df[group_col].isin(groups)]
+    grouped = rows.groupby([date_col, group_col], observed=True)
+    per_date = grouped.size() if value_col is None else grouped[value_col].sum()
+    pivot = per_date.unstack(group_col, fill_value=0)
+
+    all_dates = pd.DatetimeIndex(df[date_col].dropna().unique()).sort_values()
+    pivot = pivot.reindex(all_dates, fill_value=0)
+    if freq is not None:
+        pivot = pivot.resample(freq).sum()
+    if groups is not None:
+        pivot = pivot.reindex(columns=list(groups), fill_value=0)
+
+    cumulative = pivot.cumsum()
+    cumulative.index.name = date_col
+    cumulative.columns = pd.Index(list(cumulative.columns), name=group_col)
+    return cumulative.melt(ignore_index=False, value_name=name).reset_index()
@@ -0,0 +1,153 @@
+"""
+Lightweight per-stage timing of the loaders, page sections and charts
+Stages are timed with `timed` (context manager or decorator) and kept in a
+bounded in-process ring buffer, together with the page and rerun they belong
+to and whether their caches hit. The Settings page summarises the buffer.
+"""
+import functools
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+
+# Number of stage timings kept, the oldest are dropped first
+BUFFER_SIZE = int(os.environ.get("MTG_TIMING_BUFFER", 5000))
+
+_records = deque(maxlen=BUFFER_SIZE)  # (page, run, stage, ms, cache, at)
+_records_lock = threading.Lock()
+_runs = itertools.count(1)
+_local = threading.local()
+
+
+class _Timer:
+    def __init__(self, stage, cache):
+        self.stage = stage
+        self.track_cache = cache
+        self.cache = None
+
+    def __enter__(self):
+        # Cached stages count as a hit unless something inside them misses
+        self.cache = 'hit' if self.track_cache else None
+        self._start = time.perf_counter()
+        _stack().append(self)
+        return self
+
+    def __exit__(self, *exc):
+        ms = (time.perf_counter() - self._start) * 1000
+        _stack().pop()
+        record(self.stage, ms, self.cache)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Timer(self.stage, self.track_cache):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def timed(stage, cache=False):
+    """
+    Time a stage, as `with timed('orders fetch'):` or `@timed('load_orders_model')`
+    cache: the stage is served from a cache; it is recorded as a hit unless
+           cache_miss() is called while it runs
+    """
+    return _Timer(stage, cache)
+
+
+def cache_miss():
+    """
+    Called by cached code that had to do the work: marks every stage running
+    in this thread as a miss
+    """
+    for timer in _stack():
+        if timer.cache is not None:
+            timer.cache = 'miss'
+
+
+def record(stage, ms, cache=None):
+    """
+    Add a timing to the buffer, under the page and rerun of this thread
+    """
+    entry = (getattr(_local, 'page', None), getattr(_local, 'run', None), stage, ms, cache, time.time())
+    with _records_lock:
+        _records.append(entry)
+
+
+def start_page(name, fragment=False):
+    """
+    Start of a page rerun; the stages timed in this thread until the next
+    start_page belong to it
+    fragment: called at the top of an @st.fragment of page `name`, which can
+              rerun without the page; starts a rerun of its own (without a
+              'page' total) unless the whole page is running it
+    """
+    if fragment and getattr(_local, 'started', None) is not None and _local.page == name:
+        return
+    _local.page, _local.run = name, next(_runs)
+    _local.started = None if fragment else time.perf_counter()
+
+
+def end_page():
+    """
+    End of a page rerun, records its total time as stage 'page'
+    """
+    started = getattr(_local, 'started', None)
+    if started is not None:
+        record('page', (time.perf_counter() - started) * 1000)
+        _local.started = None
+
+
+def timings(last_runs=None):
+    """
+    The buffer as a DataFrame with Page, Run, Stage, ms, Cache and At
+    last_runs: only the last N reruns of each page (background stages,
+               such as downloads in worker threads, are always included)
+    """
+    with _records_lock:
+        entries = list(_records)
+    df = pd.DataFrame(entries, columns=['Page', 'Run', 'Stage', 'ms', 'Cache', 'At'])
+    df['Page'] = df['Page'].fillna('(background)')
+    if last_runs and len(df):
+        keep = df.dropna(subset=['Run']).groupby('Page')['Run'].unique().map(lambda runs: runs[-last_runs:])
+        recent = {run for runs in keep for run in runs}
+        df = df[df['Run'].isna() | df['Run'].isin(recent)]
+    return df
+
+
+def timing_summary(last_runs=None):
+    """
+    p50 / p95 / max per page and stage over the last N reruns
+    Returns: DataFrame with Page, Stage, Calls, Hit rate (NaN for uncached
+             stages), p50, p95 and max in ms
+    """
+    df = timings(last_runs)
+    columns = ['Page', 'Stage', 'Calls', 'Hit rate', 'p50', 'p95', 'max']
+    if not len(df):
+        return pd.DataFrame(columns=columns)
+    df['Hit'] = df['Cache'].map({'hit': 1.0, 'miss': 0.0})
+    summary = df.groupby(['Page', 'Stage'], sort=False).agg(
+        Calls=('ms', 'size'),
+        **{'Hit rate': ('Hit', 'mean')},
+        p50=('ms', lambda ms: ms.quantile(0.5)),
+        p95=('ms', lambda ms: ms.quantile(0.95)),
+        max=('ms', 'max'),
+    )
+    return summary.reset_index()[columns]
+
+
+def clear_timings():
+    """
+    Empty the buffer
+    """
+    with _records_lock:
+        _records.clear()